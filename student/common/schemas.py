@@ -38,6 +38,29 @@ class Day2Plan:
     return_draft_when_enough: bool = True
     max_context: int = 1200
     embedding_model: str = "text-embedding-3-small"
+    embedding_dimensions: int = 0  # build_index --reduce api --dimensions N 으로 만든 인덱스면 같은 N (0 = 모델 기본)
+    # ANN 검색 파라미터 (0 = 인덱스에 저장된 기본값)
+    nprobe: int = 0        # IVF 계열: 탐색할 리스트 수
+    ef_search: int = 0     # HNSW: 탐색 후보 폭
+    mmap: bool = False     # 인덱스/문서를 파일 매핑으로 로드 (읽기 전용, 콜드 스타트·메모리 ↓)
+    micro_batch: bool = False  # 동시 질의를 모아 한 번에 검색 (SearchBatcher)
+    # 검색 방식: dense(FAISS) | hybrid(BM25 + FAISS, RRF 융합)
+    retrieval_mode: str = "dense"
+    hybrid_pool: int = 20  # 융합 전 각 검색기에서 가져올 후보 수
+    rrf_k: int = 60        # RRF 상수
+    # MMR 재랭킹: top_k * mmr_pool 후보에서 관련성/중복을 λ 로 절충해 top_k 선택
+    mmr: bool = True
+    mmr_lambda: float = 0.7  # 1.0 이면 관련성만 (= MMR 끔)
+    mmr_pool: int = 4
+    parent_window: int = 300  # child 청크 인덱스: hit 앞뒤로 붙일 글자 수 (0 이면 span 그대로)
+    # 메타데이터 사전 필터 (impl/filters.py): path_prefix / path / doc_type / date_from / date_to
+    filters: dict = field(default_factory=dict)
+    # 문서 라우팅 (impl/doc_router.py): 문서 중심 벡터로 상위 route_docs 개 문서를 먼저 고르고 그 청크만 검색 (0=끔)
+    route_docs: int = 0
+    # 질의 결과 캐시 (impl/query_cache.py): 정규화 질의 일치 → 임베딩 코사인 ≥ cache_threshold 면 재사용
+    query_cache: bool = False
+    cache_threshold: float = 0.95
+    cache_ttl_s: float = 600.0
 
 # (선택) RAG Context 아이템도 dataclass를 쓸 경우 예시
 @dataclass
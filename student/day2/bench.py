@@ -0,0 +1,1112 @@
+# -*- coding: utf-8 -*-
+"""
+Day2 성능 측정 스크립트 (API 비용 없이 재현 가능한 합성 데이터/로컬 대체 서버 사용)
+
+사용 예:
+  python -m student.day2.bench embed --n 2000 --concurrency 1 4 8 --throttle_rate 0.05
+  python -m student.day2.bench ann --n 100000 --dim 256
+  python -m student.day2.bench coldstart --sizes 10000 100000 1000000 --dim 64
+  python -m student.day2.bench batch --n 100000 --dim 256 --threads 32
+  python -m student.day2.bench hybrid --n 20000 --queries 500
+  python -m student.day2.bench mmr --docs 5000 --chunks_per_doc 6 --lambdas 1.0 0.7 0.5
+  python -m student.day2.bench ingest --paths data/raw --workers 1 2 4
+  python -m student.day2.bench parent --paths data/raw --k 5 --max_context 1200
+  python -m student.day2.bench precision --n 20000 --dim 1536 --rescore 0 4
+  python -m student.day2.bench dims --n 20000 --dim 1536 --dims 768 256 128
+  python -m student.day2.bench filter --n 100000 --dim 256 --selectivity 1 0.1 0.01 0.001
+  python -m student.day2.bench docstore --sizes 10000 100000 1000000
+  python -m student.day2.bench qcache --n 20000 --queries 1000 --thresholds 0.95 0.98 0.995
+  python -m student.day2.bench shards --n 200000 --dim 256 --shards 1 2 4 8
+  python -m student.day2.bench rwstore --n 50000 --dim 128 --threads 8 --add_batches 200 --batch 256
+  python -m student.day2.bench tenants --tenants 12 --n 20000 --dim 256 --budgets_mb 0 120 60 30
+  python -m student.day2.bench route --docs 500 2000 8000 --chunks_per_doc 40 --top_d 5 20 50
+"""
+
+import os, sys, json, time, argparse, subprocess, tempfile
+from pathlib import Path
+
+# ───────── 0) 루트 탐색 + sys.path ─────────
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import numpy as np
+
+
+# ───────── 1) 유틸 ─────────
+def _synthetic_texts(n: int, seed: int = 0) -> list[str]:
+    rng = np.random.default_rng(seed)
+    words = ["전기차", "충전", "인프라", "보조금", "정책", "규제", "의료기기", "AI", "station", "EV-2025"]
+    return [" ".join(rng.choice(words, size=int(rng.integers(50, 300)))) + f" #{i}" for i in range(n)]
+
+
+def _fmt_row(cols, widths) -> str:
+    return " | ".join(str(c).rjust(w) for c, w in zip(cols, widths))
+
+
+def _synthetic_vectors(n: int, dim: int, n_clusters: int = 200, seed: int = 0) -> np.ndarray:
+    """군집 구조가 있는 L2 정규화 벡터 (실제 임베딩 분포 흉내)"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((n_clusters, dim)).astype("float32")
+    x = centers[rng.integers(0, n_clusters, n)] + 0.6 * rng.standard_normal((n, dim)).astype("float32")
+    x /= np.linalg.norm(x, axis=1, keepdims=True)
+    return x
+
+
+def _items(n: int) -> list[dict]:
+    return [{"id": f"synthetic::chunk_{i:07d}", "text": "", "meta": {}} for i in range(n)]
+
+
+def _recall(found: np.ndarray, truth: np.ndarray) -> float:
+    hits = sum(len(set(f[f >= 0]) & set(t)) for f, t in zip(found, truth))
+    return hits / truth.size
+
+
+def _rss_mb() -> float:
+    """현재 프로세스 상주 메모리(MB). /proc 이 없으면 ru_maxrss 로 대체"""
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _write_synthetic_index(index_dir: str, n: int, dim: int, index_type: str = "flat",
+                           docs_format: str = "columnar"):
+    """합성 벡터 + 본문 약 200자의 청크로 인덱스 디렉토리 생성"""
+    from student.day2.impl.store import FaissStore
+    store = FaissStore(dim, os.path.join(index_dir, "faiss.index"), os.path.join(index_dir, "docs.jsonl"),
+                       index_type=index_type)
+    store.docs_format = docs_format
+    step = 100_000
+    filler = "전기차 충전 인프라 구축 현황과 정책 " * 10
+    for s0 in range(0, n, step):
+        m = min(step, n - s0)
+        x = _synthetic_vectors(m, dim, seed=s0)
+        items = [{"id": f"synthetic/{(s0 + i) // 50:06d}.pdf::chunk_{(s0 + i) % 50:04d}", "text": filler,
+                  "meta": {"path": f"synthetic/{(s0 + i) // 50:06d}.pdf", "chunk": (s0 + i) % 50}}
+                 for i in range(m)]
+        store.add(x, items)
+    store.save()
+
+
+def _index_bytes(index) -> int:
+    import faiss
+    return int(faiss.serialize_index(index).nbytes)
+
+
+# ───────── 2) embed: 순차 vs 동시 요청 (로컬 대체 서버) ─────────
+def bench_embed(args):
+    from student.day2.fake_embed_server import serve
+    from student.day2.impl.embeddings import Embeddings
+
+    srv = serve(port=args.port, rpm=args.server_rpm, throttle_rate=args.throttle_rate,
+                latency_ms=args.latency_ms)
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{args.port}/v1"
+    os.environ.setdefault("OPENAI_API_KEY", "dummy")
+    texts = _synthetic_texts(args.n)
+    widths = (11, 8, 9, 10, 9, 9, 14)
+    print(_fmt_row(("concurrency", "secs", "chunks/s", "requests", "req/s", "429s", "limit(min/max)"), widths))
+    try:
+        for c in args.concurrency:
+            emb = Embeddings(batch_size=args.batch_size, concurrency=c, max_retries=8, cache_dir="off")
+            t0 = time.perf_counter()
+            vecs = emb.encode(texts)
+            dt = time.perf_counter() - t0
+            assert vecs.shape[0] == len(texts)
+            lim = f"{emb.aimd.stats['min_seen']}/{emb.aimd.stats['max_seen']}" if emb.aimd else "-"
+            print(_fmt_row((c, f"{dt:.2f}", f"{len(texts) / dt:.0f}", emb.stats["requests"],
+                            f"{emb.stats['requests'] / dt:.1f}", emb.stats["throttled"], lim), widths))
+    finally:
+        srv.shutdown()
+
+
+# ───────── 3) ann: 인덱스 종류별 recall@k / 지연 / 크기 (정확 flat 대비) ─────────
+def bench_ann(args):
+    from student.day2.impl.store import FaissStore
+    from student.day2.impl.index_factory import search_params
+
+    x = _synthetic_vectors(args.n, args.dim)
+    q = _synthetic_vectors(args.queries, args.dim, seed=1)
+    items = _items(args.n)
+
+    def run(store, **kw):
+        params = search_params(store.index, **kw)
+        t0 = time.perf_counter()
+        I = np.vstack([store.index.search(q[i:i + 1], args.k, params=params)[1] for i in range(len(q))])
+        return I, (time.perf_counter() - t0) / len(q) * 1000
+
+    flat = FaissStore(args.dim, "", "", index_type="flat")
+    flat.add(x, [dict(it) for it in items])
+    truth, flat_ms = run(flat)
+
+    widths = (10, 14, 9, 10, 9, 10)
+    print(f"N={args.n} dim={args.dim} queries={args.queries} k={args.k}")
+    print(_fmt_row(("type", "search param", "build s", "recall@k", "ms/query", "index MB"), widths))
+    print(_fmt_row(("flat", "-", "-", "1.000", f"{flat_ms:.3f}", f"{_index_bytes(flat.index) / 2**20:.1f}"), widths))
+    sweeps = {"hnsw": ("ef_search", [16, 64, 256]),
+              "ivf_flat": ("nprobe", [1, 4, 16, 64]),
+              "ivf_pq": ("nprobe", [1, 4, 16, 64])}
+    for kind, (knob, values) in sweeps.items():
+        t0 = time.perf_counter()
+        store = FaissStore(args.dim, "", "", index_type=kind)
+        store.add(x, [dict(it) for it in items])
+        build_s = time.perf_counter() - t0
+        mb = _index_bytes(store.index) / 2**20
+        for v in values:
+            I, ms = run(store, **{knob: v})
+            print(_fmt_row((kind, f"{knob}={v}", f"{build_s:.1f}", f"{_recall(I, truth):.3f}",
+                            f"{ms:.3f}", f"{mb:.1f}"), widths))
+
+
+# ───────── 4) coldstart: 일반 로드 vs mmap 로드 (콜드 스타트 시간 / RSS) ─────────
+def _load_once(args):
+    """별도 프로세스에서 1회 로드 + 첫 질의 → JSON 한 줄 출력 (bench coldstart 내부용)"""
+    from student.day2.impl.store import FaissStore
+    base = _rss_mb()
+    t0 = time.perf_counter()
+    store = FaissStore.load(os.path.join(args.index_dir, "faiss.index"),
+                            os.path.join(args.index_dir, "docs.jsonl"), mmap=args.mmap)
+    load_s = time.perf_counter() - t0
+    q = _synthetic_vectors(1, store.dim, seed=7)[0]
+    t1 = time.perf_counter()
+    hits = store.search(q, top_k=5)
+    first_ms = (time.perf_counter() - t1) * 1000
+    vids = np.random.default_rng(0).choice(np.fromiter(store.docs, dtype="int64", count=len(store.docs)),
+                                           size=min(1000, len(store.docs)), replace=False)
+    t2 = time.perf_counter()
+    for v in vids.tolist():
+        store.docs[v]
+    get_us = (time.perf_counter() - t2) / max(1, len(vids)) * 1e6
+    print(json.dumps({"load_s": load_s, "rss_mb": _rss_mb() - base, "first_query_ms": first_ms,
+                      "get_us": get_us, "hits": len(hits)}))
+
+
+def bench_coldstart(args):
+    widths = (9, 6, 9, 10, 14)
+    print(_fmt_row(("chunks", "mode", "load s", "RSS +MB", "1st query ms"), widths))
+    for n in args.sizes:
+        with tempfile.TemporaryDirectory() as d:
+            _write_synthetic_index(d, n, args.dim, args.index_type)
+            for mode in ("eager", "mmap"):
+                cmd = [sys.executable, "-m", "student.day2.bench", "_load_once", "--index_dir", d]
+                if mode == "mmap":
+                    cmd.append("--mmap")
+                out = subprocess.run(cmd, capture_output=True, text=True, cwd=str(ROOT), check=True)
+                r = json.loads(out.stdout.strip().splitlines()[-1])
+                print(_fmt_row((n, mode, f"{r['load_s']:.3f}", f"{r['rss_mb']:.1f}",
+                                f"{r['first_query_ms']:.2f}"), widths))
+
+
+# ───────── 5) batch: 동시 질의 직접 검색 vs 마이크로 배칭 ─────────
+def bench_batch(args):
+    from concurrent.futures import ThreadPoolExecutor
+    from student.day2.impl.store import FaissStore
+    from student.day2.impl.batcher import SearchBatcher
+
+    store = FaissStore(args.dim, "", "", index_type="flat")
+    store.add(_synthetic_vectors(args.n, args.dim), _items(args.n))
+    q = _synthetic_vectors(args.queries, args.dim, seed=1)
+
+    def drive(fn):
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.threads) as ex:
+            list(ex.map(lambda i: fn(q[i], top_k=args.k), range(len(q))))
+        return len(q) / (time.perf_counter() - t0)
+
+    widths = (22, 9, 11, 12)
+    print(f"N={args.n} dim={args.dim} queries={args.queries} threads={args.threads}")
+    print(_fmt_row(("mode", "QPS", "mean batch", "max depth"), widths))
+    print(_fmt_row(("direct store.search", f"{drive(store.search):.0f}", "1.0", "-"), widths))
+    for wait_ms in args.wait_ms:
+        b = SearchBatcher(store, max_batch=args.max_batch, max_wait_ms=wait_ms)
+        qps = drive(b.search)
+        snap = b.snapshot()
+        b.close()
+        print(_fmt_row((f"batcher wait={wait_ms}ms", f"{qps:.0f}", f"{snap['mean_batch']:.1f}",
+                        snap["max_queue_depth"]), widths))
+
+
+# ───────── 6) hybrid: dense vs BM25+dense(RRF) 지연/적중률 ─────────
+def bench_hybrid(args):
+    """
+    합성 코퍼스: 청크마다 고유 식별자(ST-xxxxx)를 넣고 두 종류 질의를 만든다
+      - id    : 식별자를 포함한 질의, 질의 벡터는 정답과 약하게만 닮음 (dense 가 놓치기 쉬운 경우)
+      - 의미  : 식별자 없는 질의, 질의 벡터가 정답과 가까움 (dense 가 강한 경우)
+    """
+    from student.common.schemas import Day2Plan
+    from student.day2.impl.store import FaissStore
+    from student.day2.impl.lexical import LexicalIndex
+    from student.day2.impl.rag import _hybrid_search
+
+    rng = np.random.default_rng(1)
+    texts = [t + f" 충전소 ST-{i:05d}" for i, t in enumerate(_synthetic_texts(args.n))]
+    vecs = _synthetic_vectors(args.n, args.dim)
+    items = _items(args.n)
+    for it, t in zip(items, texts):
+        it["text"] = t
+    store = FaissStore(args.dim, "", "", index_type="flat")
+    store.add(vecs, items)
+    t0 = time.perf_counter()
+    lex = LexicalIndex.build((it["vid"], it["text"]) for it in items)
+    print(f"N={args.n} dim={args.dim} BM25 build {time.perf_counter() - t0:.2f}s {lex.stats()}")
+
+    targets = rng.choice(args.n, args.queries, replace=False)
+    half = args.queries // 2
+    queries = []
+    for j, t in enumerate(targets):
+        noise = args.id_noise if j < half else args.sem_noise
+        qv = vecs[t] + noise * rng.standard_normal(args.dim).astype("float32")
+        qv /= np.linalg.norm(qv)
+        text = f"ST-{t:05d} 충전소 고장 문의" if j < half else "전기차 충전 인프라 정책"
+        queries.append(("id" if j < half else "의미", text, qv, items[t]["id"]))
+
+    plan = Day2Plan(top_k=args.k, hybrid_pool=args.pool)
+    modes = {
+        "dense": lambda text, qv: store.search(qv, top_k=args.k),
+        "hybrid": lambda text, qv: _hybrid_search(store, store, lex, text, qv, plan),
+    }
+    widths = (8, 12, 12, 12)
+    print(_fmt_row(("mode", "p50 ms", f"id hit@{args.k}", f"의미 hit@{args.k}"), widths))
+    for name, fn in modes.items():
+        lat, hits = [], {"id": 0, "의미": 0}
+        for kind, text, qv, gold in queries:
+            t0 = time.perf_counter()
+            res = fn(text, qv)
+            lat.append(time.perf_counter() - t0)
+            hits[kind] += any(c["doc_id"] == gold for c in res)
+        print(_fmt_row((name, f"{np.median(lat) * 1000:.2f}", f"{hits['id'] / half:.3f}",
+                        f"{hits['의미'] / (len(queries) - half):.3f}"), widths))
+
+
+# ───────── 7) mmr: 겹치는 이웃 청크 제거 효과 ─────────
+def bench_mmr(args):
+    """
+    문서마다 chunks_per_doc 개의 거의 같은 청크(chunk_overlap 흉내)를 두고,
+    top-k 안의 서로 다른 문서 수 / 결과 간 평균 유사도 / 지연을 λ 별로 비교
+    """
+    from student.common.schemas import Day2Plan
+    from student.day2.impl.store import FaissStore
+    from student.day2.impl.rag import _mmr
+
+    rng = np.random.default_rng(2)
+    base = _synthetic_vectors(args.docs, args.dim)
+    n = args.docs * args.chunks_per_doc
+    vecs = np.repeat(base, args.chunks_per_doc, axis=0)
+    vecs += args.dup_noise * rng.standard_normal(vecs.shape).astype("float32")
+    vecs /= np.linalg.norm(vecs, axis=1, keepdims=True)
+    items = _items(n)
+    for i, it in enumerate(items):
+        it["meta"] = {"doc": i // args.chunks_per_doc}
+    store = FaissStore(args.dim, "", "", index_type="flat")
+    store.add(vecs, items)
+    qs = _synthetic_vectors(args.queries, args.dim, seed=3)
+
+    widths = (8, 10, 14, 14)
+    print(f"docs={args.docs} chunks/doc={args.chunks_per_doc} k={args.k} pool=k*{args.pool}")
+    print(_fmt_row(("lambda", "p50 ms", "distinct docs", "mean pair sim"), widths))
+    for lam in args.lambdas:
+        plan = Day2Plan(top_k=args.k, mmr_lambda=lam, mmr_pool=args.pool)
+        lat, distinct, pair = [], [], []
+        for qv in qs:
+            t0 = time.perf_counter()
+            res = _mmr(store, store.search(qv, top_k=args.k * args.pool), plan)
+            lat.append(time.perf_counter() - t0)
+            distinct.append(len({c["meta"]["doc"] for c in res}))
+            v = store.vectors([c["vid"] for c in res])
+            sim = v @ v.T
+            pair.append((sim.sum() - np.trace(sim)) / max(1, len(v) * (len(v) - 1)))
+        print(_fmt_row((lam, f"{np.median(lat) * 1000:.2f}", f"{np.mean(distinct):.2f}",
+                        f"{np.mean(pair):.3f}"), widths))
+
+
+# ───────── 8) ingest: 순차 build_corpus vs 스트리밍 파이프라인 (+ 추출 캐시) ─────────
+def bench_ingest(args):
+    """
+    first batch = 첫 청크 배치가 임베딩 단계로 넘어가기까지 걸린 시간
+    cold 행은 추출 캐시를 끄고, 마지막 두 행은 임시 캐시 디렉토리로 채운 뒤(cold) 재실행(warm)
+    """
+    from student.day2.impl.ingest import build_corpus, collect_files
+    from student.day2.impl.pipeline import iter_corpus_batches, plan_tasks
+
+    files = collect_files(args.paths)
+    tasks = plan_tasks(files, args.pages_per_task)
+    print(f"{len(files)} files → {len(tasks)} extract tasks (pages_per_task={args.pages_per_task}, cpus={os.cpu_count()})")
+    widths = (20, 9, 12, 10, 11)
+    print(_fmt_row(("mode", "wall s", "first batch", "pages/s", "chunks/s"), widths))
+
+    def run_pipeline(label: str, w: int):
+        stats, first = {}, None
+        t0 = time.perf_counter()
+        for _ in iter_corpus_batches(files, batch_chunks=args.batch_chunks, workers=w,
+                                     pages_per_task=args.pages_per_task, stats=stats):
+            if first is None:
+                first = time.perf_counter() - t0
+        wall = stats["wall_s"]
+        print(_fmt_row((label, f"{wall:.2f}", f"{first or 0:.2f}", f"{stats['pages'] / wall:.1f}",
+                        f"{stats['chunks'] / wall:.1f}"), widths))
+
+    prev = os.environ.get("DAY2_PDF_CACHE_DIR")
+    os.environ["DAY2_PDF_CACHE_DIR"] = "off"
+    try:
+        t0 = time.perf_counter()
+        n = len(build_corpus(args.paths))
+        wall = time.perf_counter() - t0
+        pages = sum(t[5] - t[4] for t in tasks)
+        print(_fmt_row(("build_corpus", f"{wall:.2f}", f"{wall:.2f}", f"{pages / wall:.1f}", f"{n / wall:.1f}"),
+                       widths))
+        for w in args.workers:
+            run_pipeline(f"pipeline w={w}", w)
+        with tempfile.TemporaryDirectory() as td:
+            os.environ["DAY2_PDF_CACHE_DIR"] = td
+            w = args.workers[-1]
+            run_pipeline(f"cache cold w={w}", w)
+            run_pipeline(f"cache warm w={w}", w)
+    finally:
+        if prev is None:
+            os.environ.pop("DAY2_PDF_CACHE_DIR", None)
+        else:
+            os.environ["DAY2_PDF_CACHE_DIR"] = prev
+
+
+# ───────── 9) parent: 겹침 window 청크 vs child span + 부모 창 ─────────
+def bench_parent(args):
+    """
+    API 없이 비교: 인덱스 비용(벡터 수/임베딩 글자·토큰) + max_context 예산 안의 중복 비율/정답 포함률
+    검색은 BM25 로 대신함 (두 모드에 같은 검색기를 써서 청크 구성 차이만 비교)
+    질의 = 문서 원문에서 뽑은 짧은 구간, 정답 = 그 구간이 예산 안에 포함됐는지
+    """
+    from student.common.schemas import Day2Plan
+    from student.day2.impl.ingest import collect_files, clean_text
+    from student.day2.impl.embeddings import estimate_tokens
+    from student.day2.impl.lexical import LexicalIndex
+    from student.day2.impl.doctext import DocTextStore, expand_parents
+    from student.day2.impl.pipeline import iter_corpus_batches
+
+    files = collect_files(args.paths)
+    rng = np.random.default_rng(4)
+    widths = (8, 8, 12, 10, 12, 12)
+    print(_fmt_row(("mode", "vectors", "embed chars", "tokens", "redundancy", f"answer@{args.k}"), widths))
+    with tempfile.TemporaryDirectory() as td:
+        texts = DocTextStore(td)
+        corpora = {}
+        for mode in ("window", "child"):
+            corpora[mode] = [it for b in iter_corpus_batches(files, workers=1, chunk_mode=mode, span_size=args.span_size,
+                                                             doc_texts=texts if mode == "child" else None) for it in b]
+        docs = {p: texts.get(p) for p in sorted({it["meta"]["path"] for it in corpora["child"]})}
+        docs = {p: t for p, t in docs.items() if t and len(t) > 200}
+        queries = []
+        for _ in range(args.queries):
+            p = list(docs)[int(rng.integers(len(docs)))]
+            at = int(rng.integers(0, len(docs[p]) - 60))
+            queries.append((p, at, docs[p][at:at + 40]))
+
+        for mode, corpus in corpora.items():
+            for i, it in enumerate(corpus):
+                it["vid"] = i
+                if mode == "window":  # chunk_text 는 clean 후 (size - overlap) 간격으로 자름
+                    s0 = it["meta"]["chunk"] * 1000
+                    it["meta"].update(start=s0, end=s0 + len(it["text"]))
+            lex = LexicalIndex.build((it["vid"], it["text"]) for it in corpus)
+            redundant, answered = [], 0
+            for p, at, q in queries:
+                hits = [dict(doc_id=corpus[v]["id"], chunk=corpus[v]["text"], score=sc, meta=dict(corpus[v]["meta"]))
+                        for v, sc in lex.search(q, top_k=args.k)]
+                if mode == "child":
+                    hits = expand_parents(hits, texts, args.parent_window, max_chars=args.max_context)
+                # _draft_answer 와 같은 방식으로 예산 소진
+                budget, ranges = args.max_context, []
+                for h in hits:
+                    s0, _ = h["meta"].get("span") or (h["meta"]["start"], h["meta"]["end"])
+                    n = min(len(h["chunk"]), budget)
+                    ranges.append((h["meta"]["path"], s0, s0 + n))
+                    budget -= n
+                    if budget <= 0:
+                        break
+                total = sum(e - s for _, s, e in ranges)
+                covered = set()
+                for path, s0, e in ranges:
+                    covered.update((path, c) for c in range(s0, e))
+                redundant.append(1 - len(covered) / total if total else 0.0)
+                answered += any(path == p and s0 <= at and at + 40 <= e for path, s0, e in ranges)
+            chars = sum(len(it["text"]) for it in corpus)
+            print(_fmt_row((mode, len(corpus), chars, sum(estimate_tokens(it["text"]) for it in corpus),
+                            f"{np.mean(redundant):.1%}", f"{answered / len(queries):.3f}"), widths))
+
+
+# ───────── 10) precision: fp32 / fp16 / sq8 (+ float32 재채점) 메모리·recall·지연 ─────────
+def bench_precision(args):
+    """
+    저장 → load 로 복원한 스토어로 측정 (precision/rescore 가 메타로 복원되는지까지 확인)
+    RAM MB = 직렬화 인덱스 크기(상주 벡터), 원본 MB = 디스크 사이드카(mmap, 재채점 후보 행만 읽음)
+    """
+    import faiss
+    from student.day2.impl.store import FaissStore, chunk_vid
+
+    x = _synthetic_vectors(args.n, args.dim)
+    q = _synthetic_vectors(args.queries, args.dim, seed=1)
+    items = _items(args.n)
+    exact = faiss.IndexFlatIP(args.dim)
+    exact.add(x)
+    _, truth = exact.search(q, args.k)
+    vid_of = np.array([chunk_vid(it["id"]) for it in items], dtype="int64")
+
+    widths = (6, 9, 8, 8, 9, 10, 9, 12)
+    print(f"N={args.n} dim={args.dim} queries={args.queries} k={args.k}")
+    print(_fmt_row(("type", "precision", "rescore", "RAM MB", "원본 MB", f"recall@{args.k}", "ms/query",
+                    "indexes/GB"), widths))
+    for kind in args.types:
+        for precision in ("fp32", "fp16", "sq8"):
+            with tempfile.TemporaryDirectory() as td:
+                store = FaissStore(args.dim, os.path.join(td, "faiss.index"), os.path.join(td, "docs.jsonl"),
+                                   index_type=kind, index_params={"precision": precision})
+                store.add(x, [dict(it) for it in items])
+                store.save()
+                store = FaissStore.load(store.index_path, store.docs_path)
+                assert store.precision == precision
+                ram = _index_bytes(store.index) / 2**20
+                raw = sum(os.path.getsize(os.path.join(td, f)) for f in os.listdir(td) if f.startswith("vectors."))
+                for r in (args.rescore if precision != "fp32" else [0]):
+                    store.index_params["rescore"] = r
+                    t0 = time.perf_counter()
+                    found = [[h["vid"] for h in store.search(q[i], args.k)] for i in range(len(q))]
+                    ms = (time.perf_counter() - t0) / len(q) * 1000
+                    hits = sum(len(set(f) & set(vid_of[t].tolist())) for f, t in zip(found, truth))
+                    print(_fmt_row((kind, precision, r, f"{ram:.1f}", f"{raw / 2**20:.1f}",
+                                    f"{hits / truth.size:.3f}", f"{ms:.3f}", f"{1024 / ram:.1f}"), widths))
+
+
+# ───────── 11) dims: 원래 차원 vs 축소(앞부분 절단=API dimensions 흉내 / PCA) ─────────
+def bench_dims(args):
+    """
+    저차원 구조(rank) + 잡음을 가진 합성 임베딩에서 원래 차원 정확 검색 대비 recall@k / 지연 / 크기
+    truncate 는 API dimensions 를 흉내냄 (앞 d 차원 + 재정규화). 실제 text-embedding-3 는 앞 차원에
+    정보가 몰리도록 학습돼 있어, 정보가 고르게 퍼진 합성 데이터의 truncate 값은 하한으로 보면 됨
+    """
+    from student.day2.impl.store import FaissStore
+    from student.day2.impl.dimreduce import PcaReducer
+
+    rng = np.random.default_rng(3)
+    proj = rng.standard_normal((args.rank, args.dim)).astype("float32") / np.sqrt(args.rank)
+
+    def embed(n, seed):
+        z = _synthetic_vectors(n, args.rank, seed=seed) @ proj
+        z += args.noise * np.random.default_rng(seed + 7).standard_normal(z.shape).astype("float32") / np.sqrt(args.dim)
+        return z / np.linalg.norm(z, axis=1, keepdims=True)
+
+    x, q = embed(args.n, 0), embed(args.queries, 1)
+    items = _items(args.n)
+
+    def run(store, queries):
+        t0 = time.perf_counter()
+        found = [[h["vid"] for h in store.search(queries[i], args.k)] for i in range(len(queries))]
+        return found, (time.perf_counter() - t0) / len(queries) * 1000
+
+    full = FaissStore(args.dim, "", "")
+    full.add(x, [dict(it) for it in items])
+    truth, full_ms = run(full, q)
+    truth = [set(t) for t in truth]
+
+    widths = (9, 6, 10, 9, 9, 9)
+    print(f"N={args.n} dim={args.dim} rank={args.rank} queries={args.queries} k={args.k}")
+    print(_fmt_row(("method", "dim", f"recall@{args.k}", "ms/query", "index MB", "fit s"), widths))
+    print(_fmt_row(("native", args.dim, "1.000", f"{full_ms:.3f}", f"{_index_bytes(full.index) / 2**20:.1f}", "-"),
+                   widths))
+    for d in args.dims:
+        for method in ("truncate", "pca"):
+            t0 = time.perf_counter()
+            store = FaissStore(d, "", "")
+            if method == "pca":
+                store.reducer = PcaReducer.fit(x, d)
+                xs, qs = x, q  # 스토어가 add/search 에서 같은 변환 적용
+            else:
+                xs, qs = (v[:, :d] / np.linalg.norm(v[:, :d], axis=1, keepdims=True) for v in (x, q))
+            fit_s = time.perf_counter() - t0
+            store.add(xs, [dict(it) for it in items])
+            found, ms = run(store, qs)
+            hits = sum(len(set(f) & t) for f, t in zip(found, truth))
+            print(_fmt_row((method, d, f"{hits / (len(truth) * args.k):.3f}", f"{ms:.3f}",
+                            f"{_index_bytes(store.index) / 2**20:.1f}", f"{fit_s:.1f}" if method == "pca" else "-"),
+                           widths))
+
+
+# ───────── 12) filter: 사후 필터(over-fetch) vs 사전 필터(IDSelector) ─────────
+def bench_filter(args):
+    """
+    문서마다 날짜가 다른 합성 코퍼스에서 날짜 범위로 선택도를 조절
+    post = top_k × over 를 가져와 파이썬에서 거름(기존 방식), pre = search(where=...) (스캔 안에서 거름)
+    filled = 반환 개수 / k, recall = 필터 적용 정확 검색 대비
+    """
+    import datetime
+    from student.day2.impl.store import FaissStore, chunk_vid
+
+    x = _synthetic_vectors(args.n, args.dim)
+    q = _synthetic_vectors(args.queries, args.dim, seed=1)
+    n_docs = max(1, args.n // 50)
+    day0 = datetime.date(2023, 1, 1)
+    doc_days = np.random.default_rng(5).permutation(n_docs) % 1000  # 문서 → 0..999 일차
+    dates = np.array([int((day0 + datetime.timedelta(days=int(d))).strftime("%Y%m%d")) for d in doc_days])
+    items = [{"id": f"synthetic/{dates[i // 50]}_{i // 50:06d}.md::chunk_{i % 50:04d}", "text": "",
+              "meta": {"path": f"synthetic/{dates[i // 50]}_{i // 50:06d}.md", "chunk": i % 50}}
+             for i in range(args.n)]
+    row_dates = dates[np.arange(args.n) // 50]
+    vid_of = np.array([chunk_vid(it["id"]) for it in items], dtype="int64")
+
+    widths = (6, 11, 6, 9, 8, 10, 9)
+    print(f"N={args.n} dim={args.dim} queries={args.queries} k={args.k} over={args.over}")
+    print(_fmt_row(("type", "selectivity", "mode", "allowed", "filled", f"recall@{args.k}", "ms/query"), widths))
+    for kind in args.types:
+        store = FaissStore(args.dim, "", "", index_type=kind)
+        store.add(x, [dict(it) for it in items])
+        store.filters  # 필터 색인은 저장 시 만들어지므로 측정 전에 준비
+        for sel in args.selectivity:
+            days = max(1, int(round(1000 * sel)))
+            end = day0 + datetime.timedelta(days=days - 1)
+            where = {"date_from": day0.strftime("%Y-%m-%d"), "date_to": end.strftime("%Y-%m-%d")}
+            ok = (row_dates >= int(day0.strftime("%Y%m%d"))) & (row_dates <= int(end.strftime("%Y%m%d")))
+            rows = np.flatnonzero(ok)
+            vids = vid_of[rows]
+            sims = q @ x[rows].T
+            truth = [set(vids[np.argsort(-s)[:args.k]].tolist()) for s in sims]
+            allowed = set(vids.tolist())
+            for mode in ("post", "pre"):
+                t0 = time.perf_counter()
+                found = []
+                for i in range(len(q)):
+                    if mode == "post":
+                        res = [h for h in store.search(q[i], args.k * args.over) if h["vid"] in allowed][:args.k]
+                    else:
+                        res = store.search(q[i], args.k, where=where)
+                    found.append([h["vid"] for h in res])
+                ms = (time.perf_counter() - t0) / len(q) * 1000
+                filled = np.mean([len(f) / args.k for f in found])
+                recall = np.mean([len(set(f) & t) / max(1, len(t)) for f, t in zip(found, truth)])
+                print(_fmt_row((kind, f"{sel:g}", mode, len(rows), f"{filled:.2f}", f"{recall:.3f}", f"{ms:.3f}"),
+                               widths))
+
+
+# ───────── 13) docstore: docs.jsonl vs 컬럼형 docs.col (로드 시간 / RSS / 파일 크기 / vid 조회) ─────────
+def bench_docstore(args):
+    """
+    형식 × 로드 방식별로 별도 프로세스에서 1회 로드 (bench coldstart 와 같은 _load_once)
+    - jsonl eager: 전체 파싱 dict, jsonl mmap: 오프셋 사이드카 + 줄 단위 json.loads (LazyDocs)
+    - columnar eager/mmap: 둘 다 docs.col 매핑 (eager 는 쓰기용 DocsOverlay)
+    get µs: 무작위 vid 1000개 레코드 조회 평균
+    """
+    from student.day2.impl.docstore import columnar_path
+    widths = (9, 9, 6, 9, 9, 10, 8)
+    print(_fmt_row(("chunks", "format", "mode", "file MB", "load s", "RSS +MB", "get µs"), widths))
+    for n in args.sizes:
+        for fmt in ("jsonl", "columnar"):
+            with tempfile.TemporaryDirectory() as d:
+                _write_synthetic_index(d, n, args.dim, docs_format=fmt)
+                docs_path = os.path.join(d, "docs.jsonl")
+                size = os.path.getsize(docs_path if fmt == "jsonl" else columnar_path(docs_path))
+                for mode in ("eager", "mmap"):
+                    cmd = [sys.executable, "-m", "student.day2.bench", "_load_once", "--index_dir", d]
+                    if mode == "mmap":
+                        cmd.append("--mmap")
+                    out = subprocess.run(cmd, capture_output=True, text=True, cwd=str(ROOT), check=True)
+                    r = json.loads(out.stdout.strip().splitlines()[-1])
+                    print(_fmt_row((n, fmt, mode, f"{size / 2**20:.1f}", f"{r['load_s']:.3f}",
+                                    f"{r['rss_mb']:.1f}", f"{r['get_us']:.1f}"), widths))
+
+
+# ───────── 14) qcache: 질의 결과 캐시 (완전 일치 / 의미 유사) 적중률 · 지연 · 결과 일치도 ─────────
+def bench_qcache(args):
+    """
+    주제 topics 개에서 Zipf 분포로 질의를 뽑음: repeat 비율은 같은 문장(정규화 일치),
+    나머지는 주제 벡터 + 잡음(바꿔 말하기, 코사인 ≈ 1/√(1+para_noise²)), novel 비율은 새 질문
+    임베딩 호출은 embed_ms 대기로 흉내 (완전 일치 적중 시 생략). same@k: 의미 적중 결과와 실제 검색 결과의 top-k 겹침
+    """
+    from student.day2.impl.store import FaissStore
+    from student.day2.impl.query_cache import QueryCache
+
+    x = _synthetic_vectors(args.n, args.dim)
+    store = FaissStore(args.dim, "/tmp/_bench_qcache/faiss.index", "/tmp/_bench_qcache/docs.jsonl")
+    store.add(x, _items(args.n))
+    rng = np.random.default_rng(0)
+    topics = _synthetic_vectors(args.topics, args.dim, seed=3)
+    rank = np.arange(1, args.topics + 1, dtype="float64")
+    p = (1.0 / rank ** args.zipf) / (1.0 / rank ** args.zipf).sum()
+    workload = []  # (질의 문자열, 벡터)
+    for j in range(args.queries):
+        r = rng.random()
+        if r < args.novel:
+            v = _synthetic_vectors(1, args.dim, seed=10_000 + j)[0]
+            workload.append((f"novel {j}", v))
+            continue
+        t = int(rng.choice(args.topics, p=p))
+        if r < args.novel + args.repeat:
+            workload.append((f"topic {t}", topics[t]))
+        else:
+            v = topics[t] + args.para_noise * rng.standard_normal(args.dim).astype("float32") / np.sqrt(args.dim)
+            workload.append((f"topic {t} #{j}", v / np.linalg.norm(v)))
+
+    def _embed(v):
+        time.sleep(args.embed_ms / 1000)
+        return v
+
+    widths = (10, 8, 10, 8, 8, 7)
+    print(_fmt_row(("threshold", "exact %", "semantic %", "miss %", "mean ms", "same@k"), widths))
+    for th in [None] + args.thresholds:
+        cache = QueryCache(capacity=args.capacity) if th is not None else None
+        semantic = []  # (질의 벡터, 캐시 결과) → 시간 측정 뒤 실제 검색과 비교
+        t0 = time.perf_counter()
+        for q, v in workload:
+            if cache is None:
+                store.search(_embed(v), top_k=args.k)
+                continue
+            if cache.get_exact("bench", q) is not None:
+                continue
+            qv = _embed(v)
+            hit, _ = cache.get_similar("bench", qv, th, query=q)
+            if hit is not None:
+                semantic.append((qv, hit["contexts"]))
+                continue
+            cache.put("bench", q, qv, {"contexts": store.search(qv, top_k=args.k), "gating": {}})
+        ms = (time.perf_counter() - t0) / len(workload) * 1000
+        if cache is None:
+            print(_fmt_row(("no cache", "-", "-", "100.0%", f"{ms:.2f}", "-"), widths))
+            continue
+        same = [len({h["vid"] for h in store.search(qv, top_k=args.k)} & {h["vid"] for h in ctx}) / args.k
+                for qv, ctx in semantic]
+        m, n = cache.metrics(), len(workload)
+        print(_fmt_row((th, f"{m['exact_hits'] / n:.1%}", f"{m['semantic_hits'] / n:.1%}",
+                        f"{m['misses'] / n:.1%}", f"{ms:.2f}", f"{np.mean(same) if same else 0:.3f}"), widths))
+
+
+# ───────── 15) shards: 샤드 수별 단일 질의 지연 / 동시 질의 처리량 / recall ─────────
+def bench_shards(args):
+    """
+    같은 코퍼스를 S 개 FaissStore 로 나눠 ShardedStore(스레드 팬아웃 + 힙 병합) 로 검색
+    p50/p95: 질의 1개씩 순차, QPS: threads 개 클라이언트 동시, recall: 1샤드 flat 정답 대비
+    샤드 병렬 이득은 코어 수에 묶임 (출력 첫 줄의 CPU 수 참고)
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from student.day2.impl.store import FaissStore
+    from student.day2.impl.sharded import ShardedStore
+
+    x = _synthetic_vectors(args.n, args.dim)
+    items = _items(args.n)
+    q = _synthetic_vectors(args.queries, args.dim, seed=1)
+    truth = None
+    print(f"N={args.n} dim={args.dim} type={args.index_type} queries={args.queries} "
+          f"threads={args.threads} cpus={os.cpu_count()}")
+    widths = (7, 8, 8, 8, 8, 8)
+    print(_fmt_row(("shards", "build s", "p50 ms", "p95 ms", "QPS", "recall"), widths))
+    for n_shards in args.shards:
+        t0 = time.perf_counter()
+        owner = np.arange(args.n) % n_shards  # 문서 해시 분할과 같은 균등 분할
+        stores = []
+        for i in range(n_shards):
+            rows = np.flatnonzero(owner == i)
+            st = FaissStore(args.dim, "", "", index_type=args.index_type)
+            st.add(x[rows], [dict(items[r]) for r in rows])
+            stores.append(st)
+        build_s = time.perf_counter() - t0
+        sharded = ShardedStore(stores)
+        lat = []
+        found = []
+        for v in q:
+            t1 = time.perf_counter()
+            hits = sharded.search(v, top_k=args.k)
+            lat.append((time.perf_counter() - t1) * 1000)
+            found.append([h["vid"] for h in hits] + [-1] * (args.k - len(hits)))
+        found = np.array(found)
+        if truth is None:
+            truth = found
+        t2 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.threads) as ex:
+            list(ex.map(lambda v: sharded.search(v, top_k=args.k), q))
+        qps = len(q) / (time.perf_counter() - t2)
+        sharded.close()
+        print(_fmt_row((n_shards, f"{build_s:.2f}", f"{np.percentile(lat, 50):.2f}", f"{np.percentile(lat, 95):.2f}",
+                        f"{qps:.0f}", f"{_recall(found, truth):.3f}"), widths))
+
+
+# ───────── 16) rwstore: 검색 스레드 여러 개 + add/upsert 동시 진행 (일관성 / 처리량) ─────────
+def bench_rwstore(args):
+    """
+    readers 개 스레드가 계속 검색하는 동안 writer 가 add 배치와 upsert(같은 벡터 재삽입) 배치를 번갈아 실행
+    검사: 결과마다 vid 가 doc_id 와 일치하고 docs 조회가 실패하지 않는지, 점수 = 질의 · 그 문서 벡터인지,
+          upsert 중인 문서를 자기 벡터로 찾으면 항상 1위로 나오는지 (삭제~재추가 사이가 보이지 않는지)
+    처리량: 쓰기 없는 구간 대비 쓰기 중 QPS, 쓰기 1건 지연(잠금 대기 포함)
+    """
+    import threading
+    from student.day2.impl.store import FaissStore, chunk_vid
+
+    total = args.n + args.add_batches * args.batch
+    x = _synthetic_vectors(total, args.dim)
+    items = _items(total)
+    row_of = {chunk_vid(it["id"]): i for i, it in enumerate(items)}
+    store = FaissStore(args.dim, "", "", index_type=args.index_type)
+    store.add(x[:args.n], [dict(it) for it in items[:args.n]])
+    rng = np.random.default_rng(1)
+    probes = rng.choice(args.n, size=min(args.n, args.batch), replace=False)  # upsert 대상 = 탐침 질의
+    q = _synthetic_vectors(args.queries, args.dim, seed=2)
+    errors: list = []
+    counts = {"reads": 0, "probe_reads": 0}
+    stop = threading.Event()
+
+    def reader(seed: int):
+        r = np.random.default_rng(seed)
+        n = 0
+        while not stop.is_set():
+            probe = n % 2 == 1
+            row = int(probes[r.integers(len(probes))]) if probe else -1
+            qv = x[row] if probe else q[r.integers(len(q))]
+            try:
+                hits = store.search(qv, top_k=args.k)
+            except Exception as e:  # docs 에 없는 id 등
+                errors.append(f"{type(e).__name__}: {e}")
+                continue
+            for h in hits:
+                i = row_of.get(h["vid"])
+                if i is None or items[i]["id"] != h["doc_id"]:
+                    errors.append(f"vid/doc 불일치 {h['vid']} {h['doc_id']}")
+                elif abs(float(x[i] @ qv) - h["score"]) > 1e-3:
+                    errors.append(f"점수 불일치 {h['vid']}")
+            if probe and (not hits or row_of.get(hits[0]["vid"]) != row):
+                errors.append(f"upsert 중 문서 누락 row={row}")
+            n += 1
+        counts["reads"] += n
+
+    def run_readers(seconds: float, writer=None):
+        stop.clear()
+        before = counts["reads"]
+        ts = [threading.Thread(target=reader, args=(i,)) for i in range(args.threads)]
+        t0 = time.perf_counter()
+        for t in ts:
+            t.start()
+        if writer is None:
+            time.sleep(seconds)
+        else:
+            writer()
+        stop.set()
+        for t in ts:
+            t.join()
+        dt = time.perf_counter() - t0
+        return (counts["reads"] - before) / dt, dt
+
+    write_lat = []
+
+    def writer():
+        base = args.n
+        for b in range(args.add_batches):
+            t0 = time.perf_counter()
+            if b % 2 == 0:
+                rows = np.arange(base, base + args.batch)
+                store.add(x[rows], [dict(items[r]) for r in rows])
+                base += args.batch
+            else:
+                store.upsert(x[probes], [dict(items[r]) for r in probes])
+            write_lat.append((time.perf_counter() - t0) * 1000)
+            time.sleep(args.write_gap_ms / 1000)
+
+    print(f"N={args.n} dim={args.dim} type={args.index_type} readers={args.threads} "
+          f"writes={args.add_batches}×{args.batch} cpus={os.cpu_count()}")
+    qps_idle, _ = run_readers(args.seconds)
+    qps_busy, dt = run_readers(0, writer)
+    expected = args.n + (args.add_batches + 1) // 2 * args.batch
+    widths = (20, 10)
+    print(_fmt_row(("reader QPS (idle)", f"{qps_idle:.0f}"), widths))
+    print(_fmt_row(("reader QPS (writes)", f"{qps_busy:.0f}"), widths))
+    print(_fmt_row(("write p50 ms", f"{np.percentile(write_lat, 50):.2f}"), widths))
+    print(_fmt_row(("write max ms", f"{max(write_lat):.2f}"), widths))
+    print(_fmt_row(("max write wait ms", f"{store._rw.stats['max_write_wait_s'] * 1000:.2f}"), widths))
+    print(_fmt_row(("writes/s", f"{len(write_lat) / dt:.1f}"), widths))
+    print(_fmt_row(("final count", f"{len(store)}/{expected}"), widths))
+    print(_fmt_row(("errors", len(errors)), widths))
+    for e in errors[:5]:
+        print("  ", e)
+
+
+# ───────── 17) tenants: index_dir 여러 개 + 메모리 예산 LRU (적중률 / 요청 지연 / 상주 메모리) ─────────
+def bench_tenants(args):
+    """
+    tenants 개 합성 인덱스에 Zipf 분포로 요청 (요청 = REGISTRY.store + 검색 1회)
+    예산별로 새 StoreRegistry: 0=무제한(전부 상주) 기준 대비 적중률, 요청 지연 p50/p99 (미스 = 로드 포함),
+    최대 상주 추정 메모리(ram), 내린 횟수. --pin 개의 상위 테넌트는 pin
+    """
+    from types import SimpleNamespace
+    from student.day2.impl.registry import StoreRegistry
+
+    rng = np.random.default_rng(0)
+    emb = SimpleNamespace(model="synthetic", dimensions=0, dim=args.dim)  # _check_dim 용 (API 호출 없음)
+    q = _synthetic_vectors(64, args.dim, seed=1)
+    ranks = np.arange(1, args.tenants + 1, dtype="float64")
+    p = ranks ** -args.zipf
+    seq = rng.choice(args.tenants, size=args.requests, p=p / p.sum())
+    with tempfile.TemporaryDirectory() as root:
+        dirs = [os.path.join(root, f"tenant_{i:03d}") for i in range(args.tenants)]
+        for i, d in enumerate(dirs):
+            _write_synthetic_index(d, args.n, args.dim)
+        print(f"tenants={args.tenants} chunks/tenant={args.n} dim={args.dim} requests={args.requests} "
+              f"zipf={args.zipf} pin={args.pin}")
+        widths = (10, 8, 8, 8, 9, 10, 9)
+        print(_fmt_row(("budget MB", "hit %", "p50 ms", "p99 ms", "evictions", "peak MB", "load ms"), widths))
+        for budget in args.budgets_mb:
+            reg = StoreRegistry(budget_mb=budget)
+            for d in dirs[:args.pin]:
+                reg.pin(d)
+            lat, peak = [], 0
+            for j, t in enumerate(seq):
+                t0 = time.perf_counter()
+                reg.store(dirs[t], emb).search(q[j % len(q)], top_k=5)
+                lat.append((time.perf_counter() - t0) * 1000)
+                peak = max(peak, reg.snapshot()["resident_bytes"]) if j % 50 == 0 else peak
+            snap = reg.snapshot()
+            peak = max(peak, snap["resident_bytes"])
+            hit = snap["hits"] / max(1, snap["hits"] + snap["misses"])
+            print(_fmt_row((budget or "∞", f"{hit * 100:.1f}", f"{np.percentile(lat, 50):.2f}",
+                            f"{np.percentile(lat, 99):.2f}", snap["evictions"], f"{peak / 2**20:.1f}",
+                            f"{snap['load_ms_p50']:.1f}"), widths))
+            reg.clear()
+
+
+# ───────── 18) route: 전체 청크 검색 vs 문서 라우팅(상위 D 문서 → 그 청크만) ─────────
+def bench_route(args):
+    """
+    주제 → 문서 → 장(section) → 청크 계층의 합성 코퍼스. 질의는 임의 청크 근처 벡터
+    flat = 전체 청크 검색, D=N = docindex 로 상위 N 문서를 고른 뒤 where={"path": ...} 사전 필터 검색
+    route ms = 문서 선택만, total ms = 선택 + 청크 검색, recall@k = 전체 정확 검색 대비
+    """
+    from student.day2.impl.store import FaissStore, chunk_vid
+    from student.day2.impl.doc_router import DocRouter
+
+    widths = (7, 8, 6, 9, 9, 10, 10)
+    print(f"chunks/doc={args.chunks_per_doc} dim={args.dim} type={args.index_type} "
+          f"queries={args.queries} k={args.k} centroids<={args.max_centroids}")
+    print(_fmt_row(("docs", "chunks", "mode", "route ms", "total ms", "p95 ms", f"recall@{args.k}"), widths))
+    for n_docs in args.docs:
+        rng = np.random.default_rng(11)
+        n = n_docs * args.chunks_per_doc
+        topics = rng.standard_normal((max(1, n_docs // 20), args.dim)).astype("float32")
+        doc_c = topics[rng.integers(0, len(topics), n_docs)] + 0.7 * rng.standard_normal(
+            (n_docs, args.dim)).astype("float32")
+        sec = np.repeat(doc_c, args.sections, axis=0) + 0.5 * rng.standard_normal(
+            (n_docs * args.sections, args.dim)).astype("float32")
+        sec_of = np.arange(n) // args.chunks_per_doc * args.sections + rng.integers(0, args.sections, n)
+        x = sec[sec_of] + 0.6 * rng.standard_normal((n, args.dim)).astype("float32")
+        x /= np.linalg.norm(x, axis=1, keepdims=True)
+        items = [{"id": f"synthetic/doc_{i // args.chunks_per_doc:06d}.md::chunk_{i % args.chunks_per_doc:04d}",
+                  "text": "", "meta": {"path": f"synthetic/doc_{i // args.chunks_per_doc:06d}.md"}}
+                 for i in range(n)]
+        store = FaissStore(args.dim, "", "", index_type=args.index_type)
+        store.add(x, items)
+        store.filters  # 필터 색인(경로 → vid)은 저장 시 만들어지므로 측정 전에 준비
+        router = DocRouter.build(store, args.max_centroids, args.chunks_per_centroid)
+
+        q = x[rng.integers(0, n, args.queries)] + 0.3 * rng.standard_normal((args.queries, args.dim)).astype("float32")
+        q /= np.linalg.norm(q, axis=1, keepdims=True)
+        vid_of = np.array([chunk_vid(it["id"]) for it in items], dtype="int64")
+        truth = [set(vid_of[np.argsort(-(x @ qv))[:args.k]].tolist()) for qv in q]
+
+        for mode in ["flat"] + [d for d in args.top_d if d < n_docs]:
+            lat, rlat, found = [], [], []
+            for qv in q:
+                t0 = time.perf_counter()
+                where = None
+                if mode != "flat":
+                    where = {"path": router.route(qv, mode)}
+                t1 = time.perf_counter()
+                res = store.search(qv, args.k, nprobe=args.nprobe, where=where)
+                lat.append(time.perf_counter() - t0)
+                rlat.append(t1 - t0)
+                found.append({h["vid"] for h in res})
+            recall = np.mean([len(f & t) / args.k for f, t in zip(found, truth)])
+            label = "flat" if mode == "flat" else f"D={mode}"
+            print(_fmt_row((n_docs, n, label, f"{np.median(rlat) * 1000:.3f}", f"{np.median(lat) * 1000:.3f}",
+                            f"{np.percentile(lat, 95) * 1000:.3f}", f"{recall:.3f}"), widths))
+
+
+# ───────── Entry ─────────
+def parse_args():
+    p = argparse.ArgumentParser(description="Day2 성능 측정")
+    sub = p.add_subparsers(dest="cmd", required=True)
+
+    e = sub.add_parser("embed", help="임베딩 동시 요청 처리량 (로컬 대체 서버)")
+    e.add_argument("--n", type=int, default=2000)
+    e.add_argument("--batch_size", type=int, default=32)
+    e.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8])
+    e.add_argument("--port", type=int, default=8765)
+    e.add_argument("--latency_ms", type=float, default=80.0)
+    e.add_argument("--server_rpm", type=float, default=0)
+    e.add_argument("--throttle_rate", type=float, default=0.05)
+    e.set_defaults(func=bench_embed)
+
+    a = sub.add_parser("ann", help="ANN 인덱스 recall@k vs 지연 (flat 기준)")
+    a.add_argument("--n", type=int, default=50000)
+    a.add_argument("--dim", type=int, default=256)
+    a.add_argument("--queries", type=int, default=200)
+    a.add_argument("--k", type=int, default=10)
+    a.set_defaults(func=bench_ann)
+
+    c = sub.add_parser("coldstart", help="일반/mmap 로드 콜드 스타트·RSS")
+    c.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    c.add_argument("--dim", type=int, default=64)
+    c.add_argument("--index_type", default="flat")
+    c.set_defaults(func=bench_coldstart)
+
+    b = sub.add_parser("batch", help="동시 질의 마이크로 배칭 처리량")
+    b.add_argument("--n", type=int, default=100_000)
+    b.add_argument("--dim", type=int, default=256)
+    b.add_argument("--queries", type=int, default=2000)
+    b.add_argument("--threads", type=int, default=32)
+    b.add_argument("--k", type=int, default=5)
+    b.add_argument("--max_batch", type=int, default=32)
+    b.add_argument("--wait_ms", type=float, nargs="+", default=[0.5, 2.0])
+    b.set_defaults(func=bench_batch)
+
+    h = sub.add_parser("hybrid", help="dense vs 하이브리드(BM25+dense) 검색")
+    h.add_argument("--n", type=int, default=20_000)
+    h.add_argument("--dim", type=int, default=256)
+    h.add_argument("--queries", type=int, default=500)
+    h.add_argument("--k", type=int, default=5)
+    h.add_argument("--pool", type=int, default=20)
+    h.add_argument("--id_noise", type=float, default=0.2, help="식별자 질의의 벡터 잡음 (클수록 dense 불리)")
+    h.add_argument("--sem_noise", type=float, default=0.03)
+    h.set_defaults(func=bench_hybrid)
+
+    mm = sub.add_parser("mmr", help="MMR λ 별 결과 다양성/지연")
+    mm.add_argument("--docs", type=int, default=5000)
+    mm.add_argument("--chunks_per_doc", type=int, default=6)
+    mm.add_argument("--dim", type=int, default=256)
+    mm.add_argument("--queries", type=int, default=300)
+    mm.add_argument("--k", type=int, default=5)
+    mm.add_argument("--pool", type=int, default=4)
+    mm.add_argument("--dup_noise", type=float, default=0.05, help="이웃 청크 간 차이 (작을수록 중복 심함)")
+    mm.add_argument("--lambdas", type=float, nargs="+", default=[1.0, 0.7, 0.5])
+    mm.set_defaults(func=bench_mmr)
+
+    ig = sub.add_parser("ingest", help="PDF 추출/청크 처리량 (순차 vs 프로세스 풀 스트리밍)")
+    ig.add_argument("--paths", nargs="+", default=[str(ROOT / "data" / "raw")])
+    ig.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    ig.add_argument("--batch_chunks", type=int, default=64)
+    ig.add_argument("--pages_per_task", type=int, default=16)
+    ig.set_defaults(func=bench_ingest)
+
+    pa = sub.add_parser("parent", help="window 청크 vs child span + 부모 창 (비용/중복)")
+    pa.add_argument("--paths", nargs="+", default=[str(ROOT / "data" / "raw")])
+    pa.add_argument("--k", type=int, default=5)
+    pa.add_argument("--queries", type=int, default=300)
+    pa.add_argument("--span_size", type=int, default=1000)
+    pa.add_argument("--parent_window", type=int, default=300)
+    pa.add_argument("--max_context", type=int, default=1200)
+    pa.set_defaults(func=bench_parent)
+
+    pr = sub.add_parser("precision", help="벡터 정밀도(fp32/fp16/sq8) + 재채점별 메모리/recall/지연")
+    pr.add_argument("--n", type=int, default=20_000)
+    pr.add_argument("--dim", type=int, default=1536)
+    pr.add_argument("--queries", type=int, default=200)
+    pr.add_argument("--k", type=int, default=10)
+    pr.add_argument("--types", nargs="+", default=["flat", "hnsw"])
+    pr.add_argument("--rescore", type=int, nargs="+", default=[0, 4])
+    pr.set_defaults(func=bench_precision)
+
+    di = sub.add_parser("dims", help="차원 축소(절단/PCA)별 recall/지연/크기")
+    di.add_argument("--n", type=int, default=20_000)
+    di.add_argument("--dim", type=int, default=1536)
+    di.add_argument("--rank", type=int, default=256, help="합성 임베딩의 내재 차원")
+    di.add_argument("--noise", type=float, default=0.3)
+    di.add_argument("--queries", type=int, default=200)
+    di.add_argument("--k", type=int, default=10)
+    di.add_argument("--dims", type=int, nargs="+", default=[768, 256, 128])
+    di.set_defaults(func=bench_dims)
+
+    fi = sub.add_parser("filter", help="메타데이터 필터: 사후 필터 vs IDSelector 사전 필터")
+    fi.add_argument("--n", type=int, default=100_000)
+    fi.add_argument("--dim", type=int, default=256)
+    fi.add_argument("--queries", type=int, default=200)
+    fi.add_argument("--k", type=int, default=10)
+    fi.add_argument("--over", type=int, default=10, help="사후 필터 over-fetch 배수")
+    fi.add_argument("--types", nargs="+", default=["flat", "hnsw"])
+    fi.add_argument("--selectivity", type=float, nargs="+", default=[1.0, 0.1, 0.01, 0.001])
+    fi.set_defaults(func=bench_filter)
+
+    ds = sub.add_parser("docstore", help="docs.jsonl vs 컬럼형 docs.col 로드 시간/RSS/조회")
+    ds.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    ds.add_argument("--dim", type=int, default=16, help="벡터는 작게 → RSS 차이가 docs 에서 오도록")
+    ds.set_defaults(func=bench_docstore)
+
+    qc = sub.add_parser("qcache", help="질의 결과 캐시: 완전 일치/의미 유사 적중률·지연·결과 일치도")
+    qc.add_argument("--n", type=int, default=20_000)
+    qc.add_argument("--dim", type=int, default=256)
+    qc.add_argument("--queries", type=int, default=1000)
+    qc.add_argument("--k", type=int, default=5)
+    qc.add_argument("--topics", type=int, default=200)
+    qc.add_argument("--zipf", type=float, default=1.1, help="주제 인기 분포 지수")
+    qc.add_argument("--repeat", type=float, default=0.3, help="같은 문장 반복 비율")
+    qc.add_argument("--novel", type=float, default=0.2, help="새 질문 비율")
+    qc.add_argument("--para_noise", type=float, default=0.15, help="바꿔 말하기 잡음 (0.15 → 코사인 ≈ 0.99)")
+    qc.add_argument("--embed_ms", type=float, default=20.0, help="임베딩 호출 지연 흉내")
+    qc.add_argument("--capacity", type=int, default=1024)
+    qc.add_argument("--thresholds", type=float, nargs="+", default=[0.95, 0.98, 0.995])
+    qc.set_defaults(func=bench_qcache)
+
+    sh = sub.add_parser("shards", help="샤드 수별 팬아웃 검색 지연/처리량/recall")
+    sh.add_argument("--n", type=int, default=200_000)
+    sh.add_argument("--dim", type=int, default=256)
+    sh.add_argument("--queries", type=int, default=300)
+    sh.add_argument("--k", type=int, default=10)
+    sh.add_argument("--threads", type=int, default=8)
+    sh.add_argument("--index_type", default="flat")
+    sh.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4, 8])
+    sh.set_defaults(func=bench_shards)
+
+    rw = sub.add_parser("rwstore", help="동시 검색 + add/upsert 스트레스 (일관성/처리량)")
+    rw.add_argument("--n", type=int, default=50_000)
+    rw.add_argument("--dim", type=int, default=128)
+    rw.add_argument("--queries", type=int, default=1000)
+    rw.add_argument("--k", type=int, default=5)
+    rw.add_argument("--threads", type=int, default=8, help="검색 스레드 수")
+    rw.add_argument("--index_type", default="flat")
+    rw.add_argument("--add_batches", type=int, default=200, help="쓰기 횟수 (짝수 번째 add, 홀수 번째 upsert)")
+    rw.add_argument("--batch", type=int, default=256)
+    rw.add_argument("--write_gap_ms", type=float, default=5.0)
+    rw.add_argument("--seconds", type=float, default=3.0, help="쓰기 없는 기준 구간 길이")
+    rw.set_defaults(func=bench_rwstore)
+
+    te = sub.add_parser("tenants", help="여러 index_dir + 메모리 예산 LRU: 적중률/지연/상주 메모리")
+    te.add_argument("--tenants", type=int, default=12)
+    te.add_argument("--n", type=int, default=20_000, help="테넌트당 청크 수")
+    te.add_argument("--dim", type=int, default=256)
+    te.add_argument("--requests", type=int, default=3000)
+    te.add_argument("--zipf", type=float, default=1.1, help="테넌트 인기 분포 지수")
+    te.add_argument("--pin", type=int, default=0, help="pin 할 상위 테넌트 수")
+    te.add_argument("--budgets_mb", type=float, nargs="+", default=[0, 120, 60, 30])
+    te.set_defaults(func=bench_tenants)
+
+    ro = sub.add_parser("route", help="문서 라우팅(상위 D 문서 → 청크) vs 전체 청크 검색: 지연/recall")
+    ro.add_argument("--docs", type=int, nargs="+", default=[500, 2000, 8000], help="문서 수 (코퍼스 크기)")
+    ro.add_argument("--chunks_per_doc", type=int, default=40)
+    ro.add_argument("--sections", type=int, default=4, help="문서당 장(주제) 수")
+    ro.add_argument("--dim", type=int, default=256)
+    ro.add_argument("--queries", type=int, default=200)
+    ro.add_argument("--k", type=int, default=5)
+    ro.add_argument("--index_type", default="flat")
+    ro.add_argument("--nprobe", type=int, default=16)
+    ro.add_argument("--top_d", type=int, nargs="+", default=[5, 20, 50])
+    ro.add_argument("--max_centroids", type=int, default=4)
+    ro.add_argument("--chunks_per_centroid", type=int, default=16)
+    ro.set_defaults(func=bench_route)
+
+    lo = sub.add_parser("_load_once")
+    lo.add_argument("--index_dir", required=True)
+    lo.add_argument("--mmap", action="store_true")
+    lo.set_defaults(func=_load_once)
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
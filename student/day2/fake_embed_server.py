@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+Day2 로컬 대체 임베딩 서버 (OpenAI /v1/embeddings 호환, 개발/부하 시험용)
+- 텍스트 해시로 결정적인 단위 벡터 반환 → API 비용 없이 인덱싱/동시성 시험
+- 스로틀 주입: 서버측 rpm 한도 초과 또는 확률(--throttle_rate)로 429 + Retry-After
+
+실행:
+  python -m student.day2.fake_embed_server --port 8765 --rpm 600 --throttle_rate 0.05
+  OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=dummy \\
+    python -m student.day2.impl.build_index --paths data/raw --index_dir /tmp/day2 --concurrency 8
+"""
+
+from __future__ import annotations
+import argparse, base64, hashlib, json, random, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any
+
+import numpy as np
+
+
+def fake_vector(text: str, dim: int) -> np.ndarray:
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    v = np.random.default_rng(seed).standard_normal(dim).astype("float32")
+    return v / (np.linalg.norm(v) + 1e-12)
+
+
+class _State:
+    def __init__(self, dim: int, rpm: float, throttle_rate: float, latency_ms: float):
+        self.dim = dim
+        self.rpm = rpm
+        self.throttle_rate = throttle_rate
+        self.latency_s = latency_ms / 1000.0
+        self.lock = threading.Lock()
+        self.window: list[float] = []  # 최근 60초 요청 시각
+        self.stats: Dict[str, Any] = {"requests": 0, "inputs": 0, "throttled": 0}
+
+    def admit(self) -> bool:
+        now = time.monotonic()
+        with self.lock:
+            self.stats["requests"] += 1
+            self.window = [t for t in self.window if now - t < 60.0]
+            over = self.rpm > 0 and len(self.window) >= self.rpm
+            if over or random.random() < self.throttle_rate:
+                self.stats["throttled"] += 1
+                return False
+            self.window.append(now)
+            return True
+
+
+def make_handler(state: _State):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):  # 조용히
+            pass
+
+        def _send(self, code: int, body: Dict[str, Any], headers: Dict[str, str] | None = None):
+            raw = json.dumps(body).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(raw)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(raw)
+
+        def do_GET(self):
+            if self.path.rstrip("/").endswith("/stats"):
+                with state.lock:
+                    return self._send(200, dict(state.stats))
+            self._send(404, {"error": {"message": "not found"}})
+
+        def do_POST(self):
+            if not self.path.rstrip("/").endswith("/embeddings"):
+                return self._send(404, {"error": {"message": "not found"}})
+            n = int(self.headers.get("Content-Length", "0"))
+            req = json.loads(self.rfile.read(n) or b"{}")
+            if not state.admit():
+                return self._send(429, {"error": {"message": "Rate limit reached (fake)", "type": "requests"}},
+                                  {"retry-after": "0.2"})
+            inputs = req.get("input", [])
+            if isinstance(inputs, str):
+                inputs = [inputs]
+            dim = int(req.get("dimensions") or state.dim)
+            b64 = req.get("encoding_format") == "base64"
+            data, total = [], 0
+            for i, t in enumerate(inputs):
+                v = fake_vector(str(t), dim)
+                emb = base64.b64encode(v.astype("<f4").tobytes()).decode("ascii") if b64 else v.tolist()
+                data.append({"object": "embedding", "index": i, "embedding": emb})
+                total += max(1, len(str(t)) // 2)
+            with state.lock:
+                state.stats["inputs"] += len(inputs)
+            if state.latency_s:
+                time.sleep(state.latency_s)
+            self._send(200, {"object": "list", "data": data, "model": req.get("model", ""),
+                             "usage": {"prompt_tokens": total, "total_tokens": total}})
+
+    return Handler
+
+
+def serve(host: str = "127.0.0.1", port: int = 8765, dim: int = 1536, rpm: float = 0,
+          throttle_rate: float = 0.0, latency_ms: float = 0.0) -> ThreadingHTTPServer:
+    """백그라운드 스레드에서 서버 시작 후 반환 (server.shutdown() 으로 종료)"""
+    state = _State(dim, rpm, throttle_rate, latency_ms)
+    server = ThreadingHTTPServer((host, port), make_handler(state))
+    server.state = state  # type: ignore[attr-defined]
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="로컬 대체 임베딩 서버")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--dim", type=int, default=1536)
+    ap.add_argument("--rpm", type=float, default=0, help="서버측 분당 요청 한도 (0=무제한)")
+    ap.add_argument("--throttle_rate", type=float, default=0.0, help="무작위 429 비율")
+    ap.add_argument("--latency_ms", type=float, default=50.0, help="요청당 인위적 지연")
+    args = ap.parse_args()
+    srv = serve(args.host, args.port, args.dim, args.rpm, args.throttle_rate, args.latency_ms)
+    print(f"[OK] fake embeddings → http://{args.host}:{args.port}/v1 (dim={args.dim})")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        srv.shutdown()
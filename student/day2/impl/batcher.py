@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+동시 질의 마이크로 배칭
+- 짧은 시간창(max_wait_ms) 안에 들어온 질의를 최대 max_batch 개까지 모아 store.search_batch 1회로 처리
+- 결과는 질의별 Future 로 돌려줌. 같은 (nprobe, ef_search, 필터) 끼리만 묶고 top_k 는 최대값으로 검색 후 잘라냄
+- close() 뒤의 submit 은 큐를 거치지 않고 호출 스레드에서 store.search_batch 로 바로 처리
+  (레지스트리가 교체/축출로 닫은 배처를 아직 쥐고 있는 요청이 멈추지 않도록)
+  close() 시점에 큐에 있던 질의도 실패시키지 않고 모두 처리 (작업 스레드가 늦으면 close 호출 스레드가 직접)
+"""
+
+from __future__ import annotations
+import json, time, queue, threading
+from concurrent.futures import Future
+from typing import Dict, Any, List, Tuple
+
+import numpy as np
+
+_STOP = object()
+RESULT_TIMEOUT_S = 30.0  # search() 가 결과를 기다리는 상한
+CLOSE_JOIN_S = 5.0       # close() 가 작업 스레드의 큐 비우기를 기다리는 시간 (넘으면 남은 질의를 직접 처리)
+
+
+class SearchBatcher:
+    def __init__(self, store, max_batch: int = 32, max_wait_ms: float = 2.0,
+                 timeout_s: float = RESULT_TIMEOUT_S):
+        self.store = store
+        self.timeout_s = timeout_s
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait_s = max_wait_ms / 1000.0
+        self._q: "queue.Queue" = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self.stats: Dict[str, Any] = {"queries": 0, "batches": 0, "max_batch_seen": 0,
+                                      "max_queue_depth": 0, "wait_s_total": 0.0, "direct_after_close": 0}
+        self._thread = threading.Thread(target=self._loop, name="day2-search-batcher", daemon=True)
+        self._thread.start()
+
+    # ---------- API ----------
+    def submit(self, query_vec: np.ndarray, top_k: int = 5, nprobe: int = 0, ef_search: int = 0,
+               where: Dict[str, Any] | None = None) -> Future:
+        fut: Future = Future()
+        qv = np.asarray(query_vec, dtype="float32").reshape(-1)
+        wkey = json.dumps(where, sort_keys=True, ensure_ascii=False) if where else ""
+        with self._lock:  # 닫힘 확인과 큐 삽입을 한 번에 → close 이후 큐에 남는 요청이 없음
+            closed = self._closed
+            if not closed:
+                self._q.put((qv, int(top_k), (int(nprobe), int(ef_search), wkey), fut, time.perf_counter(),
+                             where or None))
+                self.stats["max_queue_depth"] = max(self.stats["max_queue_depth"], self._q.qsize())
+            else:
+                self.stats["direct_after_close"] += 1
+        if closed:
+            try:
+                fut.set_result(self.store.search_batch(qv[None, :], int(top_k), nprobe=nprobe,
+                                                       ef_search=ef_search, where=where or None)[0])
+            except Exception as e:
+                fut.set_exception(e)
+        return fut
+
+    def search(self, query_vec: np.ndarray, top_k: int = 5, nprobe: int = 0, ef_search: int = 0,
+               where: Dict[str, Any] | None = None):
+        """submit 후 결과를 기다리는 동기 버전 (store.search 와 같은 반환 형식). timeout_s 를 넘으면 TimeoutError"""
+        return self.submit(query_vec, top_k, nprobe, ef_search, where).result(timeout=self.timeout_s)
+
+    def queue_depth(self) -> int:
+        return self._q.qsize()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            out = dict(self.stats)
+        out["queue_depth"] = self._q.qsize()
+        out["mean_batch"] = out["queries"] / out["batches"] if out["batches"] else 0.0
+        out["mean_wait_ms"] = out["wait_s_total"] / out["queries"] * 1000 if out["queries"] else 0.0
+        return out
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def close(self):
+        """새 질의는 직접 검색으로 돌리고, 이미 큐에 있던 질의는 모두 처리한 뒤 반환 (여러 번 호출해도 안전)"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._q.put(_STOP)
+        self._thread.join(timeout=CLOSE_JOIN_S)
+        # 작업 스레드가 아직 앞 배치를 처리 중이면 남은 질의는 여기서 (같은 스토어로) 처리
+        left = []
+        while True:
+            try:
+                item = self._q.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                left.append(item)
+        if left:
+            self._run(left)
+
+    # ---------- 내부 ----------
+    def _collect(self, first) -> Tuple[List[tuple], bool]:
+        """첫 질의 이후 시간창/최대 개수까지 추가로 모음"""
+        batch, stop = [first], False
+        deadline = time.perf_counter() + self.max_wait_s
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._q.get(timeout=remaining) if remaining > 0 else self._q.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                stop = True
+                break
+            batch.append(item)
+        return batch, stop
+
+    def _run(self, batch: List[tuple]):
+        groups: Dict[Tuple[int, int, str], List[tuple]] = {}
+        for item in batch:
+            groups.setdefault(item[2], []).append(item)
+        now = time.perf_counter()
+        for (nprobe, ef_search, _), items in groups.items():
+            live = [it for it in items if it[3].set_running_or_notify_cancel()]
+            if not live:
+                continue
+            k = max(it[1] for it in live)
+            try:
+                results = self.store.search_batch(np.vstack([it[0] for it in live]), k,
+                                                  nprobe=nprobe, ef_search=ef_search, where=live[0][5])
+            except Exception as e:
+                for it in live:
+                    it[3].set_exception(e)
+                continue
+            for it, res in zip(live, results):
+                it[3].set_result(res[:it[1]])
+        with self._lock:
+            self.stats["queries"] += len(batch)
+            self.stats["batches"] += 1
+            self.stats["max_batch_seen"] = max(self.stats["max_batch_seen"], len(batch))
+            self.stats["wait_s_total"] += sum(now - it[4] for it in batch)
+
+    def _loop(self):
+        while True:
+            first = self._q.get()
+            if first is _STOP:
+                return
+            batch, stop = self._collect(first)
+            self._run(batch)
+            if stop:
+                return
@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 """
 Day2 인덱싱 엔트리포인트
-- 목표: 코퍼스 생성 → 임베딩 → FAISS 저장 + docs.jsonl 저장
+- 목표: 코퍼스 생성 → 임베딩 → FAISS 저장 + docs 저장(docs.col, docstore.py)
 """
 import os, sys
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
@@ -14,27 +14,249 @@ except Exception:
     pass
 
 
-import argparse, numpy as np
-from typing import List
+import argparse, time, shutil, numpy as np
+from typing import List, Dict
 
-from student.day2.impl.ingest import build_corpus, save_docs_jsonl
-from student.day2.impl.embeddings import Embeddings
-from student.day2.impl.store import FaissStore  # 제공됨
+from student.day2.impl.ingest import collect_files
+from student.day2.impl.pipeline import iter_corpus_batches, report_pipeline
+from student.day2.impl.manifest import load_manifest, new_manifest, save_manifest, diff_files
+from student.day2.impl.embeddings import Embeddings, estimate_tokens
+from student.day2.impl.dedup import Deduper
+from student.day2.impl.doctext import DocTextStore, DOCTEXT_DIRNAME
+from student.day2.impl.store import FaissStore, chunk_vid  # 제공됨
+from student.day2.impl.docstore import docs_exist
+from student.day2.impl.index_factory import precision_of, resolve_index_type, default_params
+from student.day2.impl.dimreduce import PcaReducer, reduce_config, reducer_path
+from student.day2.impl.lexical import build_lexical
+from student.day2.impl.doc_router import DocRouter, build_doc_index, doc_index_path
+from student.day2.impl.checkpoint import BuildJournal, make_build_key
+from student.day2.impl.sharded import (
+    ShardedStore, shard_of, shard_dir, read_shards, write_shards, shard_index_dims, check_shard_dims,
+    SHARDS_FILENAME, SHARDS_DIRNAME,
+)
+from student.day2.impl.versions import (
+    resolve_index_dir, staging_dir, publish, gc_versions, current_version, KEEP_VERSIONS,
+)
 
 
-def build_index(paths: List[str], index_dir: str, model: str | None = None, batch_size: int = 128):
+# 학습이 필요한 새 인덱스(auto/ivf_*/sq8/pca): 이만큼 모아 학습·생성한 뒤 나머지 배치는 바로 삽입 (메모리 상한)
+TRAIN_CHUNKS = 50_000
+
+
+def _report_throughput(emb: Embeddings, n_chunks: int, elapsed: float):
+    """임베딩 단계 처리량 출력 (chunks/sec, requests/sec)"""
+    st = emb.stats
+    elapsed = max(elapsed, 1e-9)
+    print(f"[EMB] {n_chunks} chunks / {st['requests']} requests in {elapsed:.2f}s "
+          f"→ {n_chunks / elapsed:.1f} chunks/s, {st['requests'] / elapsed:.2f} req/s "
+          f"(retries={st['retries']}, throttled={st['throttled']}, est_tokens={st['est_tokens']})")
+    if emb.cache is not None:
+        print(f"[EMB] cache hit rate {emb.cache_hit_rate():.1%} "
+              f"({st['cache_hits']} hits / {st['cache_misses']} misses, {len(emb.cache)} cached rows)")
+    if emb.aimd is not None:
+        print(f"[EMB] concurrency limit={emb.aimd.limit}/{emb.aimd.max_limit} {emb.aimd.stats}")
+
+
+def _drop_alias_refs(store: FaissStore, known: Dict, paths: List[str]):
+    """다시 처리/삭제되는 파일을 가리키던 대표 청크의 aliases 항목 정리"""
+    for fp in paths:
+        for vid in known[fp].get("aliases", []):
+            rec = store.docs.get(vid)
+            if rec is not None and rec["meta"].get("aliases"):
+                rec["meta"]["aliases"] = [a for a in rec["meta"]["aliases"] if a["path"] != fp]
+                store.docs[vid] = rec  # 컬럼형 docs 는 조회마다 새 dict → 다시 넣어야 반영
+
+
+def _report_dedup(deduper: Deduper, emb: Embeddings):
+    """중복 제거로 아낀 임베딩 토큰/인덱스 용량 (벡터 float32 + 평균 레코드 크기 기준 추정)"""
+    st = deduper.stats
+    if not st["seen"]:
+        return
+    saved_tokens = sum(estimate_tokens(dup["text"]) for dup, _ in deduper.aliases)
+    saved_bytes = st["dropped"] * emb.dim * 4 + int(st["chars_dropped"] * 1.5)
+    print(f"[DEDUP] dropped {st['dropped']}/{st['seen']} chunks ({st['dropped'] / st['seen']:.1%}; "
+          f"exact={st['exact']}, near={st['near']}) → saved ~{saved_tokens} embedding tokens, "
+          f"~{saved_bytes / 1024 / 1024:.2f} MB index")
+
+
+def _reduce_key(conf: Dict | None):
+    return (conf["method"], conf["dim"]) if conf else None
+
+
+def _retarget(store: FaissStore, index_type: str, index_params: Dict | None) -> bool:
+    """
+    증분 빌드 후 최종 청크 수로 종류/nlist 를 다시 정함 → 바뀌었으면 저장 벡터로 재학습 (재임베딩 없음)
+    - auto: 규모가 임계를 넘으면 flat → ivf_flat
+    - IVF nlist: --nlist 를 바꿨으면 그 값, auto 면 지금 규모의 기본값과 2배 이상 어긋날 때만 (매 빌드 재학습 방지)
+    """
+    n = len(store)
+    kind = resolve_index_type(index_type, n)
+    user = dict(index_params or {})
+    if kind == store.index_type and kind.startswith("ivf"):
+        have = int(store.index_params.get("nlist") or 0)
+        if "nlist" in user:
+            if have == int(user["nlist"]):
+                return False
+        elif index_type != "auto":
+            return False
+        else:
+            want = default_params(kind, store.dim, n)["nlist"]
+            if want / 2 <= have <= want * 2:
+                return False
+    elif kind == store.index_type:
+        return False
+    keep = {k: store.index_params[k] for k in ("precision", "rescore") if k in store.index_params}
+    t0 = time.perf_counter()
+    prev = (store.index_type, store.index_params.get("nlist"))
+    store.retrain(kind, {**keep, **user})
+    print(f"[RETRAIN] {prev[0]}(nlist={prev[1]}) → {store.index_type}(nlist={store.index_params.get('nlist')}) "
+          f"@ {n} chunks in {time.perf_counter() - t0:.2f}s")
+    return True
+
+
+def _shared_reducer(files: List[str], index_dir: str, emb: Embeddings, kw: Dict, reuse: bool) -> PcaReducer:
+    """
+    샤드 공통 PCA: 샤드마다 따로 학습하면 축소 공간이 샤드별로 달라 병합 점수/MMR 이 어긋나고, 작은 샤드는 학습도 못 함
+    reuse 면 기존 index_dir/reducer.pca 그대로, 아니면 전체 파일 앞쪽 TRAIN_CHUNKS 개 청크로 한 번 학습
+    (샤드 빌드가 같은 청크를 다시 임베딩할 때는 임베딩 캐시 적중)
+    """
+    if reuse and os.path.exists(reducer_path(index_dir)):
+        return PcaReducer.load(index_dir)
+    vecs: List[np.ndarray] = []
+    n = 0
+    batches = iter_corpus_batches(files, batch_chunks=kw["batch_chunks"], workers=kw["workers"],
+                                  chunk_mode=kw["chunk_mode"], span_size=kw["span_size"])
+    for batch in batches:
+        vecs.append(emb.encode([it["text"] for it in batch]))
+        n += len(batch)
+        if n >= TRAIN_CHUNKS:
+            break
+    batches.close()
+    reducer = PcaReducer.fit(np.vstack(vecs) if vecs else np.zeros((0, emb.dim), dtype="float32"), kw["dimensions"])
+    reducer.save(index_dir)
+    print(f"[PCA] shared by all shards: {reducer.d_in}D → {reducer.d_out}D, "
+          f"explained variance {reducer.explained():.1%} (fit on {n} chunks)")
+    return reducer
+
+
+def _build_sharded(paths: List[str], index_dir: str, n_shards: int, only_shard: int | None, kw: Dict):
+    """
+    파일을 shard_of(path) 로 나눠 샤드 디렉토리마다 build_index. BM25 는 전체 샤드 청크로 최상위에 하나
+    --reduce pca 면 reducer 하나를 먼저 학습해 모든 샤드가 공유 (다른 reducer 로 만든 샤드는 전체 재생성)
+    """
+    conf = read_shards(index_dir)
+    full_all = only_shard is None and kw["full"]
+    if conf is not None and conf["n_shards"] != n_shards:
+        print(f"[SHARD] 샤드 수 변경 {conf['n_shards']} → {n_shards}: 전체 재생성")
+        shutil.rmtree(os.path.join(index_dir, SHARDS_DIRNAME), ignore_errors=True)
+        only_shard, full_all = None, True
+    if only_shard is not None and not 0 <= only_shard < n_shards:
+        raise ValueError(f"--shard 는 0..{n_shards - 1} 범위여야 합니다: {only_shard}")
+    files = collect_files(paths)
+    groups: Dict[int, List[str]] = {i: [] for i in range(n_shards)}
+    for fp in files:
+        groups[shard_of(fp, n_shards)].append(fp)
+    reducer, shared_conf = None, None
+    if kw["reduce"] == "pca" and kw["dimensions"]:
+        emb = Embeddings(model=kw["model"], batch_size=kw["batch_size"], concurrency=kw["concurrency"],
+                         rpm=kw["rpm"], tpm=kw["tpm"])
+        shared_conf = dict(reduce_config("pca", kw["dimensions"]), embedding_model=emb.model)
+        reuse = not full_all and conf is not None and conf.get("reduce") == shared_conf
+        reducer = _shared_reducer(files, index_dir, emb, kw, reuse)
+    # 빈 샤드는 벡터로 차원을 알 수 없음 → 파일이 있는 샤드부터 빌드하고 그 차원으로 만듦
+    # (모델 표의 차원은 실제 임베딩 차원과 다를 수 있음: dimensions 파라미터, 호환 API 등)
+    todo = [i for i in range(n_shards) if only_shard is None or i == only_shard]
+    for i in sorted(todo, key=lambda i: not groups[i]):
+        empty_dim = 0
+        if not groups[i]:
+            dims = shard_index_dims(index_dir, n_shards)
+            dims.pop(i, None)
+            empty_dim = next(iter(dims.values()), 0)
+        print(f"[SHARD {i}/{n_shards}] {len(groups[i])} files → {shard_dir(index_dir, i)}")
+        build_index(groups[i], shard_dir(index_dir, i), **kw, pca_reducer=reducer, empty_dim=empty_dim)
+    check_shard_dims(shard_index_dims(index_dir, n_shards), index_dir)
+    write_shards(index_dir, n_shards, reduce=shared_conf)
+    t0 = time.perf_counter()
+    store = ShardedStore.load(index_dir)
+    lex = build_lexical(index_dir, store.docs)
+    print(f"[BM25] {lex.stats()} in {time.perf_counter() - t0:.2f}s (all shards)")
+    parts = [doc_index_path(shard_dir(index_dir, i)) for i in range(n_shards)]
+    if kw["doc_centroids"] > 0 and all(os.path.exists(p) for p in parts):
+        DocRouter.concat([DocRouter.load(p) for p in parts]).save(doc_index_path(index_dir))
+    else:
+        build_doc_index(index_dir, store, kw["doc_centroids"])
+    store.close()
+    print(f"[OK] {n_shards} shards, {len(store)} chunks → {index_dir}")
+
+
+def _build_versioned(paths: List[str], index_dir: str, keep: int, kw: Dict):
+    """versions/_next 에 빌드(증분이면 현재 버전 하드링크 복제가 기준) → 게시(CURRENT 교체) → 이전 버전 GC"""
+    base, cur = resolve_index_dir(index_dir)
+    stage = staging_dir(index_dir, None if kw["full"] else base)
+    print(f"[VERSION] building {stage} (base={'-' if kw['full'] else cur or index_dir})")
+    build_index(paths, stage, **kw)
+    name = publish(index_dir)
+    removed = gc_versions(index_dir, keep=keep)
+    print(f"[VERSION] CURRENT {cur or '-'} → {name}" + (f", removed {removed}" if removed else ""))
+
+
+def build_index(paths: List[str], index_dir: str, model: str | None = None, batch_size: int = 128,
+                concurrency: int = 1, rpm: float | None = None, tpm: float | None = None,
+                full: bool = False, index_type: str = "auto", index_params: Dict | None = None,
+                workers: int | None = None, batch_chunks: int = 1024, dedup: float = 0.0,
+                chunk_mode: str = "window", span_size: int = 1000,
+                dimensions: int = 0, reduce: str = "api", docs_format: str = "columnar",
+                shards: int = 0, only_shard: int | None = None,
+                versioned: bool = False, keep_versions: int = KEEP_VERSIONS, doc_centroids: int = 4,
+                pca_reducer: PcaReducer | None = None, empty_dim: int = 0):
     """
     절차:
       1) corpus = build_corpus(paths)
          - [{"id":..., "text":..., "meta":{...}}, ...]
+         - 실제로는 pipeline.iter_corpus_batches 로 같은 청크를 배치 단위 스트리밍 (1~5 를 배치마다 반복)
       2) texts = [item["text"] for item in corpus]
       3) emb = Embeddings(model=model, batch_size=batch_size)
          vecs = emb.encode(texts)  # (N, D) L2 정규화된 np.ndarray
+         - concurrency > 1 이면 배치를 동시에 요청 (rpm/tpm 제한, 429 시 자동 감속)
       4) index_path = os.path.join(index_dir, "faiss.index")
          docs_path  = os.path.join(index_dir, "docs.jsonl")
       5) store = FaissStore(dim=vecs.shape[1], index_path=index_path, docs_path=docs_path)
-         store.add(vecs, corpus); store.save()
-      6) save_docs_jsonl(corpus, docs_path)
+         store.add(vecs, corpus); store.save()   # docs.jsonl 도 store.save 가 기록
+      6) bm25.npz: 하이브리드 검색용 BM25 역색인 (lexical.build_lexical)
+
+    증분 모드(기본): manifest.json 과 비교해 추가/변경 파일만 청크·임베딩하고,
+    변경/삭제 파일의 기존 청크는 store.remove_ids 로 제거. full=True 면 전체 재생성
+
+    index_type: auto(기본: 소규모 flat, 대규모 ivf_flat) | flat | hnsw | ivf_flat | ivf_pq
+    기존 인덱스와 다른 종류를 명시하면 전체 재생성. 증분 후 auto 해석 결과/IVF nlist 가 바뀌면 저장 벡터로 재학습
+    index_params["precision"]: fp32 | fp16 | sq8 (다르면 전체 재생성), ["rescore"]: 재채점 배수 (증분에도 반영)
+
+    workers: 텍스트 추출 프로세스 수 (None=CPU 수, 1=순차), batch_chunks: 임베딩/삽입 단위 청크 수
+
+    dedup: 근사 중복 청크 제거 임계값 (MinHash 자카드 추정, 기본 0=끔, 예: 0.9). 버린 청크는 남긴 청크 meta["aliases"]
+           증분이면 인덱스에 이미 있는 청크도 대표 후보로 등록 (새 파일이 기존 청크와 겹치면 버림)
+
+    chunk_mode: window(기본, 1200자 창 + 200자 겹침) | child(겹치지 않는 span_size 자 구간 + doctext/ 원문 저장,
+                질의 시 Day2Plan.parent_window 만큼 넓혀 반환). 기존 인덱스와 다르면 전체 재생성
+
+    dimensions/reduce: 차원 축소 (0=모델 기본). api=임베딩 API dimensions 파라미터,
+                       pca=전체 벡터로 PCA 학습 후 reducer.pca 저장(질의에도 같은 변환). 설정이 바뀌면 전체 재생성
+    pca_reducer: 샤드 빌드용. 학습하지 않고 이 reducer 를 사용 (기존 인덱스의 reducer 가 다르면 전체 재생성)
+    empty_dim: 샤드 빌드용. 청크가 하나도 없을 때 만들 인덱스 차원 (형제 샤드와 맞춤, 0=모델 기본 차원)
+
+    docs_format: columnar(기본, docs.col mmap) | jsonl(docs.jsonl). 바뀌면 벡터는 그대로 두고 docs 만 새 형식으로 저장
+
+    shards: N > 0 이면 문서 경로 해시로 N 개 샤드 인덱스(index_dir/shards/shard_NNN) 를 각각 증분 빌드 (sharded.py)
+            샤드 수가 바뀌면 전체 재생성. only_shard: 그 샤드만 다시 빌드 (--full 과 함께 쓰면 그 샤드만 전체 재생성)
+
+    versioned: index_dir/versions/<이름>/ 에 새 버전을 만들고 CURRENT 를 원자적으로 교체 (versions.py)
+               한 번 버전 인덱스가 된 디렉토리는 이후 빌드도 자동으로 버전 방식. 서비스 중인 버전 파일은 건드리지 않음
+               keep_versions: GC 후 남길 최근 버전 수 (서비스 프로세스가 사용 중인 버전은 항상 남김)
+
+    doc_centroids: 문서(meta.path)별 최대 중심 벡터 수 → docindex.npz (Day2Plan.route_docs 문서 라우팅용, 0=안 만듦)
+
+    재개: 임베딩된 배치는 index_dir/.build 에 세그먼트로 즉시 기록(checkpoint.BuildJournal).
+    중간에 실패해도 같은 인자로 다시 실행하면 기록된 세그먼트는 재임베딩 없이 이어서 진행
     """
     # ----------------------------------------------------------------------------
     # TODO[DAY2-I-01] 구현 지침
@@ -44,25 +266,196 @@ def build_index(paths: List[str], index_dir: str, model: str | None = None, batc
     #  - vecs = emb.encode(texts)
     #  - os.makedirs(index_dir, exist_ok=True)
     #  - store = FaissStore(...); store.add(...); store.save()
-    #  - save_docs_jsonl(corpus, docs_path)
     # ----------------------------------------------------------------------------
     # 정답 구현:
-    corpus = build_corpus(paths)
-    texts = [it["text"] for it in corpus]
-
-    emb = Embeddings(model=model, batch_size=batch_size)
-    vecs = emb.encode(texts)  # (N, D), 이미 L2 정규화됨
-
     os.makedirs(index_dir, exist_ok=True)
+    kw = dict(model=model, batch_size=batch_size, concurrency=concurrency, rpm=rpm, tpm=tpm, full=full,
+              index_type=index_type, index_params=index_params, workers=workers, batch_chunks=batch_chunks,
+              dedup=dedup, chunk_mode=chunk_mode, span_size=span_size, dimensions=dimensions, reduce=reduce,
+              docs_format=docs_format, doc_centroids=doc_centroids)
+    if versioned or current_version(index_dir) is not None:
+        return _build_versioned(paths, index_dir, keep_versions, dict(kw, shards=shards, only_shard=only_shard))
+    if shards > 0:
+        return _build_sharded(paths, index_dir, shards, only_shard, kw)
+    if read_shards(index_dir) is not None:  # 샤드 인덱스였던 디렉토리 → 단일 인덱스로 전환
+        os.remove(os.path.join(index_dir, SHARDS_FILENAME))
+        shutil.rmtree(os.path.join(index_dir, SHARDS_DIRNAME), ignore_errors=True)
     index_path = os.path.join(index_dir, "faiss.index")
     docs_path = os.path.join(index_dir, "docs.jsonl")
+    want_reduce = reduce_config(reduce, dimensions)
+    emb = Embeddings(model=model, batch_size=batch_size, concurrency=concurrency, rpm=rpm, tpm=tpm,
+                     dimensions=dimensions if reduce == "api" else None)
+    pca_dim = dimensions if want_reduce and reduce == "pca" else 0
+    chunking = {"mode": "child", "span_size": span_size} if chunk_mode == "child" else {"mode": "window"}
+
+    # 기존 인덱스 + 매니페스트가 같은 모델로 만들어졌을 때만 증분
+    manifest = None if full else load_manifest(index_dir)
+    store: FaissStore | None = None
+    if manifest is not None and manifest.get("embedding_model") == emb.model \
+            and os.path.exists(index_path) and docs_exist(docs_path):
+        store = FaissStore.load(index_path, docs_path)
+        want_precision = (index_params or {}).get("precision")
+        if not store.supports_ids or index_type not in ("auto", store.index_type) \
+                or want_precision not in (None, store.precision) \
+                or _reduce_key(store.meta.get("reduce")) != _reduce_key(want_reduce) \
+                or (pca_reducer is not None and not pca_reducer.same_as(store.reducer)) \
+                or (empty_dim and pca_reducer is None and store.dim != empty_dim) \
+                or store.meta.get("chunking", {"mode": "window"}) != chunking:
+            store = None
+        elif index_params and "rescore" in index_params:
+            store.index_params["rescore"] = index_params["rescore"]  # 검색 시 설정이라 재생성 불필요
+    incremental = store is not None
+    if store is None:
+        manifest = new_manifest(emb.model)
+        shutil.rmtree(os.path.join(index_dir, DOCTEXT_DIRNAME), ignore_errors=True)
+    doc_texts = DocTextStore(index_dir) if chunk_mode == "child" else None
+
+    known = manifest["files"]
+    diff = diff_files(collect_files(paths), known)
+    stale = [vid for fp in diff["changed"] + diff["deleted"] for vid in known[fp].get("chunk_ids", [])]
+    # 중복 제거로 다른 파일의 청크를 가리키던 파일은, 그 대표 청크가 빠지면 다시 처리
+    while True:
+        stale_set = set(stale)
+        orphaned = [fp for fp in diff["unchanged"] if stale_set.intersection(known[fp].get("aliases", []))]
+        if not orphaned:
+            break
+        for fp in orphaned:
+            diff["unchanged"].remove(fp)
+            diff["changed"].append(fp)
+            stale.extend(known[fp].get("chunk_ids", []))
+    removed = store.remove_ids(stale) if store is not None else 0
+    if doc_texts is not None:
+        for fp in diff["deleted"]:
+            doc_texts.remove(fp)
+    if store is not None:
+        _drop_alias_refs(store, known, diff["changed"] + diff["deleted"])
+
+    # 추출(프로세스 풀) → 청크 배치 → 임베딩 → 세그먼트 기록 → 삽입을 배치 단위로 흘려보냄
+    # 새 인덱스가 학습/종류 결정(auto, ivf_*, sq8, pca)에 벡터가 필요하면 처음 TRAIN_CHUNKS 개까지만 모아
+    # 그 표본으로 생성한 뒤 나머지는 바로 삽입 (규모에 맞지 않는 nlist 는 끝에서 _retarget 이 재학습)
+    todo = diff["changed"] + diff["added"]
+    chunk_ids: Dict[str, List[int]] = {fp: [] for fp in todo}
+    pending_vecs: List[np.ndarray] = []
+    pending_items: List[Dict] = []
+    needs_sample = index_type not in ("flat", "hnsw") or precision_of(index_params or {}) == "sq8" \
+        or (pca_dim > 0 and pca_reducer is None)
+
+    def _add(vecs: np.ndarray, batch: List[Dict]):
+        store.upsert(vecs, batch)
+        for it in batch:
+            chunk_ids[it["meta"]["path"]].append(it["vid"])
+
+    def _create_from_pending():
+        nonlocal store
+        vecs = np.vstack(pending_vecs) if pending_vecs else np.zeros((0, empty_dim or emb.dim), dtype="float32")
+        reducer = (pca_reducer or PcaReducer.fit(vecs, pca_dim)) if pca_dim else None
+        store = FaissStore(dim=pca_dim or vecs.shape[1], index_path=index_path, docs_path=docs_path,
+                           index_type=index_type, index_params=index_params)
+        store.reducer = reducer  # upsert 가 원래 차원 벡터를 축소해 저장
+        if reducer is not None and reducer is not pca_reducer:
+            print(f"[PCA] {reducer.d_in}D → {reducer.d_out}D, explained variance {reducer.explained():.1%} "
+                  f"(fit on {len(vecs)} chunks)")
+        if pending_items:
+            _add(vecs, list(pending_items))  # 첫 add 가 이 표본으로 인덱스 학습
+        pending_vecs.clear()
+        pending_items.clear()
+
+    def _insert(vecs: np.ndarray, batch: List[Dict]):
+        nonlocal store
+        if store is None and needs_sample:
+            pending_vecs.append(vecs)
+            pending_items.extend(batch)
+            if len(pending_items) >= TRAIN_CHUNKS:
+                _create_from_pending()
+            return
+        if store is None:
+            store = FaissStore(dim=pca_dim or vecs.shape[1], index_path=index_path, docs_path=docs_path,
+                               index_type=index_type, index_params=index_params)
+            store.reducer = pca_reducer
+        _add(vecs, batch)
+
+    # 같은 작업(모델/대상 파일 상태/인덱스 종류)의 중단된 빌드가 있으면 완료 세그먼트부터 재개
+    journal = BuildJournal(index_dir)
+    build_key = make_build_key(model=emb.model, fresh=store is None, index_type=index_type,
+                               index_params=index_params, files={fp: diff["info"][fp] for fp in todo},
+                               stale=sorted(stale), dedup=dedup, chunking=chunking, reduce=want_reduce)
+    deduper = Deduper(dedup) if dedup > 0 else None
+    if deduper is not None and store is not None:
+        deduper.seed(store.docs[vid] for vid in store.docs)  # 변경/삭제분은 위에서 이미 제거됨
+    done: set = set()
+    for entry in journal.open(build_key):
+        vecs, batch = journal.load(entry)
+        _insert(vecs, batch)
+        done.update(it["id"] for it in batch)
+        if deduper is not None:
+            deduper.seed(batch)
+    if done:
+        print(f"[RESUME] {len(journal.state['segments'])} segments / {len(done)} chunks from {journal.dir}")
+
+    ingest_stats: Dict = {}
+    n_chunks, embed_s = len(done), 0.0
+    for batch in iter_corpus_batches(todo, batch_chunks=batch_chunks, workers=workers, stats=ingest_stats,
+                                     chunk_mode=chunk_mode, span_size=span_size, doc_texts=doc_texts):
+        batch = [it for it in batch if it["id"] not in done]
+        if deduper is not None:
+            batch = deduper.filter(batch)
+        if not batch:
+            continue
+        t0 = time.perf_counter()
+        vecs = emb.encode([it["text"] for it in batch])  # (B, D), 이미 L2 정규화됨
+        embed_s += time.perf_counter() - t0
+        n_chunks += len(batch)
+        journal.append(vecs, batch)  # 여기까지 오면 이 배치는 재실행 시 재임베딩하지 않음
+        _insert(vecs, batch)
+    report_pipeline(ingest_stats)
+    _report_throughput(emb, n_chunks - len(done), embed_s)
+    if deduper is not None:
+        _report_dedup(deduper, emb)
+        # 대표 청크의 aliases 를 docs 에 반영 (기존/컬럼형 레코드는 조회마다 새 dict 라 다시 넣어야 함)
+        for vid, canon in {chunk_vid(c["id"]): c for _, c in deduper.aliases}.items():
+            if vid in store.docs:
+                store.docs[vid] = canon
+
+    if store is None:
+        _create_from_pending()
+    # 최종 규모로 종류/nlist 재판단: 증분이면 기존 종류를 고정하지 않고, 새 빌드면 표본 기준 nlist 를 보정
+    _retarget(store, index_type, index_params)
 
-    store = FaissStore(dim=vecs.shape[1], index_path=index_path, docs_path=docs_path)
-    store.add(vecs, corpus)
-    store.save()
+    # 매니페스트 갱신 (추출 실패 파일은 빼 둠 → 다음 빌드에서 추가 파일로 다시 처리)
+    for fp in diff["deleted"] + ingest_stats.get("failed_files", []):
+        known.pop(fp, None)
+    alias_vids = deduper.alias_vids() if deduper is not None else {}
+    failed = set(ingest_stats.get("failed_files", []))
+    for fp, info in diff["info"].items():
+        if fp in failed:
+            continue
+        prev = known.get(fp, {})
+        if fp in chunk_ids:
+            known[fp] = dict(info, chunk_ids=chunk_ids[fp], aliases=sorted(set(alias_vids.get(fp, []))))
+        else:
+            known[fp] = dict(info, chunk_ids=prev.get("chunk_ids", []), aliases=prev.get("aliases", []))
 
-    save_docs_jsonl(corpus, docs_path)
-    print(f"[OK] Indexed {len(texts)} chunks @ {vecs.shape[1]}D → {index_path}")
+    store.meta["embedding_model"] = emb.model  # 조회 시 원격 차원 확인 생략용
+    store.meta["chunking"] = chunking
+    store.meta["reduce"] = reduce_config(reduce, dimensions, in_dim=store.input_dim)
+    store.docs_format = docs_format
+    store.save()  # 파일별 tmp → rename (원자적 교체)
+    save_manifest(index_dir, manifest)
+    journal.close()  # 최종 저장 완료 → 세그먼트 삭제. 이전에 중단되면 다음 실행이 세그먼트로 재개
+    # BM25 역색인은 전체 청크로 다시 생성 (토큰화만 하므로 임베딩 대비 무시할 비용)
+    t0 = time.perf_counter()
+    lex = build_lexical(index_dir, store.docs)
+    print(f"[BM25] {lex.stats()} in {time.perf_counter() - t0:.2f}s")
+    # 문서 라우팅 중심: 증분이면 추가/변경/삭제된 문서만 다시 계산
+    t0 = time.perf_counter()
+    dirty = set(diff["added"] + diff["changed"] + diff["deleted"]) if incremental else None
+    router = build_doc_index(index_dir, store, doc_centroids, dirty=dirty)
+    if router is not None:
+        print(f"[DOCS] {len(router)} documents, {len(router.centroids)} centroids "
+              f"in {time.perf_counter() - t0:.2f}s")
+    print(f"[OK] files: +{len(diff['added'])} ~{len(diff['changed'])} -{len(diff['deleted'])} "
+          f"={len(diff['unchanged'])} | chunks: +{n_chunks} -{removed}")
+    print(f"[OK] Indexed {len(store)} chunks @ {store.dim}D ({store.index_type} {store.index_params}) → {index_path}")
 
 """
 실행 방법! 꼭 터미널에 아래 코드를 복사해서 붙여넣고 실행 먼저!
@@ -73,6 +466,20 @@ python -m student.day2.impl.build_index \
   --model text-embedding-3-small \
   --batch_size 128
 
+(선택) 동시 요청: --concurrency 8 --rpm 3000 --tpm 1000000
+(선택) 전체 재생성: --full  (기본은 manifest.json 기반 증분)
+(선택) 인덱스 종류: --index_type hnsw|ivf_flat|ivf_pq --nlist 1024 --nprobe 16 --hnsw_m 32
+(선택) 벡터 정밀도: --precision fp16|sq8 --rescore 4  (메모리 1/2, 1/4 + 원본 float32 로 상위 후보 재채점)
+(선택) 차원 축소: --dimensions 512 [--reduce api|pca]  (api: 임베딩 API 파라미터, pca: 로컬 PCA 학습·저장)
+      api 로 만든 인덱스는 질의 시 Day2Plan.embedding_dimensions 를 같은 값으로
+(선택) 추출 병렬: --workers 4 --batch_chunks 1024
+(선택) 중복 제거: --dedup 0.9 (기본 0=끔)
+(선택) 부모 창 검색용 child 청크: --chunk_mode child --span_size 1000
+(선택) docs 저장 형식: --docs_format jsonl (기본 columnar=docs.col, 기존 docs.jsonl 변환은 python -m student.day2.impl.docstore)
+(선택) 샤드: --shards 4 (문서 해시로 분할, 질의는 샤드 동시 검색 후 병합), 샤드 하나만 다시: --shards 4 --shard 2 [--full]
+(선택) 문서 라우팅 중심 수: --doc_centroids 4 (0=docindex.npz 안 만듦, 질의는 Day2Plan.route_docs=N)
+(선택) 버전 빌드: --versioned [--keep_versions 2] (versions/<이름>/ 에 빌드 후 CURRENT 원자 교체,
+      서비스 프로세스는 REGISTRY.watch(index_dir, emb) 로 새 버전을 백그라운드 로드 후 교체)
 """
 
 
@@ -82,6 +489,32 @@ if __name__ == "__main__":
     ap.add_argument("--index_dir", default="indices/day2")
     ap.add_argument("--model", default=None)
     ap.add_argument("--batch_size", type=int, default=128)
+    ap.add_argument("--concurrency", type=int, default=1, help="동시 요청 배치 수 (1=순차)")
+    ap.add_argument("--rpm", type=float, default=None, help="분당 요청 수 상한")
+    ap.add_argument("--tpm", type=float, default=None, help="분당 토큰 수 상한")
+    ap.add_argument("--full", action="store_true", help="증분 무시하고 전체 재생성")
+    ap.add_argument("--index_type", default="auto", help="auto | flat | hnsw | ivf_flat | ivf_pq")
+    ap.add_argument("--nlist", type=int, default=None)
+    ap.add_argument("--nprobe", type=int, default=None)
+    ap.add_argument("--hnsw_m", type=int, default=None)
+    ap.add_argument("--ef_search", type=int, default=None)
+    ap.add_argument("--pq_m", type=int, default=None)
+    ap.add_argument("--precision", default=None, choices=["fp32", "fp16", "sq8"], help="벡터 저장 정밀도 (기본 fp32)")
+    ap.add_argument("--rescore", type=int, default=None, help="fp16/sq8: top_k × N 후보를 float32 로 재채점")
+    ap.add_argument("--dimensions", type=int, default=0, help="축소할 임베딩 차원 (0=모델 기본)")
+    ap.add_argument("--reduce", default="api", choices=["api", "pca"], help="차원 축소 방식")
+    ap.add_argument("--workers", type=int, default=None, help="PDF 추출 프로세스 수 (기본 CPU 수, 1=순차)")
+    ap.add_argument("--batch_chunks", type=int, default=1024, help="임베딩/삽입 배치 청크 수")
+    ap.add_argument("--dedup", type=float, default=0.0, help="근사 중복 제거 임계값 (기본 0=끔, 예: 0.9)")
+    ap.add_argument("--chunk_mode", default="window", choices=["window", "child"])
+    ap.add_argument("--span_size", type=int, default=1000, help="child 모드 span 글자 수")
+    ap.add_argument("--docs_format", default="columnar", choices=["columnar", "jsonl"],
+                    help="청크 메타/본문 저장 형식 (columnar=docs.col)")
+    ap.add_argument("--shards", type=int, default=0, help="문서 해시 기준 샤드 수 (0=단일 인덱스)")
+    ap.add_argument("--shard", type=int, default=None, help="이 샤드만 다시 빌드 (--shards 와 함께)")
+    ap.add_argument("--doc_centroids", type=int, default=4, help="문서별 최대 중심 벡터 수 (0=문서 라우팅 색인 없음)")
+    ap.add_argument("--versioned", action="store_true", help="새 버전 디렉토리에 빌드 후 CURRENT 교체")
+    ap.add_argument("--keep_versions", type=int, default=KEEP_VERSIONS, help="GC 후 남길 최근 버전 수")
     args = ap.parse_args()
 
     # ----------------------------------------------------------------------------
@@ -91,4 +524,14 @@ if __name__ == "__main__":
     # ----------------------------------------------------------------------------
     # 정답 구현:
     os.makedirs(args.index_dir, exist_ok=True)
-    build_index(args.paths, args.index_dir, args.model, args.batch_size)
+    index_params = {k: v for k, v in {"nlist": args.nlist, "nprobe": args.nprobe, "m": args.hnsw_m,
+                                      "ef_search": args.ef_search, "pq_m": args.pq_m,
+                                      "precision": args.precision, "rescore": args.rescore}.items() if v is not None}
+    build_index(args.paths, args.index_dir, args.model, args.batch_size,
+                concurrency=args.concurrency, rpm=args.rpm, tpm=args.tpm, full=args.full,
+                index_type=args.index_type, index_params=index_params,
+                workers=args.workers, batch_chunks=args.batch_chunks, dedup=args.dedup,
+                chunk_mode=args.chunk_mode, span_size=args.span_size,
+                dimensions=args.dimensions, reduce=args.reduce, docs_format=args.docs_format,
+                shards=args.shards, only_shard=args.shard,
+                versioned=args.versioned, keep_versions=args.keep_versions, doc_centroids=args.doc_centroids)
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+재개 가능한 인덱스 빌드용 세그먼트 저널 (index_dir/.build/)
+- 임베딩이 끝난 배치마다 세그먼트 파일 2개를 기록: seg_00000.npy(벡터) + seg_00000.jsonl(레코드)
+- 세그먼트 파일을 fsync 한 뒤 journal.json 에 추가 → 저널에 있는 세그먼트는 항상 완전함
+- build_key(모델/처리 대상 파일 상태/인덱스 종류)가 같으면 재실행 시 기존 세그먼트를 재사용(재임베딩 없음)
+- 최종 저장(faiss.index/docs.jsonl/manifest) 이 끝나면 close() 로 디렉토리 삭제
+"""
+
+from __future__ import annotations
+import os, json, shutil, hashlib
+from typing import Dict, Any, List, Tuple
+
+import numpy as np
+
+JOURNAL_VERSION = 1
+BUILD_DIRNAME = ".build"
+
+
+def make_build_key(**parts: Any) -> str:
+    raw = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _fsync_replace(tmp: str, path: str):
+    with open(tmp, "rb+") as f:
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class BuildJournal:
+    def __init__(self, index_dir: str):
+        self.dir = os.path.join(index_dir, BUILD_DIRNAME)
+        self.path = os.path.join(self.dir, "journal.json")
+        self.state: Dict[str, Any] = {}
+
+    def open(self, build_key: str) -> List[Dict[str, Any]]:
+        """
+        같은 build_key 의 저널이 있으면 완료된 세그먼트 목록 반환(재개),
+        없거나 다르면 .build 를 비우고 새로 시작 → []
+        """
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            if state.get("version") == JOURNAL_VERSION and state.get("build_key") == build_key:
+                self.state = state
+                return list(state["segments"])
+        except (OSError, ValueError):
+            pass
+        shutil.rmtree(self.dir, ignore_errors=True)
+        os.makedirs(self.dir, exist_ok=True)
+        self.state = {"version": JOURNAL_VERSION, "build_key": build_key, "segments": []}
+        self._write()
+        return []
+
+    def _write(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, ensure_ascii=False)
+        _fsync_replace(tmp, self.path)
+
+    def append(self, vecs: np.ndarray, items: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """세그먼트 1개를 내구성 있게 기록한 뒤 저널에 추가"""
+        seg = len(self.state["segments"])
+        name = f"seg_{seg:05d}"
+        vec_path = os.path.join(self.dir, name + ".npy")
+        doc_path = os.path.join(self.dir, name + ".jsonl")
+        with open(vec_path + ".tmp", "wb") as f:
+            np.save(f, np.ascontiguousarray(vecs, dtype="float32"))
+        _fsync_replace(vec_path + ".tmp", vec_path)
+        with open(doc_path + ".tmp", "w", encoding="utf-8") as f:
+            for it in items:
+                f.write(json.dumps(it, ensure_ascii=False) + "\n")
+        _fsync_replace(doc_path + ".tmp", doc_path)
+        entry = {"seg": seg, "n": len(items), "vecs": name + ".npy", "docs": name + ".jsonl"}
+        self.state["segments"].append(entry)
+        self._write()
+        return entry
+
+    def load(self, entry: Dict[str, Any]) -> Tuple[np.ndarray, List[Dict[str, Any]]]:
+        vecs = np.load(os.path.join(self.dir, entry["vecs"]))
+        with open(os.path.join(self.dir, entry["docs"]), "r", encoding="utf-8") as f:
+            items = [json.loads(line) for line in f]
+        return vecs, items
+
+    def close(self):
+        """최종 저장 완료 후 호출 → 세그먼트/저널 삭제"""
+        shutil.rmtree(self.dir, ignore_errors=True)
+        self.state = {}
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+청크 근사 중복 제거 (MinHash + LSH)
+- 지문: 공백 제거 후 문자 k-gram(기본 5) 집합 → crc32 → 64개 해시 함수의 최소값 (한글에도 형태소 분석 불필요)
+- 후보: 16 band × 4 row LSH 버킷이 하나라도 겹치는 이전 청크
+- 확정: 서명 일치 비율(자카드 추정) ≥ threshold 이면 중복 → 버리고, 남긴 청크 meta["aliases"] 에 기록
+- 완전 동일 텍스트는 sha1 으로 먼저 걸러냄
+"""
+
+from __future__ import annotations
+import re, zlib, hashlib
+from typing import Dict, Any, Iterable, List, Tuple
+
+import numpy as np
+
+from .store import chunk_vid
+
+_PRIME = np.uint64(4294967291)  # 2^32 미만 최대 소수 → a*x+b 가 uint64 에서 넘치지 않음
+_WS_RE = re.compile(r"\s+")
+
+
+def _shingle_hashes(text: str, k: int) -> np.ndarray:
+    s = _WS_RE.sub("", text or "")
+    if len(s) <= k:
+        grams = {s}
+    else:
+        grams = {s[i:i + k] for i in range(len(s) - k + 1)}
+    return np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64, count=len(grams))
+
+
+class Deduper:
+    def __init__(self, threshold: float = 0.9, num_perm: int = 64, bands: int = 16,
+                 shingle: int = 5, seed: int = 1):
+        assert num_perm % bands == 0
+        self.threshold = threshold
+        self.bands, self.rows = bands, num_perm // bands
+        self.shingle = shingle
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, int(_PRIME), num_perm, dtype=np.uint64)[:, None]
+        self._b = rng.integers(0, int(_PRIME), num_perm, dtype=np.uint64)[:, None]
+        self._exact: Dict[bytes, Dict[str, Any]] = {}
+        self._buckets: Dict[Tuple[int, bytes], List[int]] = {}
+        self._sigs: List[np.ndarray] = []
+        self._items: List[Dict[str, Any]] = []
+        self.aliases: List[Tuple[Dict[str, Any], Dict[str, Any]]] = []  # (버린 청크, 남긴 청크)
+        self.stats: Dict[str, Any] = {"seen": 0, "dropped": 0, "exact": 0, "near": 0, "chars_dropped": 0}
+
+    def signature(self, text: str) -> np.ndarray:
+        x = _shingle_hashes(text, self.shingle)[None, :]
+        return ((self._a * x + self._b) % _PRIME).min(axis=1).astype(np.uint32)
+
+    def _band_keys(self, sig: np.ndarray):
+        for b in range(self.bands):
+            yield b, sig[b * self.rows:(b + 1) * self.rows].tobytes()
+
+    def _remember(self, item: Dict[str, Any], sig: np.ndarray, digest: bytes):
+        pos = len(self._items)
+        self._items.append(item)
+        self._sigs.append(sig)
+        self._exact[digest] = item
+        for key in self._band_keys(sig):
+            self._buckets.setdefault(key, []).append(pos)
+
+    def seed(self, items: Iterable[Dict[str, Any]]):
+        """이미 인덱스에 넣은 청크(재개 등)를 대표 청크로 등록"""
+        for it in items:
+            self._remember(it, self.signature(it["text"]), _digest(it["text"]))
+
+    def _match(self, sig: np.ndarray, digest: bytes):
+        hit = self._exact.get(digest)
+        if hit is not None:
+            return hit, "exact"
+        cands = {p for key in self._band_keys(sig) for p in self._buckets.get(key, ())}
+        best, best_sim = None, self.threshold
+        for p in cands:
+            sim = float(np.mean(self._sigs[p] == sig))
+            if sim >= best_sim:
+                best, best_sim = self._items[p], sim
+        return best, "near"
+
+    def filter(self, batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """중복이 아닌 청크만 반환. 중복은 대표 청크 meta["aliases"] 와 self.aliases 에 기록"""
+        kept: List[Dict[str, Any]] = []
+        for it in batch:
+            self.stats["seen"] += 1
+            sig, digest = self.signature(it["text"]), _digest(it["text"])
+            canon, kind = self._match(sig, digest)
+            if canon is None:
+                self._remember(it, sig, digest)
+                kept.append(it)
+                continue
+            canon["meta"].setdefault("aliases", []).append(
+                {"id": it["id"], "path": it["meta"]["path"], "chunk": it["meta"]["chunk"]})
+            self.aliases.append((it, canon))
+            self.stats["dropped"] += 1
+            self.stats[kind] += 1
+            self.stats["chars_dropped"] += len(it["text"])
+        return kept
+
+    def alias_vids(self) -> Dict[str, List[int]]:
+        """파일별로, 그 파일의 버려진 청크가 가리키는 대표 청크 vid 목록 (매니페스트 기록용)"""
+        out: Dict[str, List[int]] = {}
+        for dup, canon in self.aliases:
+            out.setdefault(dup["meta"]["path"], []).append(chunk_vid(canon["id"]))
+        return out
+
+
+def _digest(text: str) -> bytes:
+    return hashlib.sha1(_WS_RE.sub(" ", text or "").strip().encode("utf-8")).digest()
+
+
+def dedup_corpus(corpus: List[Dict[str, Any]], threshold: float = 0.9) -> List[Dict[str, Any]]:
+    """리스트 한 번에 중복 제거 (build_corpus 용)"""
+    return Deduper(threshold).filter(corpus)
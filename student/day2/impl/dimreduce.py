@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+임베딩 차원 축소 (빌드 시 결정, 인덱스 메타 "reduce" 에 기록)
+- api: text-embedding-3 의 dimensions 파라미터 (API 가 잘라서 정규화한 벡터를 반환, 로컬 변환 없음)
+- pca: 코퍼스 벡터로 faiss.PCAMatrix 학습 → index_dir/reducer.pca 에 저장
+       코퍼스/질의 벡터 모두 같은 변환 후 다시 L2 정규화 (내적 = 코사인 유지)
+"""
+
+from __future__ import annotations
+import os
+from typing import Dict, Any, Optional
+
+import numpy as np
+import faiss
+
+REDUCER_FILENAME = "reducer.pca"
+REDUCE_METHODS = ("api", "pca")
+MAX_TRAIN = 100_000
+
+
+def reduce_config(method: str, dim: int, in_dim: int = 0) -> Optional[Dict[str, Any]]:
+    """메타에 기록할 축소 설정 (dim=0 이면 축소 없음 → None)"""
+    if not dim:
+        return None
+    if method not in REDUCE_METHODS:
+        raise ValueError(f"지원하지 않는 차원 축소 방식: {method} (가능: {', '.join(REDUCE_METHODS)})")
+    conf: Dict[str, Any] = {"method": method, "dim": int(dim)}
+    if method == "pca" and in_dim:
+        conf["in_dim"] = int(in_dim)
+    return conf
+
+
+def reducer_path(index_dir: str) -> str:
+    return os.path.join(index_dir, REDUCER_FILENAME)
+
+
+class PcaReducer:
+    def __init__(self, pca: faiss.PCAMatrix):
+        self.pca = pca
+
+    @property
+    def d_in(self) -> int:
+        return int(self.pca.d_in)
+
+    @property
+    def d_out(self) -> int:
+        return int(self.pca.d_out)
+
+    @classmethod
+    def fit(cls, vecs: np.ndarray, dim: int, seed: int = 0) -> "PcaReducer":
+        """학습 벡터 수가 dim 보다 적으면 주성분을 dim 개 만들 수 없음 → ValueError"""
+        if len(vecs) < dim:
+            raise ValueError(f"PCA 학습 벡터가 부족합니다 ({len(vecs)} < {dim}). --dimensions 를 줄이거나 --reduce api 를 사용하세요.")
+        sample = vecs
+        if len(vecs) > MAX_TRAIN:
+            rng = np.random.default_rng(seed)
+            sample = vecs[rng.choice(len(vecs), MAX_TRAIN, replace=False)]
+        pca = faiss.PCAMatrix(vecs.shape[1], int(dim))
+        pca.train(np.ascontiguousarray(sample, dtype="float32"))
+        return cls(pca)
+
+    def explained(self) -> float:
+        """유지한 분산 비율 (빌드 리포트용)"""
+        ev = faiss.vector_to_array(self.pca.eigenvalues)
+        total = float(ev.sum())
+        return float(ev[:self.d_out].sum()) / total if total > 0 else 0.0
+
+    def same_as(self, other: Optional["PcaReducer"]) -> bool:
+        """같은 변환인지 (샤드가 공유 reducer 로 만들어졌는지 확인용)"""
+        if other is None or (self.d_in, self.d_out) != (other.d_in, other.d_out):
+            return False
+        return all(np.array_equal(faiss.vector_to_array(getattr(self.pca, k)), faiss.vector_to_array(getattr(other.pca, k)))
+                   for k in ("A", "b"))
+
+    def apply(self, x: np.ndarray) -> np.ndarray:
+        y = self.pca.apply(np.ascontiguousarray(np.atleast_2d(x), dtype="float32"))
+        y /= (np.linalg.norm(y, axis=1, keepdims=True) + 1e-12)
+        return y
+
+    def save(self, index_dir: str):
+        p = reducer_path(index_dir)
+        self.write(p + ".tmp")
+        os.replace(p + ".tmp", p)
+
+    def write(self, path: str):
+        faiss.write_VectorTransform(self.pca, path)
+
+    @classmethod
+    def load(cls, index_dir: str) -> "PcaReducer":
+        return cls(faiss.read_VectorTransform(reducer_path(index_dir)))
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+문서 단위 라우팅 (index_dir/docindex.npz, 빌드 시 청크 벡터로 생성)
+- 문서(meta.path)마다 중심 벡터 1~max_centroids 개: 청크 chunks_per_centroid 개당 1개,
+  구면 k-means 몇 회 (긴 문서의 장별 주제를 따로 대표). 문서별로 연속 저장 + offsets
+- 질의: 전체 중심과 내적 한 번 → 문서별 최고 점수 상위 top_d 문서 → 그 문서 청크만 검색
+  청크 검색은 where={"path": [...]} 로 FaissStore 사전 필터를 그대로 씀
+  (청크가 적으면 정확 부분 검색, 많으면 IDSelector)
+- 증분 빌드는 바뀐 문서만 다시 계산, 샤드 인덱스는 샤드별 docindex 를 이어 붙임
+"""
+
+from __future__ import annotations
+import os, json, math, threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Iterable, Optional
+
+import numpy as np
+
+from .filters import match_path
+
+DOCINDEX_FILENAME = "docindex.npz"
+_MASK_CACHE = 32  # where 별 중심 마스크 재사용 개수
+
+
+def doc_index_path(index_dir: str) -> str:
+    return os.path.join(index_dir, DOCINDEX_FILENAME)
+
+
+def _normalize(x: np.ndarray) -> np.ndarray:
+    return x / (np.linalg.norm(x, axis=1, keepdims=True) + 1e-12)
+
+
+def doc_centroids(vecs: np.ndarray, k: int, iters: int = 5) -> np.ndarray:
+    """(n, D) 청크 벡터 → (k, D) 정규화 중심. 고르게 뽑은 청크에서 시작하는 구면 k-means"""
+    k = max(1, min(k, len(vecs)))
+    if k == 1:
+        return _normalize(vecs.mean(axis=0, keepdims=True)).astype("float32")
+    c = _normalize(vecs[np.linspace(0, len(vecs) - 1, k).astype(int)].copy())
+    for _ in range(iters):
+        assign = np.argmax(vecs @ c.T, axis=1)
+        for j in range(k):
+            m = assign == j
+            if m.any():
+                c[j] = vecs[m].mean(axis=0)
+        c = _normalize(c)
+    return c.astype("float32")
+
+
+class DocRouter:
+    def __init__(self, paths: Iterable[str], centroids: np.ndarray, offsets: np.ndarray, reducer=None):
+        """offsets: 문서 i 의 중심 = centroids[offsets[i]:offsets[i+1]], reducer: PCA 축소 인덱스의 질의 변환"""
+        self.paths = [str(p) for p in paths]
+        self.centroids = np.ascontiguousarray(centroids, dtype="float32")
+        self.offsets = np.asarray(offsets, dtype="int64")
+        self.reducer = reducer
+        self._masks: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._masks_lock = threading.Lock()  # 레지스트리가 공유하는 라우터 → 요청 스레드들이 동시에 갱신
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    # ---------- Build ----------
+    @classmethod
+    def build(cls, store, max_centroids: int = 4, chunks_per_centroid: int = 16,
+              base: Optional["DocRouter"] = None, dirty: Optional[set] = None) -> "DocRouter":
+        """
+        store 의 필터 색인(경로 → vid)으로 문서별 청크 벡터를 꺼내 중심 계산
+        base/dirty: 이전 docindex 와 바뀐 경로 집합 → 나머지 문서는 이전 중심 재사용
+        """
+        fi = store.filters
+        reuse: Dict[str, np.ndarray] = {}
+        if base is not None and dirty is not None and base.centroids.shape[1] == store.dim:
+            for i, p in enumerate(base.paths):
+                if p not in dirty:
+                    reuse[p] = base.centroids[base.offsets[i]:base.offsets[i + 1]]
+        paths, cents, offsets = [], [], [0]
+        for i, p in enumerate(fi.paths):
+            vids = fi.path_vids[fi.path_offsets[i]:fi.path_offsets[i + 1]]
+            if len(vids) == 0:
+                continue
+            c = reuse.get(p)
+            if c is None:
+                k = min(max_centroids, math.ceil(len(vids) / max(1, chunks_per_centroid)))
+                c = doc_centroids(store.vectors(vids), k)
+            paths.append(p)
+            cents.append(c)
+            offsets.append(offsets[-1] + len(c))
+        centroids = np.vstack(cents) if cents else np.zeros((0, store.dim), dtype="float32")
+        return cls(paths, centroids, np.array(offsets, dtype="int64"))
+
+    @classmethod
+    def concat(cls, routers: List["DocRouter"]) -> "DocRouter":
+        """샤드별 docindex → 하나 (문서는 한 샤드에만 있으므로 이어 붙이면 됨)"""
+        paths = [p for r in routers for p in r.paths]
+        offsets = [0]
+        for r in routers:
+            offsets.extend((r.offsets[1:] + offsets[-1]).tolist())
+        return cls(paths, np.vstack([r.centroids for r in routers]), np.array(offsets, dtype="int64"))
+
+    def save(self, path: str):
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, paths=np.array(self.paths, dtype=str), centroids=self.centroids, offsets=self.offsets)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str, reducer=None) -> "DocRouter":
+        with np.load(path) as z:
+            return cls(z["paths"], z["centroids"], z["offsets"], reducer=reducer)
+
+    # ---------- Route ----------
+    def _mask(self, where: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+        """where 를 만족하는 문서의 중심만 True (경로만으로 판정). 최근 where 는 캐시"""
+        if not where:
+            return None
+        key = json.dumps(where, sort_keys=True, ensure_ascii=False, default=str)
+        with self._masks_lock:
+            mask = self._masks.get(key)
+            if mask is not None:
+                self._masks.move_to_end(key)
+                return mask
+        ok = np.array([match_path(p, where) for p in self.paths], dtype=bool)
+        mask = np.repeat(ok, np.diff(self.offsets))
+        with self._masks_lock:
+            self._masks[key] = mask
+            while len(self._masks) > _MASK_CACHE:
+                self._masks.popitem(last=False)
+        return mask
+
+    def route(self, query_vec: np.ndarray, top_d: int, where: Optional[Dict[str, Any]] = None) -> List[str]:
+        """질의와 가장 가까운 중심을 가진 문서 top_d 개 경로 (점수 내림차순). where 로 후보 문서 제한"""
+        q = np.asarray(query_vec, dtype="float32").reshape(1, -1)
+        if self.reducer is not None and q.shape[1] == self.reducer.d_in:
+            q = self.reducer.apply(q)
+        if not self.paths:
+            return []
+        scores = self.centroids @ q[0]
+        mask = self._mask(where)
+        if mask is not None:
+            scores = np.where(mask, scores, -np.inf)
+        best = np.maximum.reduceat(scores, self.offsets[:-1])  # 문서별 최고 중심 점수
+        k = min(top_d, len(best))
+        top = np.argpartition(-best, k - 1)[:k]
+        top = top[np.argsort(-best[top], kind="stable")]
+        return [self.paths[i] for i in top if best[i] > -np.inf]
+
+
+def build_doc_index(index_dir: str, store, max_centroids: int = 4, chunks_per_centroid: int = 16,
+                    dirty: Optional[set] = None) -> Optional[DocRouter]:
+    """
+    docindex.npz 생성/갱신. dirty 가 주어지고 기존 파일이 있으면 그 경로만 다시 계산 (None=전체)
+    max_centroids=0 이면 만들지 않고 기존 파일 삭제. 벡터 복원이 안 되는 인덱스면 경고 후 건너뜀
+    """
+    path = doc_index_path(index_dir)
+    if max_centroids <= 0:
+        if os.path.exists(path):
+            os.remove(path)
+        return None
+    base = DocRouter.load(path) if dirty is not None and os.path.exists(path) else None
+    try:
+        router = DocRouter.build(store, max_centroids, chunks_per_centroid, base=base, dirty=dirty)
+    except RuntimeError as e:  # reconstruct 미지원
+        print(f"[WARN] 문서 라우팅 색인 생략 (벡터 복원 불가): {e}")
+        if os.path.exists(path):
+            os.remove(path)
+        return None
+    router.save(path)
+    return router
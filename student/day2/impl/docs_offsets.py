@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+docs.jsonl 오프셋 사이드카 + 지연 디코딩 문서 테이블
+- docs.offsets.npy: (N, 2) int64 [vid, 바이트 오프셋], vid 오름차순
+- LazyDocs: vid → 해당 줄만 mmap 에서 잘라 json.loads (top-k 만 디코딩)
+"""
+
+from __future__ import annotations
+import os, json, mmap
+from collections.abc import Mapping
+from typing import Dict, Any, Iterator, Optional
+
+import numpy as np
+
+
+def offsets_path(docs_path: str) -> str:
+    return os.path.splitext(docs_path)[0] + ".offsets.npy"
+
+
+def write_offsets(docs_path: str, pairs: np.ndarray, out: Optional[str] = None):
+    """pairs: (N, 2) [vid, offset] → vid 정렬 후 저장. out 을 주면 그 경로에 기록만 (교체는 호출 쪽에서)"""
+    pairs = np.asarray(pairs, dtype="int64").reshape(-1, 2)
+    pairs = pairs[np.argsort(pairs[:, 0], kind="stable")]
+    tmp = out or offsets_path(docs_path) + ".tmp"
+    with open(tmp, "wb") as f:
+        np.save(f, pairs)
+    if out is None:
+        os.replace(tmp, offsets_path(docs_path))
+
+
+def scan_offsets(docs_path: str, positional: bool = False) -> np.ndarray:
+    """사이드카가 없거나 낡았을 때 docs.jsonl 을 한 번 훑어 [vid, offset] 생성"""
+    pairs = []
+    off = 0
+    with open(docs_path, "rb") as f:
+        for i, line in enumerate(f):
+            vid = i if positional else int(json.loads(line)["vid"])
+            pairs.append((vid, off))
+            off += len(line)
+    return np.array(pairs, dtype="int64").reshape(-1, 2)
+
+
+class LazyDocs(Mapping):
+    """읽기 전용 vid → 레코드 매핑. 조회한 레코드만 디코딩"""
+
+    def __init__(self, docs_path: str, pairs: np.ndarray):
+        self.docs_path = docs_path
+        self._vids = np.ascontiguousarray(pairs[:, 0])
+        self._offs = np.ascontiguousarray(pairs[:, 1])
+        self._f = open(docs_path, "rb")
+        size = os.fstat(self._f.fileno()).st_size
+        self._mm: Optional[mmap.mmap] = mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+
+    @classmethod
+    def open(cls, docs_path: str, positional: bool = False, expected_bytes: Optional[int] = None) -> "LazyDocs":
+        """
+        사이드카를 mmap 으로 연다. 없거나 docs.jsonl 크기가 메타와 다르면 메모리에서 다시 계산
+        읽기 전용 로드이므로 인덱스 디렉토리에 쓰지 않음 (사이드카는 FaissStore.save 만 기록)
+        """
+        op = offsets_path(docs_path)
+        fresh = os.path.exists(op)
+        if fresh and expected_bytes is not None:
+            fresh = expected_bytes == os.path.getsize(docs_path)
+        elif fresh:
+            fresh = os.path.getmtime(op) >= os.path.getmtime(docs_path)
+        if fresh:
+            pairs = np.load(op, mmap_mode="r")
+        else:
+            pairs = scan_offsets(docs_path, positional=positional)
+            pairs = pairs[np.argsort(pairs[:, 0], kind="stable")]
+        return cls(docs_path, pairs)
+
+    def _pos(self, vid: int) -> int:
+        i = int(np.searchsorted(self._vids, vid))
+        return i if i < len(self._vids) and self._vids[i] == vid else -1
+
+    def __getitem__(self, vid: int) -> Dict[str, Any]:
+        i = self._pos(int(vid))
+        if i < 0 or self._mm is None:
+            raise KeyError(vid)
+        start = int(self._offs[i])
+        end = self._mm.find(b"\n", start)
+        return json.loads(self._mm[start:end if end >= 0 else len(self._mm)])
+
+    def __contains__(self, vid) -> bool:
+        return self._pos(int(vid)) >= 0
+
+    def __len__(self) -> int:
+        return len(self._vids)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._vids.tolist())
+
+    def memory_usage(self) -> Dict[str, int]:
+        return {"ram": int(self._vids.nbytes + self._offs.nbytes), "mapped": len(self._mm) if self._mm is not None else 0}
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+        self._f.close()
@@ -0,0 +1,363 @@
+# -*- coding: utf-8 -*-
+"""
+컬럼형 문서 저장소 (index_dir/docs.col) — docs.jsonl 대체
+- 파일 하나에 구간(section)별 고정폭 배열 + 문자열 힙, 끝에 헤더(JSON) 위치
+  · text   : UTF-8 본문 힙 + text_off(int64, N+1)
+  · chunk  : int32 청크 번호, path_id: int32 → 경로 테이블(중복 없이 한 번씩, path_off + path 힙)
+  · id_kind: int8 청크 id 형식 (0="{path}::chunk_{chunk:04d}", 1="{path}::span_{start:07d}", 2=extra 에 원문)
+  · start/end: int64 원문 오프셋 (child span, 없으면 -1)
+  · extra  : 위 컬럼에 없는 필드(aliases 등)만 JSON 힙 (대부분 빈 문자열)
+  · slots  : vid → 행 번호 개방 주소 해시 테이블 (선형 탐사, 적재율 ≤ 0.5) → vid 조회 O(1)
+- 로드 = mmap 후 헤더만 파싱 → 레코드는 조회할 때 해당 행만 조립 (json.loads 는 extra 가 있을 때만)
+- ColumnarDocs: 읽기 전용 매핑, DocsOverlay: 그 위에 추가/삭제를 메모리에 모았다가 save 때 새 파일로 병합
+
+변환: python -m student.day2.impl.docstore --index_dir indices/day2
+"""
+
+from __future__ import annotations
+import os, sys, json, mmap, struct, argparse
+from collections.abc import Mapping, MutableMapping
+from itertools import islice
+from typing import Dict, Any, Iterable, Iterator, List, Tuple
+
+import numpy as np
+
+COLUMNAR_SUFFIX = ".col"
+DOCS_FORMATS = ("columnar", "jsonl")
+_MAGIC = b"D2DOCS01"
+_RECORD_OVERHEAD = 700  # 레코드 dict + meta dict + id 문자열 등 (본문 제외) 대략치
+_SIZE_SAMPLE = 256
+_ID_CHUNK, _ID_SPAN, _ID_EXTRA = 0, 1, 2
+
+
+def columnar_path(docs_path: str) -> str:
+    """docs.jsonl 경로 → 같은 위치의 docs.col"""
+    return os.path.splitext(docs_path)[0] + COLUMNAR_SUFFIX
+
+
+def docs_exist(docs_path: str) -> bool:
+    return os.path.exists(docs_path) or os.path.exists(columnar_path(docs_path))
+
+
+def _slot_table(vids: np.ndarray) -> np.ndarray:
+    """vid & mask 에서 시작하는 선형 탐사 테이블 (빈 칸 -1). 라운드마다 빈 칸을 차지하지 못한 행만 한 칸 이동"""
+    size = 1 << max(1, int(np.ceil(np.log2(max(1, len(vids)) * 2))))
+    mask = size - 1
+    slots = np.full(size, -1, dtype="int64")
+    rows = np.arange(len(vids), dtype="int64")
+    cur = vids & mask
+    while rows.size:
+        free = np.flatnonzero(slots[cur] == -1)
+        _, first = np.unique(cur[free], return_index=True)
+        won = free[first]
+        slots[cur[won]] = rows[won]
+        left = np.ones(rows.size, dtype=bool)
+        left[won] = False
+        rows, cur = rows[left], (cur[left] + 1) & mask
+    return slots
+
+
+def _split_record(rec: Dict[str, Any], path_ids: Dict[str, int]) -> tuple:
+    """레코드 → (text, id_kind, chunk, path_id, start, end, extra JSON bytes)"""
+    meta = dict(rec.get("meta") or {})
+    path = meta.pop("path", None)
+    pid = -1
+    if isinstance(path, str):
+        pid = path_ids.setdefault(path, len(path_ids))
+    elif path is not None:
+        meta["path"] = path
+    cols = []
+    for key in ("chunk", "start", "end"):
+        v = meta.pop(key, None)
+        if isinstance(v, int) and not isinstance(v, bool) and v >= 0:
+            cols.append(v)
+        else:
+            cols.append(-1)
+            if v is not None:
+                meta[key] = v
+    chunk, start, end = cols
+    cid = rec.get("id")
+    if pid >= 0 and chunk >= 0 and cid == f"{path}::chunk_{chunk:04d}":
+        kind = _ID_CHUNK
+    elif pid >= 0 and start >= 0 and cid == f"{path}::span_{start:07d}":
+        kind = _ID_SPAN
+    else:
+        kind = _ID_EXTRA
+    extra: Dict[str, Any] = {}
+    if kind == _ID_EXTRA:
+        extra["id"] = cid
+    rest = {k: v for k, v in rec.items() if k not in ("id", "text", "meta", "vid")}
+    if rest:
+        extra["rec"] = rest
+    if meta:
+        extra["meta"] = meta
+    blob = json.dumps(extra, ensure_ascii=False).encode("utf-8") if extra else b""
+    return rec.get("text", ""), kind, chunk, pid, start, end, blob
+
+
+def write_columnar(path: str, docs: Mapping, positional: bool = False) -> int:
+    """
+    docs(vid → 레코드) 를 path 에 기록하고 파일 크기 반환. 본문 힙은 순서대로 바로 써서 전체 본문을 RAM 에 모으지 않음
+    positional: 구버전 순번 인덱스 (레코드에 "vid" 를 기록하지 않음)
+    """
+    n = len(docs)
+    vids = np.empty(n, dtype="int64")
+    text_off = np.zeros(n + 1, dtype="int64")
+    id_kind = np.empty(n, dtype="int8")
+    chunk = np.empty(n, dtype="int32")
+    path_id = np.empty(n, dtype="int32")
+    start = np.empty(n, dtype="int64")
+    end = np.empty(n, dtype="int64")
+    extra_off = np.zeros(n + 1, dtype="int64")
+    extras: List[bytes] = []
+    path_ids: Dict[str, int] = {}
+    sections: Dict[str, list] = {}
+
+    with open(path, "wb") as f:
+        f.write(_MAGIC)
+
+        def _section(name: str, arr: np.ndarray):
+            f.write(b"\0" * (-f.tell() % 8))
+            sections[name] = [f.tell(), arr.dtype.str, int(arr.size)]
+            f.write(np.ascontiguousarray(arr).tobytes())
+
+        base, off = f.tell(), 0
+        for i, (vid, rec) in enumerate(docs.items()):
+            text, id_kind[i], chunk[i], path_id[i], start[i], end[i], blob = _split_record(rec, path_ids)
+            raw = text.encode("utf-8")
+            f.write(raw)
+            off += len(raw)
+            text_off[i + 1] = off
+            vids[i] = int(vid)
+            extras.append(blob)
+            extra_off[i + 1] = extra_off[i] + len(blob)
+        sections["text"] = [base, "|u1", off]
+
+        paths = [p.encode("utf-8") for p in sorted(path_ids, key=path_ids.get)]
+        path_off = np.zeros(len(paths) + 1, dtype="int64")
+        np.cumsum([len(p) for p in paths], out=path_off[1:])
+        for name, arr in (("vids", vids), ("slots", _slot_table(vids)), ("text_off", text_off),
+                          ("id_kind", id_kind), ("chunk", chunk), ("path_id", path_id), ("start", start),
+                          ("end", end), ("extra_off", extra_off),
+                          ("extra", np.frombuffer(b"".join(extras), dtype="u1")), ("path_off", path_off),
+                          ("paths", np.frombuffer(b"".join(paths), dtype="u1"))):
+            _section(name, arr)
+        f.write(b"\0" * (-f.tell() % 8))
+        head_at = f.tell()
+        f.write(json.dumps({"version": 1, "count": n, "positional": bool(positional),
+                            "sections": sections}).encode("utf-8"))
+        f.write(struct.pack("<Q", head_at) + _MAGIC)
+        return f.tell()
+
+
+def records_nbytes(records: Iterable[Dict[str, Any]], n: int) -> int:
+    """메모리에 올린 레코드 dict n 개의 바이트 추정 (앞쪽 표본의 본문 크기로 외삽)"""
+    sample = list(islice(records, _SIZE_SAMPLE))
+    if not sample:
+        return 0
+    per = sum(sys.getsizeof(r.get("text") or "") + _RECORD_OVERHEAD for r in sample) / len(sample)
+    return int(per * n)
+
+
+class ColumnarDocs(Mapping):
+    """읽기 전용 vid → 레코드 매핑 (mmap). 조회한 행만 조립"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        mm = self._mm
+        if len(mm) < 24 or mm[:8] != _MAGIC or mm[-8:] != _MAGIC:
+            mm.close()
+            raise ValueError(f"컬럼형 문서 파일이 아닙니다: {path}")
+        (head_at,) = struct.unpack("<Q", mm[-16:-8])
+        head = json.loads(mm[head_at:len(mm) - 16])
+        self.positional = bool(head["positional"])
+        self._sec = head["sections"]
+        col = {name: np.frombuffer(mm, dtype=dt, count=cnt, offset=at)
+               for name, (at, dt, cnt) in self._sec.items() if name not in ("text", "extra", "paths")}
+        self._vids, self._slots = col["vids"], col["slots"]
+        self._text_off, self._extra_off = col["text_off"], col["extra_off"]
+        self._id_kind, self._chunk, self._path_id = col["id_kind"], col["chunk"], col["path_id"]
+        self._start, self._end = col["start"], col["end"]
+        self._mask = len(self._slots) - 1
+        self._text_at, self._extra_at = self._sec["text"][0], self._sec["extra"][0]
+        p_at = self._sec["paths"][0]
+        p_off = col["path_off"].tolist()
+        self.paths = [mm[p_at + a:p_at + b].decode("utf-8") for a, b in zip(p_off, p_off[1:])]
+
+    @classmethod
+    def open(cls, path: str) -> "ColumnarDocs":
+        return cls(path)
+
+    def _row(self, vid: int) -> int:
+        s = vid & self._mask
+        while True:
+            r = self._slots.item(s)
+            if r < 0 or self._vids.item(r) == vid:
+                return r
+            s = (s + 1) & self._mask
+
+    def _record(self, r: int) -> Dict[str, Any]:
+        # 스칼라 조회는 .item() (numpy 스칼라 생성 없이 파이썬 int)
+        t0, t1 = self._text_off.item(r), self._text_off.item(r + 1)
+        text = self._mm[self._text_at + t0:self._text_at + t1].decode("utf-8")
+        xa, xb = self._extra_off.item(r), self._extra_off.item(r + 1)
+        extra = json.loads(self._mm[self._extra_at + xa:self._extra_at + xb]) if xb > xa else {}
+        pid, chunk = self._path_id.item(r), self._chunk.item(r)
+        start, end = self._start.item(r), self._end.item(r)
+        meta: Dict[str, Any] = {}
+        path = self.paths[pid] if pid >= 0 else None
+        if path is not None:
+            meta["path"] = path
+        for key, v in (("chunk", chunk), ("start", start), ("end", end)):
+            if v >= 0:
+                meta[key] = v
+        meta.update(extra.get("meta", {}))
+        kind = self._id_kind.item(r)
+        cid = f"{path}::chunk_{chunk:04d}" if kind == _ID_CHUNK else \
+            f"{path}::span_{start:07d}" if kind == _ID_SPAN else extra.get("id")
+        rec = {"id": cid, "text": text, "meta": meta}
+        rec.update(extra.get("rec", {}))
+        if not self.positional:
+            rec["vid"] = self._vids.item(r)
+        return rec
+
+    def __getitem__(self, vid: int) -> Dict[str, Any]:
+        r = self._row(int(vid))
+        if r < 0:
+            raise KeyError(vid)
+        return self._record(r)
+
+    def __contains__(self, vid) -> bool:
+        return self._row(int(vid)) >= 0
+
+    def __len__(self) -> int:
+        return len(self._vids)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._vids.tolist())
+
+    def path_column(self) -> Tuple[np.ndarray, List[str]]:
+        """(vid 배열, 행별 경로) — 레코드 조립 없이 필터 색인 생성용"""
+        paths = self.paths + [""]  # path_id -1 → ""
+        return np.array(self._vids), [paths[i] for i in self._path_id.tolist()]
+
+    def memory_usage(self) -> Dict[str, int]:
+        """ram: 힙에 올린 바이트 (경로 목록. 열 배열은 매핑 위의 뷰), mapped: 파일 매핑(OS 가 회수 가능한 페이지 캐시)"""
+        ram = sum(sys.getsizeof(p) for p in self.paths) + sys.getsizeof(self.paths)
+        return {"ram": ram, "mapped": len(self._mm)}
+
+    def close(self):
+        for name in ("_vids", "_slots", "_text_off", "_extra_off", "_id_kind", "_chunk", "_path_id",
+                     "_start", "_end"):
+            setattr(self, name, None)
+        try:
+            self._mm.close()
+        except BufferError:  # 내보낸 배열이 아직 살아 있으면 GC 에 맡김
+            pass
+
+
+class DocsOverlay(MutableMapping):
+    """ColumnarDocs 위의 쓰기 가능한 매핑. 변경분(_new/_gone)만 메모리에 두고 조회는 mmap 파일로"""
+
+    def __init__(self, base: ColumnarDocs):
+        self.base = base
+        self._new: Dict[int, Dict[str, Any]] = {}
+        self._gone: set = set()  # 가려진(삭제/교체된) base vid
+
+    def __getitem__(self, vid: int) -> Dict[str, Any]:
+        vid = int(vid)
+        rec = self._new.get(vid)
+        if rec is not None:
+            return rec
+        if vid in self._gone:
+            raise KeyError(vid)
+        return self.base[vid]
+
+    def __setitem__(self, vid: int, rec: Dict[str, Any]):
+        vid = int(vid)
+        if vid in self.base:
+            self._gone.add(vid)
+        self._new[vid] = rec
+
+    def __delitem__(self, vid: int):
+        vid = int(vid)
+        if vid not in self:
+            raise KeyError(vid)
+        self._new.pop(vid, None)
+        if vid in self.base:
+            self._gone.add(vid)
+
+    def __contains__(self, vid) -> bool:
+        vid = int(vid)
+        return vid in self._new or (vid not in self._gone and vid in self.base)
+
+    def __len__(self) -> int:
+        return len(self.base) - len(self._gone) + len(self._new)
+
+    def __iter__(self) -> Iterator[int]:
+        for vid in self.base:
+            if vid not in self._gone:
+                yield vid
+        yield from list(self._new)
+
+    def path_column(self) -> Tuple[np.ndarray, List[str]]:
+        vids, paths = self.base.path_column()
+        if self._gone:
+            keep = ~np.isin(vids, np.fromiter(self._gone, dtype="int64", count=len(self._gone)))
+            vids, paths = vids[keep], [p for p, k in zip(paths, keep.tolist()) if k]
+        new_vids = np.fromiter(self._new, dtype="int64", count=len(self._new))
+        new_paths = [(rec.get("meta") or {}).get("path", "") for rec in self._new.values()]
+        return np.concatenate([vids, new_vids]), paths + new_paths
+
+    def memory_usage(self) -> Dict[str, int]:
+        """ram: 기반 파일의 힙 사용 + 변경분 레코드/가린 vid, mapped: docs.col"""
+        usage = self.base.memory_usage()
+        return {"ram": usage["ram"] + records_nbytes(self._new.values(), len(self._new)) + 64 * len(self._gone),
+                "mapped": usage["mapped"]}
+
+
+# ---------- 변환 ----------
+def convert_jsonl(index_dir: str, keep_jsonl: bool = False) -> Dict[str, Any]:
+    """기존 인덱스의 docs.jsonl → docs.col 로 바꾸고 메타(docs_format) 갱신. 벡터/인덱스는 그대로"""
+    from .store import meta_path_for, read_index_meta
+    from .docs_offsets import offsets_path
+
+    index_path = os.path.join(index_dir, "faiss.index")
+    docs_path = os.path.join(index_dir, "docs.jsonl")
+    with open(docs_path, "r", encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    positional = bool(records) and "vid" not in records[0]
+    docs = dict(enumerate(records)) if positional else {int(r["vid"]): r for r in records}
+    out = columnar_path(docs_path)
+    size = write_columnar(out + ".tmp", docs, positional=positional)
+    os.replace(out + ".tmp", out)
+
+    meta = read_index_meta(index_path)
+    meta.update(docs_format="columnar", docs_bytes=size, count=len(docs))
+    meta_path = meta_path_for(index_path)
+    with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    os.replace(meta_path + ".tmp", meta_path)
+    jsonl_bytes = os.path.getsize(docs_path)
+    if not keep_jsonl:
+        for p in (docs_path, offsets_path(docs_path)):
+            try:
+                os.remove(p)
+            except OSError:
+                pass
+    return {"docs": len(docs), "jsonl_bytes": jsonl_bytes, "columnar_bytes": size, "positional": positional}
+
+
+def main():
+    ap = argparse.ArgumentParser(description="docs.jsonl → docs.col 변환")
+    ap.add_argument("--index_dir", default="indices/day2")
+    ap.add_argument("--keep_jsonl", action="store_true", help="변환 후에도 docs.jsonl 을 남김")
+    args = ap.parse_args()
+    r = convert_jsonl(args.index_dir, keep_jsonl=args.keep_jsonl)
+    print(f"[OK] {r['docs']} docs: docs.jsonl {r['jsonl_bytes']:,} B → docs.col {r['columnar_bytes']:,} B")
+
+
+if __name__ == "__main__":
+    main()
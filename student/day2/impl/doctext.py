@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+문서 원문 저장소 (index_dir/doctext/) — 부모 창(parent window) 검색용
+- child 청크 모드에서는 겹치지 않는 작은 span 만 임베딩하고 (path, 문자 오프셋) 을 meta 에 기록
+- 질의 시 hit 의 span 을 앞뒤로 넓힌 부모 창을 이 저장소의 원문에서 잘라 반환
+- 파일 단위 저장(<sha1(path)>.txt) → 증분 빌드에서 바뀐/삭제된 문서만 교체
+"""
+
+from __future__ import annotations
+import os, hashlib, threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional
+
+DOCTEXT_DIRNAME = "doctext"
+
+
+class DocTextStore:
+    def __init__(self, index_dir: str, cache_docs: int = 64):
+        self.dir = os.path.join(index_dir, DOCTEXT_DIRNAME)
+        self._cache: "OrderedDict[str, tuple]" = OrderedDict()  # path -> (mtime_ns, text)
+        self._cache_docs = cache_docs
+        self._lock = threading.Lock()
+
+    def _path(self, doc_path: str) -> str:
+        return os.path.join(self.dir, hashlib.sha1(doc_path.encode("utf-8")).hexdigest() + ".txt")
+
+    def put(self, doc_path: str, text: str):
+        os.makedirs(self.dir, exist_ok=True)
+        p = self._path(doc_path)
+        with open(p + ".tmp", "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(p + ".tmp", p)
+        with self._lock:
+            self._cache.pop(doc_path, None)
+
+    def remove(self, doc_path: str):
+        try:
+            os.remove(self._path(doc_path))
+        except OSError:
+            pass
+        with self._lock:
+            self._cache.pop(doc_path, None)
+
+    def get(self, doc_path: str) -> Optional[str]:
+        """디코딩 LRU 는 (경로, mtime) 기준 → 다른 프로세스가 다시 빌드해도 낡은 원문을 주지 않음"""
+        p = self._path(doc_path)
+        try:
+            mtime = os.stat(p).st_mtime_ns
+        except OSError:
+            return None
+        with self._lock:
+            hit = self._cache.get(doc_path)
+            if hit is not None and hit[0] == mtime:
+                self._cache.move_to_end(doc_path)
+                return hit[1]
+        try:
+            with open(p, "r", encoding="utf-8") as f:
+                text = f.read()
+        except OSError:
+            return None
+        with self._lock:
+            self._cache[doc_path] = (mtime, text)
+            self._cache.move_to_end(doc_path)
+            while len(self._cache) > self._cache_docs:
+                self._cache.popitem(last=False)
+        return text
+
+
+def expand_parents(hits: List[Dict[str, Any]], texts: DocTextStore, window: int,
+                   max_chars: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    child hit → 앞뒤 window 글자를 붙인 부모 창. 같은 문서에서 겹치거나 맞닿는 창은 하나로 합침
+    결과 순서는 입력 순서(합쳐진 구간은 그 안에서 가장 앞선 hit 위치). 원문이 없는(window 모드) hit 는 그대로 둠
+    max_chars: 컨텍스트 예산. 모든 hit 를 넓혀도 예산에 들어가도록 window 를 줄이고,
+              병합 구간이 예산보다 길면 대표 hit 중심으로 잘라 앞부분이 예산을 다 쓰는 것 방지
+    """
+    if max_chars is not None and hits:
+        span_total = sum(h["meta"]["end"] - h["meta"]["start"] for h in hits if "start" in h.get("meta", {}))
+        window = max(0, min(window, (max_chars - span_total) // (2 * len(hits))))
+    spans: Dict[str, List[List[Any]]] = {}
+    out: List[tuple] = []  # (입력 순위, 결과)
+    for rank, h in enumerate(hits):
+        meta = h.get("meta", {})
+        if "start" not in meta:
+            out.append((rank, h))
+            continue
+        spans.setdefault(meta["path"], []).append([max(0, meta["start"] - window), meta["end"] + window, rank, h])
+
+    groups: List[tuple] = []  # (원문, start, end, [(rank, hit)])
+    for path, items in spans.items():
+        text = texts.get(path)
+        if text is None:
+            out.extend((it[2], it[3]) for it in items)
+            continue
+        items.sort(key=lambda it: it[0])
+        merged: List[List[Any]] = []
+        for s, e, rank, h in items:
+            if merged and s <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], e)
+                merged[-1][2].append((rank, h))
+            else:
+                merged.append([s, e, [(rank, h)]])
+        groups.extend((text, s, min(e, len(text)), g) for s, e, g in merged)
+
+    # 병합 구간이 예산보다 길면 대표 hit 를 가운데 두고 예산 길이로 자름
+    share = max_chars
+    for text, s, e, group in groups:
+        rank, first = min(group, key=lambda g: g[0])
+        if share and e - s > share:
+            mid = (first["meta"]["start"] + first["meta"]["end"]) // 2
+            s2 = max(s, mid - share // 2)
+            e2 = min(e, s2 + share)
+            s, e = max(s, e2 - share), e2
+        score = max(h["score"] for _, h in group)
+        out.append((rank, dict(first, chunk=text[s:e], score=score,
+                               meta=dict(first["meta"], span=[s, e], hits=[h["doc_id"] for _, h in group]))))
+    out.sort(key=lambda x: x[0])
+    return [h for _, h in out]
@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+"""
+내용 주소 기반 임베딩 디스크 캐시 (인덱싱/질의 공용)
+- 키: (model, dim) 별 디렉토리 + sha256(정규화 텍스트)
+- 저장: mmap float32 행렬(vectors.f32) + 키 배열(keys.u8) + 최근 사용 시각(atime.i64)
+  → 모두 memmap 이라 put/get 시 파일 전체를 다시 쓰지 않음
+- 용량: max_mb 를 넘으면 가장 오래 안 쓴 행부터 일괄 제거(LRU)
+- 여러 프로세스 공유 (서비스 프로세스 + build_index 가 같은 디렉토리를 씀):
+  행 할당/쓰기/확장/축출은 디렉토리 파일 잠금(lock) 안에서, 잠금을 잡으면 세대(gen.i64)가 바뀌었을 때
+  다른 프로세스가 쓴 행/빈 행 상태를 파일에서 다시 읽음. 읽기는 잠금 없이 행의 키 바이트를 벡터 복사 전후로
+  비교해 요청 키와 다르면(다른 프로세스가 그 행을 재사용) 미스로 처리
+  쓰기는 키 무효화 → 벡터 → 키 순서라 읽기가 새 벡터 + 옛 키 조합을 보지 않음
+"""
+
+from __future__ import annotations
+import os, re, json, hashlib, threading, unicodedata
+from contextlib import contextmanager
+from typing import List, Dict
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+CACHE_VERSION = 1
+_KEY_BYTES = 32
+_MIN_CAPACITY = 1024
+_EVICT_FRACTION = 0.1
+
+
+def normalize_text(text: str) -> str:
+    """NFC + 공백 정리 (공백 차이만 있는 텍스트는 같은 키)"""
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFC", text or "")).strip()
+
+
+def text_key(text: str) -> bytes:
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).digest()
+
+
+def _safe_name(s: str) -> str:
+    return re.sub(r"[^0-9A-Za-z._-]+", "_", s)
+
+
+class EmbeddingCache:
+    def __init__(self, cache_dir: str, model: str, dim: int, max_mb: float = 512.0):
+        self.model = model
+        self.dim = int(dim)
+        self.dir = os.path.join(cache_dir, f"{_safe_name(model)}__d{self.dim}")
+        self.max_rows = max(_MIN_CAPACITY, int(max_mb * 2 ** 20) // (self.dim * 4))
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evicted": 0}
+        os.makedirs(self.dir, exist_ok=True)
+        self._gen_seen = -1
+        with self._lock, self._file_lock():
+            self._open()
+
+    # ---------- 파일 ----------
+    def _path(self, name: str) -> str:
+        return os.path.join(self.dir, name)
+
+    @contextmanager
+    def _file_lock(self):
+        """프로세스 간 배타 잠금 (디렉토리의 lock 파일)"""
+        with open(self._path("lock"), "a+b") as f:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+                else:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def _read_capacity(self) -> int:
+        try:
+            with open(self._path("meta.json"), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return 0
+        if meta.get("version") == CACHE_VERSION and meta.get("dim") == self.dim:
+            return int(meta["capacity"])
+        return 0
+
+    def _open(self):
+        """(두 잠금 보유) 파일을 열고 행 상태를 읽음"""
+        capacity = self._read_capacity()
+        if capacity == 0:
+            for name in ("vectors.f32", "keys.u8", "atime.i64"):
+                if os.path.exists(self._path(name)):
+                    os.remove(self._path(name))
+            capacity = min(_MIN_CAPACITY, self.max_rows)
+        with open(self._path("gen.i64"), "ab") as f:
+            f.truncate(8)
+        self._gen = np.memmap(self._path("gen.i64"), dtype="int64", mode="r+", shape=(1,))
+        self._map(capacity)
+        self._load_rows()
+
+    def _load_rows(self):
+        """파일의 키/사용 시각으로 vid 행 사전과 빈 행 목록을 다시 만듦"""
+        # 키가 비어 있는 행은 쓰는 중/축출된 행 (다른 프로세스의 get 이 atime 만 찍었을 수 있음)
+        used = (self._atime > 0) & self._keys.any(axis=1)
+        self._rows: Dict[bytes, int] = {bytes(self._keys[i]): int(i) for i in np.flatnonzero(used)}
+        self._free: List[int] = [int(i) for i in np.flatnonzero(~used)[::-1]]
+        self._tick = int(self._atime.max()) if len(self._atime) else 0
+        self._gen_seen = int(self._gen[0])
+
+    def _refresh(self):
+        """(self._lock 보유) 다른 프로세스가 쓴 뒤면 (세대 변경) 확장된 파일을 다시 매핑하고 행 상태를 다시 읽음"""
+        if int(self._gen[0]) == self._gen_seen:
+            return
+        capacity = self._read_capacity()
+        if capacity > self.capacity:
+            self._map(capacity, write_meta=False)
+        self._load_rows()
+
+    def _map(self, capacity: int, write_meta: bool = True):
+        """capacity 행으로 파일 크기를 맞추고 memmap 을 (다시) 연다"""
+        for name, width in (("vectors.f32", self.dim * 4), ("keys.u8", _KEY_BYTES), ("atime.i64", 8)):
+            p = self._path(name)
+            with open(p, "ab") as f:
+                if f.tell() < capacity * width:  # 다른 프로세스가 더 키웠으면 줄이지 않음
+                    f.truncate(capacity * width)
+        self._vecs = np.memmap(self._path("vectors.f32"), dtype="float32", mode="r+", shape=(capacity, self.dim))
+        self._keys = np.memmap(self._path("keys.u8"), dtype="uint8", mode="r+", shape=(capacity, _KEY_BYTES))
+        self._atime = np.memmap(self._path("atime.i64"), dtype="int64", mode="r+", shape=(capacity,))
+        self.capacity = capacity
+        if not write_meta:
+            return
+        tmp = self._path("meta.json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": CACHE_VERSION, "model": self.model, "dim": self.dim,
+                       "capacity": capacity}, f)
+        os.replace(tmp, self._path("meta.json"))
+
+    def _grow_or_evict(self, need: int):
+        if len(self._free) >= need:
+            return
+        if self.capacity < self.max_rows:
+            old = self.capacity
+            new = min(self.max_rows, max(old * 2, old + need))
+            self.flush()
+            self._map(new)
+            self._free.extend(range(new - 1, old - 1, -1))
+        if len(self._free) < need:
+            # LRU: atime 이 가장 작은 행부터 일괄 제거
+            n_evict = min(len(self._rows), max(need - len(self._free), int(self.capacity * _EVICT_FRACTION)))
+            used = np.fromiter(self._rows.values(), dtype=np.int64, count=len(self._rows))
+            victims = used[np.argpartition(self._atime[used], n_evict - 1)[:n_evict]]
+            for i in victims:
+                self._rows.pop(bytes(self._keys[i]), None)
+                self._atime[i] = 0
+                self._keys[i] = 0
+                self._free.append(int(i))
+            self.stats["evicted"] += len(victims)
+
+    # ---------- API ----------
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def get_many(self, keys: List[bytes]) -> Dict[bytes, np.ndarray]:
+        out: Dict[bytes, np.ndarray] = {}
+        with self._lock:
+            self._refresh()
+            for k in keys:
+                row = self._rows.get(k)
+                if row is None:
+                    continue
+                # 벡터 복사 전후로 행의 키 확인 → 다른 프로세스가 그 행을 재사용 중/재사용했으면 미스
+                if bytes(self._keys[row]) != k:
+                    self._rows.pop(k, None)
+                    continue
+                vec = np.array(self._vecs[row])
+                if bytes(self._keys[row]) != k:
+                    self._rows.pop(k, None)
+                    continue
+                self._tick += 1
+                self._atime[row] = self._tick
+                out[k] = vec
+            self.stats["hits"] += len(out)
+            self.stats["misses"] += len(keys) - len(out)
+        return out
+
+    def put_many(self, keys: List[bytes], vecs: np.ndarray):
+        assert vecs.shape == (len(keys), self.dim)
+        with self._lock, self._file_lock():
+            self._refresh()
+            new = [i for i, k in enumerate(keys) if k not in self._rows]
+            # 한 번에 담을 수 없는 양이면 뒤쪽(최근) 것만 보관
+            new = new[-self.max_rows:]
+            if not new:
+                return
+            self._grow_or_evict(len(new))
+            for i in new:
+                row = self._free.pop()
+                self._tick += 1
+                self._keys[row] = 0  # 읽는 쪽이 새 벡터 + 옛 키 조합을 보지 않도록 키부터 무효화
+                self._vecs[row] = vecs[i]
+                self._keys[row] = np.frombuffer(keys[i], dtype="uint8")
+                self._atime[row] = self._tick
+                self._rows[keys[i]] = row
+            self._gen[0] += 1
+            self._gen_seen = int(self._gen[0])
+
+    def flush(self):
+        for m in (self._vecs, self._keys, self._atime, self._gen):
+            m.flush()
+
+    def hit_rate(self) -> float:
+        total = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / total if total else 0.0
@@ -2,20 +2,77 @@
 """
 OpenAI 임베딩 래퍼
 - 요구사항: 배치 인코딩, 재시도(backoff), L2 정규화
+- 배치는 리스트 입력 1회 호출로 보내며, 추정 토큰 수 기준으로 묶음
+- concurrency > 1 이면 여러 배치를 동시에 요청 (rpm/tpm 제한 + 429 기반 AIMD)
+- 디스크 캐시(emb_cache): 같은 (모델, 차원, 텍스트)는 API 를 다시 호출하지 않음
+- dimensions: text-embedding-3 의 차원 축소 파라미터 (캐시도 차원별로 분리)
+  DAY2_EMB_CACHE_DIR (기본 indices/emb_cache, "off" 면 끔), DAY2_EMB_CACHE_MB (기본 512)
+- 로컬 대체 서버로 시험: OPENAI_BASE_URL=http://127.0.0.1:8765/v1 (student/day2/fake_embed_server.py)
 """
 
-import os, time
-from typing import List
+import os, time, random, threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict
 import numpy as np
 # from httpx import ReadTimeout  # 선택: 재시도 구분용
-from openai import OpenAI
+from openai import OpenAI, RateLimitError
+
+from .ratelimit import RateLimiter, AIMDController
+from .emb_cache import EmbeddingCache, text_key
+
+# 알려진 모델의 기본 차원 (원격 차원 확인 호출 생략용)
+_MODEL_DIMS = {
+    "text-embedding-3-small": 1536,
+    "text-embedding-3-large": 3072,
+    "text-embedding-ada-002": 1536,
+}
+
+# 요청당 한도 (OpenAI embeddings: 입력 2048개, 합계 300k 토큰) — 토큰은 여유를 두고 묶음
+MAX_INPUTS_PER_REQUEST = 2048
+DEFAULT_MAX_BATCH_TOKENS = 100_000
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    tiktoken 없이 쓰는 보수적 토큰 수 추정
+    - ASCII 는 약 4자당 1토큰, 한글 등 비ASCII 는 1자당 1토큰으로 계산
+    """
+    n_ascii = len(text.encode("ascii", "ignore"))
+    return n_ascii // 4 + (len(text) - n_ascii) + 1
+
+
+def _is_rate_limited(exc: Exception) -> bool:
+    return isinstance(exc, RateLimitError) or getattr(exc, "status_code", None) == 429
+
+
+def _retry_delay(exc: Exception, attempt: int) -> float:
+    """Retry-After 헤더가 있으면 따르고, 없으면 지수 backoff + jitter"""
+    resp = getattr(exc, "response", None)
+    headers = getattr(resp, "headers", None) or {}
+    try:
+        ra = float(headers.get("retry-after", ""))
+        if ra >= 0:
+            return ra
+    except (TypeError, ValueError):
+        pass
+    base = 0.5 * (2 ** attempt)
+    return base * random.uniform(0.5, 1.0)
 
 
 class Embeddings:
-    def __init__(self, model: str | None = None, batch_size: int = 128, max_retries: int = 4):
+    def __init__(self, model: str | None = None, batch_size: int = 128, max_retries: int = 4,
+                 max_batch_tokens: int = DEFAULT_MAX_BATCH_TOKENS, concurrency: int = 1,
+                 rpm: float | None = None, tpm: float | None = None,
+                 cache_dir: str | None = None, cache_mb: float | None = None,
+                 dimensions: int | None = None):
         """
         - self.model 기본값: "text-embedding-3-small" 권장
         - self.batch_size, self.max_retries 저장
+        - max_batch_tokens: 요청 1회에 담을 추정 토큰 합 상한
+        - concurrency: 동시에 보낼 수 있는 최대 배치 수 (1 = 순차)
+        - rpm / tpm: 분당 요청 수 / 분당 토큰 수 상한 (None = 제한 없음)
+        - cache_dir / cache_mb: 임베딩 디스크 캐시 위치/용량 (None 이면 환경변수, "off" 면 사용 안 함)
+        - dimensions: 출력 차원 축소 (text-embedding-3 계열 API 파라미터, None = 모델 기본 차원)
         - OpenAI 클라이언트 생성 (키는 환경변수 OPENAI_API_KEY)
         """
         # ----------------------------------------------------------------------------
@@ -28,8 +85,43 @@ class Embeddings:
         self.model = model or "text-embedding-3-small"
         self.batch_size = batch_size
         self.max_retries = max_retries
+        self.max_batch_tokens = max_batch_tokens
+        self.concurrency = max(1, int(concurrency))
+        self.limiter = RateLimiter(rpm=rpm, tpm=tpm) if (rpm or tpm) else None
+        self.aimd = AIMDController(self.concurrency) if self.concurrency > 1 else None
         key = os.getenv("OPENAI_API_KEY")
-        self.client = OpenAI(api_key=key)
+        # 재시도/backoff 는 encode 에서 직접 처리 (429 를 AIMD 가 볼 수 있도록 SDK 재시도는 끔)
+        self.client = OpenAI(api_key=key, max_retries=0)
+        self.dimensions = int(dimensions) if dimensions else None
+        self._dim: int | None = self.dimensions or _MODEL_DIMS.get(self.model)
+        self._api_kwargs = {"dimensions": self.dimensions} if self.dimensions else {}
+        # 누적 호출 통계 (build_index 처리량 리포트용)
+        self.stats = {"requests": 0, "inputs": 0, "est_tokens": 0, "api_tokens": 0,
+                      "retries": 0, "throttled": 0, "cache_hits": 0, "cache_misses": 0}
+        self._stats_lock = threading.Lock()
+        self.cache_dir = cache_dir if cache_dir is not None else os.getenv("DAY2_EMB_CACHE_DIR", "indices/emb_cache")
+        self.cache_mb = float(cache_mb if cache_mb is not None else os.getenv("DAY2_EMB_CACHE_MB", "512"))
+        self._cache: EmbeddingCache | None = None
+
+    @property
+    def cache(self) -> EmbeddingCache | None:
+        """차원이 정해진 뒤 처음 필요할 때 연다"""
+        if self._cache is None and self.cache_dir and self.cache_dir.lower() != "off":
+            self._cache = EmbeddingCache(self.cache_dir, self.model, self.dim, max_mb=self.cache_mb)
+        return self._cache
+
+    def cache_hit_rate(self) -> float:
+        total = self.stats["cache_hits"] + self.stats["cache_misses"]
+        return self.stats["cache_hits"] / total if total else 0.0
+
+    @property
+    def dim(self) -> int:
+        """
+        출력 차원. 알려진 모델은 표에서, 그 외에는 최초 1회만 원격 호출로 확인 후 캐시
+        """
+        if self._dim is None:
+            self._dim = int(self._embed_once("__dim_check__").shape[0])
+        return self._dim
 
     def _embed_once(self, text: str) -> np.ndarray:
         """
@@ -44,13 +136,107 @@ class Embeddings:
         #  - return vec
         # ----------------------------------------------------------------------------
         # 정답 구현:
-        resp = self.client.embeddings.create(model=self.model, input=text)
+        resp = self.client.embeddings.create(model=self.model, input=text, **self._api_kwargs)
         vec = np.array(resp.data[0].embedding, dtype="float32")
         norm = np.linalg.norm(vec) + 1e-12
         vec = vec / norm
         return vec
 
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        """
+        리스트 입력 1회 호출 → (len(texts), D) float32 + 행별 L2 정규화
+        - 응답 data 는 index 기준으로 다시 정렬해 입력 순서를 보장
+        """
+        # 빈 문자열은 API 가 거부하므로 공백 1자로 대체
+        inputs = [t if t else " " for t in texts]
+        resp = self.client.embeddings.create(model=self.model, input=inputs, **self._api_kwargs)
+        data = sorted(resp.data, key=lambda d: d.index)
+        mat = np.asarray([d.embedding for d in data], dtype="float32")
+        mat /= (np.linalg.norm(mat, axis=1, keepdims=True) + 1e-12)
+        usage = getattr(resp, "usage", None)
+        with self._stats_lock:
+            self.stats["requests"] += 1
+            self.stats["api_tokens"] += int(getattr(usage, "total_tokens", 0) or 0)
+        return mat
+
+    def _run_batch(self, batch: List[str]) -> np.ndarray:
+        """
+        배치 1개 요청 + 재시도. 실패한 이 배치만 다시 보냄
+        - rpm/tpm 토큰 확보 → (동시 모드) AIMD 슬롯 확보 → 호출
+        """
+        tokens = sum(estimate_tokens(t) for t in batch)
+        for attempt in range(self.max_retries):
+            if self.limiter is not None:
+                self.limiter.acquire(tokens)
+            if self.aimd is not None:
+                self.aimd.acquire()
+            try:
+                mat = self._embed_batch(batch)
+            except Exception as e:
+                throttled = _is_rate_limited(e)
+                if self.aimd is not None:
+                    self.aimd.release(throttled=throttled)
+                if attempt == self.max_retries - 1:
+                    raise
+                with self._stats_lock:
+                    self.stats["retries"] += 1
+                    self.stats["throttled"] += int(throttled)
+                time.sleep(_retry_delay(e, attempt))
+                continue
+            if self.aimd is not None:
+                self.aimd.release()
+            with self._stats_lock:
+                self.stats["inputs"] += len(batch)
+                self.stats["est_tokens"] += tokens
+            return mat
+        raise RuntimeError("max_retries must be >= 1")
+
+    def pack_batches(self, texts: List[str]) -> List[List[int]]:
+        """
+        입력 순서를 유지하며 (개수 ≤ batch_size, 추정 토큰 합 ≤ max_batch_tokens) 로 묶은 인덱스 목록
+        """
+        limit_n = max(1, min(self.batch_size, MAX_INPUTS_PER_REQUEST))
+        batches: List[List[int]] = []
+        cur: List[int] = []
+        cur_tok = 0
+        for i, t in enumerate(texts):
+            tok = estimate_tokens(t)
+            if cur and (len(cur) >= limit_n or cur_tok + tok > self.max_batch_tokens):
+                batches.append(cur)
+                cur, cur_tok = [], 0
+            cur.append(i)
+            cur_tok += tok
+        if cur:
+            batches.append(cur)
+        return batches
+
     def encode(self, texts: List[str]) -> np.ndarray:
+        """
+        캐시 조회 → 미스(중복 제거)만 API 인코딩 → 캐시 저장. 최종 shape = (N, D), 입력 순서 유지
+        """
+        cache = self.cache if texts else None
+        if cache is None:
+            return self._encode_api(texts)
+
+        keys = [text_key(t) for t in texts]
+        found = cache.get_many(keys)
+        miss: Dict[bytes, str] = {}
+        for k, t in zip(keys, texts):
+            if k not in found and k not in miss:
+                miss[k] = t
+        n_miss = sum(1 for k in keys if k not in found)
+        with self._stats_lock:
+            self.stats["cache_hits"] += len(texts) - n_miss
+            self.stats["cache_misses"] += n_miss
+        if miss:
+            mkeys = list(miss)
+            mvecs = self._encode_api([miss[k] for k in mkeys])
+            cache.put_many(mkeys, mvecs)
+            cache.flush()
+            found.update(zip(mkeys, mvecs))
+        return np.vstack([found[k] for k in keys]).astype("float32", copy=False)
+
+    def _encode_api(self, texts: List[str]) -> np.ndarray:
         """
         배치 인코딩 + 재시도(backoff). 최종 shape = (N, D)
         - 비어 있으면 (0, D) 반환. D는 1536 등 모델 차원 (미정이면 1536 가정 가능)
@@ -58,32 +244,34 @@ class Embeddings:
         # ----------------------------------------------------------------------------
         # TODO[DAY2-E-03] 구현 지침
         #  - if not texts: return np.zeros((0, 1536), dtype="float32")
-        #  - out = []
-        #  - for start in range(0, len(texts), self.batch_size):
-        #       batch = texts[start:start+self.batch_size]
-        #       for each in batch:
-        #          for attempt in range(self.max_retries):
-        #             try:
-        #                out.append(self._embed_once(each)); break
-        #             except Exception as e:
-        #                time.sleep(0.5 * (2 ** attempt))
-        #                if attempt == self.max_retries - 1: raise
-        #  - return np.vstack(out)
+        #  - batches = self.pack_batches(texts)   # 개수/추정 토큰 기준 묶음
+        #  - for idxs in batches:   # concurrency > 1 이면 스레드 풀로 동시에
+        #       mat = self._run_batch([texts[i] for i in idxs])   # 실패한 배치만 재시도
+        #       out[idxs] = mat   # 입력 순서 유지
+        #  - return out
         # ----------------------------------------------------------------------------
         # 정답 구현:
         if not texts:
-            return np.zeros((0, 1536), dtype="float32")
-
-        out: list[np.ndarray] = []
-        for start in range(0, len(texts), self.batch_size):
-            batch = texts[start:start + self.batch_size]
-            for each in batch:
-                for attempt in range(self.max_retries):
-                    try:
-                        out.append(self._embed_once(each))
-                        break
-                    except Exception:
-                        time.sleep(0.5 * (2 ** attempt))
-                        if attempt == self.max_retries - 1:
-                            raise
-        return np.vstack(out)
+            return np.zeros((0, self.dimensions or _MODEL_DIMS.get(self.model, 1536)), dtype="float32")
+
+        batches = self.pack_batches(texts)
+        out: np.ndarray | None = None
+
+        def _put(idxs: List[int], mat: np.ndarray):
+            nonlocal out
+            if out is None:
+                out = np.zeros((len(texts), mat.shape[1]), dtype="float32")
+                self._dim = mat.shape[1]
+            out[idxs] = mat  # 입력 순서 유지
+
+        if self.concurrency == 1 or len(batches) == 1:
+            for idxs in batches:
+                _put(idxs, self._run_batch([texts[i] for i in idxs]))
+            return out
+
+        # 동시 모드: 실제 동시 요청 수는 AIMD 한도가 조절 (스레드 수 = 상한)
+        with ThreadPoolExecutor(max_workers=self.concurrency) as ex:
+            futs = {ex.submit(self._run_batch, [texts[i] for i in idxs]): idxs for idxs in batches}
+            for fut in as_completed(futs):
+                _put(futs[fut], fut.result())
+        return out
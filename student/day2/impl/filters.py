@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""
+메타데이터 사전 필터 (index_dir/filters.npz, 저장 시 docs 로 생성)
+- 필드별로 vid 를 정렬해 둔 배열(CSR) → 필터 1개 = 연속 구간 1~몇 개, 여러 필드는 교집합
+  · path    : 경로 사전순 정렬 → 접두사는 bisect 로 구한 경로 구간 하나, 정확한 경로 목록(path)은 경로별 구간
+  · doc_type: 확장자(pdf/md/txt) 별 vid 목록
+  · date    : 파일명의 YYYYMMDD(또는 YYYY-MM-DD) 기준 정렬 → 기간은 searchsorted 구간 하나. 날짜 없는 문서는 0
+- 결과 vid 는 FaissStore.search_batch 가 faiss IDSelector 로 넘겨 스캔 안에서 걸러냄
+
+where 예: {"path_prefix": "data/processed/", "doc_type": ["md"], "date_from": "2025-11-12", "date_to": 20251112}
+         {"path": ["data/raw/a.pdf", "data/raw/b.pdf"]}  (문서 라우팅 결과 등 정확한 경로)
+"""
+
+from __future__ import annotations
+import os, re, bisect
+from collections.abc import Mapping
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+
+FILTERS_FILENAME = "filters.npz"
+WHERE_KEYS = ("path_prefix", "path", "doc_type", "date_from", "date_to")
+_DATE_RE = re.compile(r"(?<!\d)(20\d{2})[-_.]?([01]\d)[-_.]?([0-3]\d)(?!\d)")
+
+
+def doc_type(path: str) -> str:
+    return os.path.splitext(path)[1].lstrip(".").lower()
+
+
+def doc_date(path: str) -> int:
+    """파일명에서 YYYYMMDD 정수 (예: data/processed/20251112_085955__day2__...md → 20251112). 없으면 0"""
+    m = _DATE_RE.search(os.path.basename(path))
+    return int("".join(m.groups())) if m else 0
+
+
+def parse_date(value: Any) -> int:
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    digits = re.sub(r"\D", "", str(value))
+    if len(digits) != 8:
+        raise ValueError(f"날짜 형식은 YYYYMMDD 또는 YYYY-MM-DD 입니다: {value!r}")
+    return int(digits)
+
+
+def _as_list(v: Any) -> List[str]:
+    return [v] if isinstance(v, str) else list(v)
+
+
+def check_where(where: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """빈 필터는 None, 모르는 키는 ValueError"""
+    if not where:
+        return None
+    unknown = set(where) - set(WHERE_KEYS)
+    if unknown:
+        raise ValueError(f"지원하지 않는 필터 키: {sorted(unknown)} (가능: {', '.join(WHERE_KEYS)})")
+    return where
+
+
+def match_path(path: str, where: Optional[Dict[str, Any]]) -> bool:
+    """문서 경로 하나가 where 를 만족하는지 (모든 조건이 경로에서 나오므로 청크 없이 판정)"""
+    where = check_where(where)
+    if where is None:
+        return True
+    if where.get("path_prefix") and not any(path.startswith(p) for p in _as_list(where["path_prefix"])):
+        return False
+    if where.get("path") is not None and path not in _as_list(where["path"]):
+        return False
+    if where.get("doc_type") and doc_type(path) not in {x.lower().lstrip(".") for x in _as_list(where["doc_type"])}:
+        return False
+    if where.get("date_from") is not None or where.get("date_to") is not None:
+        d = doc_date(path)
+        if not d or (where.get("date_from") is not None and d < parse_date(where["date_from"])) \
+                or (where.get("date_to") is not None and d > parse_date(where["date_to"])):
+            return False
+    return True
+
+
+class FilterIndex:
+    def __init__(self, paths: np.ndarray, path_offsets: np.ndarray, path_vids: np.ndarray,
+                 types: np.ndarray, type_offsets: np.ndarray, type_vids: np.ndarray,
+                 dates: np.ndarray, date_vids: np.ndarray):
+        self.paths = [str(p) for p in paths]
+        self.path_offsets, self.path_vids = path_offsets, path_vids
+        self.types = [str(t) for t in types]
+        self.type_offsets, self.type_vids = type_offsets, type_vids
+        self.dates, self.date_vids = dates, date_vids  # dates 오름차순, date_vids 같은 순서
+
+    def __len__(self) -> int:
+        return len(self.path_vids)
+
+    @classmethod
+    def build(cls, docs: Mapping) -> "FilterIndex":
+        if hasattr(docs, "path_column"):  # 컬럼형 docs: 레코드 조립 없이 경로 컬럼만
+            return cls._from_columns(*docs.path_column())
+        vids = np.fromiter(docs.keys(), dtype="int64", count=len(docs))
+        paths = [(docs[int(v)].get("meta") or {}).get("path", "") for v in vids]
+        return cls._from_columns(vids, paths)
+
+    @classmethod
+    def _from_columns(cls, vids: np.ndarray, paths: List[str]) -> "FilterIndex":
+        uniq = sorted(set(paths))
+        pid = {p: i for i, p in enumerate(uniq)}
+        path_ids = np.array([pid[p] for p in paths], dtype="int64")
+        types = sorted({doc_type(p) for p in uniq})
+        tid = {t: i for i, t in enumerate(types)}
+        type_ids = np.array([tid[doc_type(p)] for p in uniq], dtype="int64")[path_ids] if uniq \
+            else np.zeros(0, dtype="int64")
+        dates = np.array([doc_date(p) for p in uniq], dtype="int64")[path_ids] if uniq \
+            else np.zeros(0, dtype="int64")
+
+        def _csr(keys: np.ndarray, n_keys: int):
+            order = np.argsort(keys, kind="stable")
+            offsets = np.zeros(n_keys + 1, dtype="int64")
+            np.cumsum(np.bincount(keys, minlength=n_keys), out=offsets[1:])
+            return offsets, vids[order]
+
+        path_offsets, path_vids = _csr(path_ids, len(uniq))
+        type_offsets, type_vids = _csr(type_ids, len(types))
+        order = np.argsort(dates, kind="stable")
+        return cls(np.array(uniq, dtype=object), path_offsets, path_vids,
+                   np.array(types, dtype=object), type_offsets, type_vids, dates[order], vids[order])
+
+    def save(self, path: str):
+        tmp = path + ".tmp.npz"
+        np.savez(tmp, paths=np.array(self.paths, dtype=str), path_offsets=self.path_offsets,
+                 path_vids=self.path_vids, types=np.array(self.types, dtype=str),
+                 type_offsets=self.type_offsets, type_vids=self.type_vids,
+                 dates=self.dates, date_vids=self.date_vids)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "FilterIndex":
+        with np.load(path) as z:
+            return cls(z["paths"], z["path_offsets"], z["path_vids"], z["types"], z["type_offsets"],
+                       z["type_vids"], z["dates"], z["date_vids"])
+
+    # ---------- 조회 ----------
+    def _path_prefix(self, prefixes: List[str]) -> np.ndarray:
+        parts = []
+        for pre in prefixes:
+            lo = bisect.bisect_left(self.paths, pre)
+            hi = bisect.bisect_left(self.paths, pre + "\U0010ffff")
+            parts.append(self.path_vids[self.path_offsets[lo]:self.path_offsets[hi]])
+        return np.unique(np.concatenate(parts))  # 여러 경로에 걸친 구간 → vid 순으로
+
+    def _paths(self, paths: List[str]) -> np.ndarray:
+        parts = []
+        for p in paths:
+            i = bisect.bisect_left(self.paths, p)
+            if i < len(self.paths) and self.paths[i] == p:
+                parts.append(self.path_vids[self.path_offsets[i]:self.path_offsets[i + 1]])
+        return np.sort(np.concatenate(parts)) if parts else np.zeros(0, dtype="int64")
+
+    def _doc_type(self, types: List[str]) -> np.ndarray:
+        parts = [self.type_vids[self.type_offsets[i]:self.type_offsets[i + 1]]
+                 for i, t in enumerate(self.types) if t in {x.lower().lstrip(".") for x in types}]
+        return np.unique(np.concatenate(parts)) if parts else np.zeros(0, dtype="int64")
+
+    def _date_range(self, lo: Optional[int], hi: Optional[int]) -> np.ndarray:
+        s = int(np.searchsorted(self.dates, max(lo or 1, 1), side="left"))  # 날짜 없는(0) 문서 제외
+        e = int(np.searchsorted(self.dates, hi, side="right")) if hi is not None else len(self.dates)
+        return np.sort(self.date_vids[s:max(s, e)])
+
+    def select(self, where: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+        """조건을 모두 만족하는 vid (오름차순). 필터가 없으면 None"""
+        where = check_where(where)
+        if where is None:
+            return None
+        parts = []
+        if where.get("path_prefix"):
+            parts.append(self._path_prefix(_as_list(where["path_prefix"])))
+        if where.get("path") is not None:  # 빈 목록 = 허용 문서 없음
+            parts.append(self._paths(_as_list(where["path"])))
+        if where.get("doc_type"):
+            parts.append(self._doc_type(_as_list(where["doc_type"])))
+        if where.get("date_from") is not None or where.get("date_to") is not None:
+            lo = parse_date(where["date_from"]) if where.get("date_from") is not None else None
+            hi = parse_date(where["date_to"]) if where.get("date_to") is not None else None
+            parts.append(self._date_range(lo, hi))
+        if not parts:
+            return None
+        parts.sort(key=len)  # 작은 집합부터 교집합
+        out = parts[0]
+        for p in parts[1:]:
+            out = np.intersect1d(out, p, assume_unique=True)
+        return out
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""
+FaissStore 인덱스 종류/파라미터
+- flat     : IDMap2(IndexFlatIP)      정확 검색, 소규모 기본값
+- hnsw     : IDMap2(HNSW{m},Flat)     그래프 ANN, 삭제 미지원 → 삭제 시 재구성
+- ivf_flat : IVF{nlist},Flat          k-means 학습 필요, id/삭제 자체 지원
+- ivf_pq   : IVF{nlist},PQ{m}x{nbits} 학습 필요, 벡터를 압축 저장 (메모리 ↓, 재현율 ↓)
+- auto     : 벡터 수 < AUTO_FLAT_MAX 이면 flat, 이상이면 ivf_flat
+precision(flat/hnsw/ivf_flat 의 벡터 저장 정밀도): fp32(기본) | fp16(SQfp16, 1/2) | sq8(SQ8, 1/4, 차원별 범위 학습)
+IVF 는 IDMap2 로 감싸지 않는다 (IDMap 의 내부 id 압축이 IVF 삭제와 어긋남) → 자체 id + Hashtable direct map
+"""
+
+from __future__ import annotations
+import math
+from typing import Dict, Any, Optional
+
+import numpy as np
+import faiss
+
+INDEX_TYPES = ("flat", "hnsw", "ivf_flat", "ivf_pq")
+PRECISIONS = {"fp32": "Flat", "fp16": "SQfp16", "sq8": "SQ8"}
+AUTO_FLAT_MAX = 20_000
+MAX_TRAIN = 100_000
+
+
+def resolve_index_type(index_type: str, n: int) -> str:
+    index_type = (index_type or "flat").lower()
+    if index_type == "auto":
+        return "flat" if n < AUTO_FLAT_MAX else "ivf_flat"
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"지원하지 않는 index_type: {index_type} (가능: auto, {', '.join(INDEX_TYPES)})")
+    return index_type
+
+
+def precision_of(params: Dict[str, Any]) -> str:
+    precision = (params.get("precision") or "fp32").lower()
+    if precision not in PRECISIONS:
+        raise ValueError(f"지원하지 않는 precision: {precision} (가능: {', '.join(PRECISIONS)})")
+    return precision
+
+
+def needs_training(index_type: str, params: Dict[str, Any]) -> bool:
+    """빈 벡터로 미리 만들 수 없는(학습 필요) 조합"""
+    return index_type != "flat" or precision_of(params) == "sq8"
+
+
+def _pq_m(dim: int) -> int:
+    """서브양자화기당 약 8차원, 최대 64개. dim 을 나누어떨어지게 하는 최대값"""
+    target = max(1, min(64, dim // 8))
+    for m in range(target, 0, -1):
+        if dim % m == 0:
+            return m
+    return 1
+
+
+def default_params(index_type: str, dim: int, n: int) -> Dict[str, Any]:
+    if index_type == "hnsw":
+        return {"m": 32, "ef_construction": 200, "ef_search": 64}
+    if index_type in ("ivf_flat", "ivf_pq"):
+        # 경험칙 nlist ≈ 4√N, 리스트당 학습점 39개 이상 확보
+        nlist = max(1, min(int(4 * math.sqrt(max(n, 1))), max(1, n // 39)))
+        params: Dict[str, Any] = {"nlist": nlist, "nprobe": min(nlist, max(8, nlist // 16))}
+        if index_type == "ivf_pq":
+            params.update({"pq_m": _pq_m(dim), "pq_nbits": 8 if n >= 256 * 39 else 6})
+        return params
+    return {}
+
+
+def factory_string(index_type: str, params: Dict[str, Any]) -> str:
+    codec = PRECISIONS[precision_of(params)]
+    if index_type == "flat":
+        return f"IDMap2,{codec}"
+    if index_type == "hnsw":
+        return f"IDMap2,HNSW{params['m']},{codec}"
+    if index_type == "ivf_flat":
+        return f"IVF{params['nlist']},{codec}"
+    if index_type == "ivf_pq":
+        return f"IVF{params['nlist']},PQ{params['pq_m']}x{params['pq_nbits']}"
+    raise ValueError(index_type)
+
+
+def make_index(index_type: str, dim: int, params: Dict[str, Any]) -> faiss.Index:
+    index = faiss.index_factory(dim, factory_string(index_type, params), faiss.METRIC_INNER_PRODUCT)
+    if index_type == "hnsw":
+        inner_index(index).hnsw.efConstruction = int(params["ef_construction"])
+    ivf = ivf_of(index)
+    if ivf is not None:
+        ivf.set_direct_map_type(faiss.DirectMap.Hashtable)  # id 로 reconstruct/remove
+    apply_search_defaults(index, params)
+    return index
+
+
+def train_index(index: faiss.Index, vecs: np.ndarray, seed: int = 0):
+    if index.is_trained:
+        return
+    sample = vecs
+    if len(vecs) > MAX_TRAIN:
+        rng = np.random.default_rng(seed)
+        sample = vecs[rng.choice(len(vecs), MAX_TRAIN, replace=False)]
+    index.train(np.ascontiguousarray(sample, dtype="float32"))
+
+
+def inner_index(index: faiss.Index) -> faiss.Index:
+    if isinstance(index, (faiss.IndexIDMap, faiss.IndexIDMap2)):
+        return faiss.downcast_index(index.index)
+    return index
+
+
+def ivf_of(index: faiss.Index) -> Optional[faiss.IndexIVF]:
+    try:
+        return faiss.extract_index_ivf(index)
+    except RuntimeError:
+        return None
+
+
+def hnsw_of(index: faiss.Index):
+    inner = inner_index(index)
+    return inner if isinstance(inner, faiss.IndexHNSW) else None
+
+
+def apply_search_defaults(index: faiss.Index, params: Dict[str, Any]):
+    """저장된 기본 검색 파라미터를 인덱스 객체에 반영 (질의별 값은 search_params 로 덮어씀)"""
+    ivf = ivf_of(index)
+    if ivf is not None and params.get("nprobe"):
+        ivf.nprobe = int(params["nprobe"])
+    hnsw = hnsw_of(index)
+    if hnsw is not None and params.get("ef_search"):
+        hnsw.hnsw.efSearch = int(params["ef_search"])
+
+
+def search_params(index: faiss.Index, nprobe: int = 0, ef_search: int = 0, sel=None):
+    """
+    질의별 검색 파라미터 (0 이면 인덱스 기본값). 인덱스 객체를 건드리지 않아 스레드 안전
+    sel: faiss.IDSelector (메타데이터 필터) → 스캔/탐색 중에 허용 id 만 후보로
+    """
+    ivf = ivf_of(index)
+    if ivf is not None and (nprobe or sel is not None):
+        return faiss.SearchParametersIVF(nprobe=int(nprobe or ivf.nprobe), sel=sel)
+    hnsw = hnsw_of(index)
+    if hnsw is not None and (ef_search or sel is not None):
+        return faiss.SearchParametersHNSW(efSearch=int(ef_search or hnsw.hnsw.efSearch), sel=sel)
+    if sel is not None:
+        return faiss.SearchParameters(sel=sel)
+    return None
@@ -3,7 +3,8 @@
 인덱싱 입력 데이터 로딩/정제/청크
 """
 
-import re, json
+from __future__ import annotations
+import re, json, hashlib
 from typing import List, Dict, Any
 from pathlib import Path
 
@@ -32,15 +33,31 @@ def read_pdf_file(path: str) -> str:
     #  - return "\n".join(texts)
     # ----------------------------------------------------------------------------
     # 정답 구현:
+    # 같은 내용(sha256)+같은 추출기 버전이면 디스크 캐시의 페이지 텍스트 재사용 (pdf_cache)
+    from .pdf_cache import default_pdf_cache
+    cache = default_pdf_cache()
+    sha = file_sha256(path) if cache is not None else None
+    pages = cache.get(sha) if cache is not None else None
+    if pages is None:
+        pages = extract_pdf_pages(path)
+        if cache is not None:
+            cache.put(sha, pages, path)
+    return "\n".join(pages)
+
+
+def extract_pdf_pages(path: str, start: int = 0, end: int | None = None) -> List[str]:
+    """pypdf 로 [start, end) 페이지 텍스트 추출 (페이지 단위 실패는 빈 문자열)"""
     from pypdf import PdfReader  # type: ignore
     reader = PdfReader(path)
+    pages = reader.pages
+    end = len(pages) if end is None else min(end, len(pages))
     texts: List[str] = []
-    for page in reader.pages:
+    for i in range(start, end):
         try:
-            texts.append(page.extract_text() or "")
+            texts.append(pages[i].extract_text() or "")
         except Exception:
             texts.append("")
-    return "\n".join(texts)
+    return texts
 
 
 def clean_text(s: str) -> str:
@@ -92,6 +109,49 @@ def chunk_text(text: str, chunk_size: int = 1200, chunk_overlap: int = 200) -> L
     return chunks
 
 
+def child_spans(text: str, span_size: int = 1000) -> List[tuple]:
+    """
+    겹치지 않는 (start, end) 문자 구간. 경계 근처(뒤쪽 25%)에 공백이 있으면 거기서 자름
+    text 는 clean_text 를 거친 원문 (오프셋이 문서 저장소 원문과 일치해야 함)
+    """
+    spans: List[tuple] = []
+    start, n = 0, len(text)
+    while start < n:
+        end = min(n, start + span_size)
+        if end < n:
+            cut = text.rfind(" ", start + span_size * 3 // 4, end)
+            if cut < 0:
+                cut = text.rfind("\n", start + span_size * 3 // 4, end)
+            if cut > start:
+                end = cut + 1
+        spans.append((start, end))
+        start = end
+    return spans
+
+
+def collect_files(paths_or_dir: List[str]) -> List[str]:
+    """
+    입력 경로(디렉토리/파일) → 대상 파일 경로 목록 (디렉토리는 txt/md/pdf 재귀 수집)
+    """
+    files: List[str] = []
+    for p in paths_or_dir:
+        pp = Path(p)
+        if pp.is_dir():
+            for ext in ("*.txt", "*.md", "*.pdf"):
+                files.extend([str(x) for x in pp.rglob(ext)])
+        else:
+            files.append(str(pp))
+    return files
+
+
+def file_sha256(path: str, bufsize: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(bufsize), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
 def load_documents(paths_or_dir: List[str]) -> List[Dict[str, Any]]:
     """
     입력 경로(디렉토리/파일)에서 txt/md/pdf 수집 → [{"path":..., "text":...}, ...]
@@ -114,14 +174,7 @@ def load_documents(paths_or_dir: List[str]) -> List[Dict[str, Any]]:
     #  - return docs
     # ----------------------------------------------------------------------------
     # 정답 구현:
-    files: List[str] = []
-    for p in paths_or_dir:
-        pp = Path(p)
-        if pp.is_dir():
-            for ext in ("*.txt", "*.md", "*.pdf"):
-                files.extend([str(x) for x in pp.rglob(ext)])
-        else:
-            files.append(str(pp))
+    files = collect_files(paths_or_dir)
 
     docs: List[Dict[str, Any]] = []
     for fp in files:
@@ -134,13 +187,19 @@ def load_documents(paths_or_dir: List[str]) -> List[Dict[str, Any]]:
             continue
         txt = clean_text(raw)
         docs.append({"path": fp, "text": txt})
+
+    from .pdf_cache import default_pdf_cache
+    cache = default_pdf_cache()
+    if cache is not None:
+        cache.flush()  # hit/miss·최근 사용 시각 기록
     return docs
 
 
-def build_corpus(paths_or_dir: List[str]) -> List[Dict[str, Any]]:
+def build_corpus(paths_or_dir: List[str], dedup_threshold: float = 0.0) -> List[Dict[str, Any]]:
     """
     문서를 청크 단위로 나눠 코퍼스 생성
     반환 예: [{"id":"<path>::chunk_0000","text":"...", "meta":{"path":..., "chunk":0}}, ...]
+    dedup_threshold > 0 이면 MinHash 근사 중복 청크 제거 (남긴 청크 meta["aliases"] 에 기록, dedup.py)
     """
     # ----------------------------------------------------------------------------
     # TODO[DAY2-G-06] 구현 지침
@@ -161,6 +220,9 @@ def build_corpus(paths_or_dir: List[str]) -> List[Dict[str, Any]]:
         for i, ch in enumerate(chunks):
             cid = f"{d['path']}::chunk_{i:04d}"
             corpus.append({"id": cid, "text": ch, "meta": {"path": d["path"], "chunk": i}})
+    if dedup_threshold > 0:
+        from .dedup import dedup_corpus
+        corpus = dedup_corpus(corpus, dedup_threshold)
     return corpus
 
 
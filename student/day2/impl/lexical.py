@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""
+BM25 역색인 (index_dir/bm25.npz)
+- 토크나이저: 한글 연속 구간은 음절 bigram(1음절이면 unigram), 영문/숫자는 소문자 토큰
+  + 하이픈/점 등으로 이어진 식별자(EV-2025, 제3.2조 번호 등)는 통째 토큰과 조각 토큰을 함께
+- 저장: 정렬된 용어 배열 + CSR 형태 postings (offsets / 문서 순번 / tf) + 문서별 vid·길이
+  → 로드 시 dict 생성 없이 searchsorted 로 용어 조회
+"""
+
+from __future__ import annotations
+import os, re, math
+from collections import Counter
+from typing import Dict, Any, List, Iterable, Tuple
+
+import numpy as np
+
+LEXICAL_FILENAME = "bm25.npz"
+
+_TOKEN_RE = re.compile(r"[가-힣]+|[a-z0-9]+(?:[-_./][a-z0-9]+)*")
+_SPLIT_RE = re.compile(r"[-_./]")
+
+
+def lexical_path(index_dir: str) -> str:
+    return os.path.join(index_dir, LEXICAL_FILENAME)
+
+
+def tokenize(text: str) -> List[str]:
+    out: List[str] = []
+    for m in _TOKEN_RE.finditer((text or "").lower()):
+        tok = m.group()
+        if "가" <= tok[0] <= "힣":
+            if len(tok) == 1:
+                out.append(tok)
+            else:
+                out.extend(tok[i:i + 2] for i in range(len(tok) - 1))
+            continue
+        out.append(tok)
+        parts = _SPLIT_RE.split(tok)
+        if len(parts) > 1:
+            out.extend(p for p in parts if p)
+    return out
+
+
+class LexicalIndex:
+    def __init__(self, terms: np.ndarray, offsets: np.ndarray, postings: np.ndarray, tfs: np.ndarray,
+                 vids: np.ndarray, doc_len: np.ndarray, k1: float = 1.2, b: float = 0.75):
+        self.terms = terms        # (V,) 정렬된 용어
+        self.offsets = offsets    # (V+1,) int64, 용어 i 의 postings = [offsets[i], offsets[i+1])
+        self.postings = postings  # (P,) int32 문서 순번 (용어별 오름차순)
+        self.tfs = tfs            # (P,) uint16 용어 빈도
+        self.vids = vids          # (N,) int64 문서 순번 → 벡터 id
+        self.doc_len = doc_len    # (N,) int32 토큰 수
+        self.k1, self.b = k1, b
+        self.avgdl = float(doc_len.mean()) if len(doc_len) else 0.0
+
+    def __len__(self) -> int:
+        return len(self.vids)
+
+    # ---------- Build ----------
+    @classmethod
+    def build(cls, docs: Iterable[Tuple[int, str]]) -> "LexicalIndex":
+        """docs: (vid, text) 반복자"""
+        postings: Dict[str, List[Tuple[int, int]]] = {}
+        vids: List[int] = []
+        doc_len: List[int] = []
+        for i, (vid, text) in enumerate(docs):
+            toks = tokenize(text)
+            vids.append(int(vid))
+            doc_len.append(len(toks))
+            for t, c in Counter(toks).items():
+                postings.setdefault(t, []).append((i, c))
+        terms = sorted(postings)
+        offsets = np.zeros(len(terms) + 1, dtype="int64")
+        offsets[1:] = np.cumsum([len(postings[t]) for t in terms])
+        flat = [p for t in terms for p in postings[t]]
+        pairs = np.array(flat, dtype="int64").reshape(-1, 2)
+        return cls(
+            np.array(terms, dtype=str),
+            offsets,
+            pairs[:, 0].astype("int32"),
+            np.minimum(pairs[:, 1], np.iinfo(np.uint16).max).astype("uint16"),
+            np.array(vids, dtype="int64"),
+            np.array(doc_len, dtype="int32"),
+        )
+
+    def save(self, path: str):
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, terms=self.terms, offsets=self.offsets, postings=self.postings,
+                     tfs=self.tfs, vids=self.vids, doc_len=self.doc_len)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "LexicalIndex":
+        with np.load(path) as z:
+            return cls(z["terms"], z["offsets"], z["postings"], z["tfs"], z["vids"], z["doc_len"])
+
+    # ---------- Search ----------
+    def _term_id(self, term: str) -> int:
+        i = int(np.searchsorted(self.terms, term))
+        return i if i < len(self.terms) and self.terms[i] == term else -1
+
+    def search(self, query: str, top_k: int = 5, allow: np.ndarray | None = None) -> List[Tuple[int, float]]:
+        """
+        BM25 상위 top_k → [(vid, score)], 점수 내림차순. 일치 용어가 없는 문서는 제외
+        allow: 허용 vid 배열 (메타데이터 필터 결과). 그 밖의 문서는 점수 0 으로 제외
+        """
+        n = len(self.vids)
+        if n == 0:
+            return []
+        scores = np.zeros(n, dtype="float32")
+        norm = self.k1 * (1 - self.b + self.b * self.doc_len / max(self.avgdl, 1e-9))
+        for t in set(tokenize(query)):
+            i = self._term_id(t)
+            if i < 0:
+                continue
+            s, e = self.offsets[i], self.offsets[i + 1]
+            docs, tf = self.postings[s:e], self.tfs[s:e].astype("float32")
+            df = e - s
+            idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+            # 용어별 postings 는 문서당 1건이라 팬시 인덱싱 += 로 충분
+            scores[docs] += idf * tf * (self.k1 + 1) / (tf + norm[docs])
+        if allow is not None:
+            scores[~np.isin(self.vids, allow)] = 0.0
+        hit = np.flatnonzero(scores)
+        if len(hit) > top_k:
+            hit = hit[np.argpartition(-scores[hit], top_k - 1)[:top_k]]
+        hit = hit[np.argsort(-scores[hit], kind="stable")]
+        return [(int(self.vids[i]), float(scores[i])) for i in hit]
+
+    def stats(self) -> Dict[str, Any]:
+        return {"docs": len(self.vids), "terms": len(self.terms), "postings": len(self.postings),
+                "avgdl": round(self.avgdl, 1)}
+
+
+def build_lexical(index_dir: str, docs: Dict[int, Dict[str, Any]]) -> LexicalIndex:
+    """store.docs(vid → 레코드) 전체로 역색인을 다시 만들어 저장"""
+    lex = LexicalIndex.build((vid, rec.get("text", "")) for vid, rec in docs.items())
+    lex.save(lexical_path(index_dir))
+    return lex
+
+
+def rrf_fuse(rankings: List[List[Any]], k: int = 60) -> Dict[Any, float]:
+    """Reciprocal Rank Fusion: 키별 Σ 1/(k + rank), rank 는 1부터"""
+    fused: Dict[Any, float] = {}
+    for ranking in rankings:
+        for rank, key in enumerate(ranking, 1):
+            fused[key] = fused.get(key, 0.0) + 1.0 / (k + rank)
+    return fused
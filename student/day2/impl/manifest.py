@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+증분 인덱싱용 파일 매니페스트 (index_dir/manifest.json)
+- 파일별 (size, mtime_ns, sha256, chunk_ids) 기록
+- size/mtime 이 같으면 해시 계산 없이 '변경 없음', 다르면 sha256 으로 실제 변경 여부 확인
+"""
+
+from __future__ import annotations
+import os, json
+from typing import Dict, Any, List, Optional
+
+from .ingest import file_sha256
+
+MANIFEST_FILENAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+
+def manifest_path(index_dir: str) -> str:
+    return os.path.join(index_dir, MANIFEST_FILENAME)
+
+
+def new_manifest(embedding_model: str) -> Dict[str, Any]:
+    return {"version": MANIFEST_VERSION, "embedding_model": embedding_model, "files": {}}
+
+
+def load_manifest(index_dir: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(manifest_path(index_dir), "r", encoding="utf-8") as f:
+            m = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return m if m.get("version") == MANIFEST_VERSION else None
+
+
+def save_manifest(index_dir: str, manifest: Dict[str, Any]):
+    tmp = manifest_path(index_dir) + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, manifest_path(index_dir))
+
+
+def diff_files(files: List[str], known: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    현재 파일 목록과 매니페스트 비교
+    반환: {"unchanged": [...], "changed": [...], "added": [...], "deleted": [...],
+           "info": {path: {"size","mtime_ns","sha256"}}}
+    """
+    out: Dict[str, Any] = {"unchanged": [], "changed": [], "added": [], "deleted": [], "info": {}}
+    for fp in files:
+        st = os.stat(fp)
+        prev = known.get(fp)
+        if prev and prev.get("size") == st.st_size and prev.get("mtime_ns") == st.st_mtime_ns:
+            out["unchanged"].append(fp)
+            out["info"][fp] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": prev.get("sha256")}
+            continue
+        sha = file_sha256(fp)
+        out["info"][fp] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": sha}
+        if prev is None:
+            out["added"].append(fp)
+        elif prev.get("sha256") == sha:
+            out["unchanged"].append(fp)  # touch 만 된 경우
+        else:
+            out["changed"].append(fp)
+    current = set(files)
+    out["deleted"] = [fp for fp in known if fp not in current]
+    return out
@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+"""
+PDF 텍스트 추출 디스크 캐시
+- 키: (파일 바이트 sha256, 추출기 버전) → 내용이 같으면 경로/mtime 이 달라도 재사용
+- 값: 페이지별 텍스트 리스트를 zlib 압축해 파일 1개로 저장 (<sha>.<ver>.pz)
+- index.json: 항목별 (bytes, raw_bytes, pages, atime, path) + 누적 hit/miss
+- 용량: max_mb 를 넘으면 오래 안 쓴 항목부터 제거(LRU)
+- 환경변수: DAY2_PDF_CACHE_DIR (기본 indices/pdf_cache, "off" 면 끔), DAY2_PDF_CACHE_MB (기본 256)
+- 한 캐시 디렉토리에 동시에 쓰는 프로세스는 하나라고 가정
+
+사용:
+  python -m student.day2.impl.pdf_cache stats
+  python -m student.day2.impl.pdf_cache evict --max_mb 64
+  python -m student.day2.impl.pdf_cache clear
+"""
+
+from __future__ import annotations
+import os, json, time, zlib, hashlib, threading
+from typing import Dict, Any, List, Optional
+
+CACHE_VERSION = 1
+_EVICT_TO = 0.9  # 초과 시 용량의 90% 까지 비움
+
+
+def extractor_version() -> str:
+    """추출 결과를 바꿀 수 있는 요소 (pypdf 버전 + 추출 코드 버전)"""
+    try:
+        import pypdf  # type: ignore
+        return f"pypdf-{pypdf.__version__}/1"
+    except Exception:
+        return "pypdf-unknown/1"
+
+
+class PdfTextCache:
+    def __init__(self, cache_dir: str, max_mb: float = 256.0, version: Optional[str] = None):
+        self.dir = cache_dir
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.version = version or extractor_version()
+        self._vtag = hashlib.blake2b(self.version.encode("utf-8"), digest_size=4).hexdigest()
+        self._lock = threading.Lock()
+        self._dirty = False
+        os.makedirs(cache_dir, exist_ok=True)
+        self.index = self._load_index()
+
+    # ---------- 내부 ----------
+    def _index_path(self) -> str:
+        return os.path.join(self.dir, "index.json")
+
+    def _load_index(self) -> Dict[str, Any]:
+        try:
+            with open(self._index_path(), "r", encoding="utf-8") as f:
+                idx = json.load(f)
+            if idx.get("version") == CACHE_VERSION:
+                return idx
+        except (OSError, ValueError):
+            pass
+        return {"version": CACHE_VERSION, "entries": {}, "hits": 0, "misses": 0}
+
+    def _key(self, sha256: str) -> str:
+        return f"{sha256}.{self._vtag}"
+
+    def _blob_path(self, key: str) -> str:
+        return os.path.join(self.dir, key + ".pz")
+
+    def _remove(self, key: str):
+        self.index["entries"].pop(key, None)
+        try:
+            os.remove(self._blob_path(key))
+        except OSError:
+            pass
+
+    # ---------- API ----------
+    def has(self, sha256: str) -> bool:
+        with self._lock:
+            return self._key(sha256) in self.index["entries"]
+
+    def note_misses(self, n: int):
+        """has() 로만 확인하고 직접 추출한 건수 기록 (파이프라인용)"""
+        with self._lock:
+            self.index["misses"] += n
+            self._dirty = True
+
+    def get(self, sha256: str) -> Optional[List[str]]:
+        key = self._key(sha256)
+        with self._lock:
+            ent = self.index["entries"].get(key)
+            if ent is not None:
+                try:
+                    with open(self._blob_path(key), "rb") as f:
+                        pages = json.loads(zlib.decompress(f.read()))
+                    ent["atime"] = time.time()
+                    self.index["hits"] += 1
+                    self._dirty = True
+                    return pages
+                except (OSError, ValueError, zlib.error):
+                    self._remove(key)  # 깨진 항목은 버리고 다시 추출
+            self.index["misses"] += 1
+            self._dirty = True
+            return None
+
+    def put(self, sha256: str, pages: List[str], path: str = ""):
+        key = self._key(sha256)
+        raw = json.dumps(pages, ensure_ascii=False).encode("utf-8")
+        blob = zlib.compress(raw, 6)
+        with self._lock:
+            tmp = self._blob_path(key) + ".tmp"
+            with open(tmp, "wb") as f:
+                f.write(blob)
+            os.replace(tmp, self._blob_path(key))
+            self.index["entries"][key] = {"bytes": len(blob), "raw_bytes": len(raw), "pages": len(pages),
+                                          "atime": time.time(), "path": path, "extractor": self.version}
+            self._evict_locked(self.max_bytes)
+            self._flush_locked()
+
+    def evict(self, max_bytes: Optional[int] = None) -> int:
+        """용량 초과분 LRU 제거. 제거한 항목 수 반환"""
+        with self._lock:
+            n = self._evict_locked(self.max_bytes if max_bytes is None else max_bytes, force=True)
+            self._flush_locked()
+            return n
+
+    def _evict_locked(self, max_bytes: int, force: bool = False) -> int:
+        entries = self.index["entries"]
+        total = sum(e["bytes"] for e in entries.values())
+        if total <= max_bytes:
+            return 0
+        target = max_bytes if force else int(max_bytes * _EVICT_TO)
+        n = 0
+        for key in sorted(entries, key=lambda k: entries[k]["atime"]):
+            if total <= target:
+                break
+            total -= entries[key]["bytes"]
+            self._remove(key)
+            n += 1
+        return n
+
+    def clear(self):
+        with self._lock:
+            for key in list(self.index["entries"]):
+                self._remove(key)
+            self.index = {"version": CACHE_VERSION, "entries": {}, "hits": 0, "misses": 0}
+            self._flush_locked()
+
+    def flush(self):
+        with self._lock:
+            if self._dirty:
+                self._flush_locked()
+
+    def _flush_locked(self):
+        tmp = self._index_path() + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.index, f, ensure_ascii=False)
+        os.replace(tmp, self._index_path())
+        self._dirty = False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = self.index["entries"].values()
+            size = sum(e["bytes"] for e in entries)
+            raw = sum(e["raw_bytes"] for e in entries)
+            lookups = self.index["hits"] + self.index["misses"]
+            return {
+                "dir": self.dir,
+                "extractor": self.version,
+                "entries": len(self.index["entries"]),
+                "pages": sum(e["pages"] for e in entries),
+                "mb": round(size / 1024 / 1024, 2),
+                "max_mb": round(self.max_bytes / 1024 / 1024, 1),
+                "compression": round(raw / size, 2) if size else 0.0,
+                "hits": self.index["hits"],
+                "misses": self.index["misses"],
+                "hit_rate": round(self.index["hits"] / lookups, 3) if lookups else 0.0,
+            }
+
+
+_DEFAULT: Dict[str, PdfTextCache] = {}
+_DEFAULT_LOCK = threading.Lock()
+
+
+def default_pdf_cache() -> Optional[PdfTextCache]:
+    """환경변수 설정의 프로세스 공용 캐시 (꺼져 있으면 None)"""
+    cache_dir = os.getenv("DAY2_PDF_CACHE_DIR", "indices/pdf_cache")
+    if not cache_dir or cache_dir.lower() == "off":
+        return None
+    with _DEFAULT_LOCK:
+        cache = _DEFAULT.get(cache_dir)
+        if cache is None:
+            cache = PdfTextCache(cache_dir, float(os.getenv("DAY2_PDF_CACHE_MB", "256")))
+            _DEFAULT[cache_dir] = cache
+        return cache
+
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser()
+    ap.add_argument("cmd", choices=["stats", "evict", "clear"])
+    ap.add_argument("--cache_dir", default=os.getenv("DAY2_PDF_CACHE_DIR", "indices/pdf_cache"))
+    ap.add_argument("--max_mb", type=float, default=None, help="evict 목표 용량 (기본: DAY2_PDF_CACHE_MB)")
+    args = ap.parse_args()
+
+    cache = PdfTextCache(args.cache_dir, float(os.getenv("DAY2_PDF_CACHE_MB", "256")))
+    if args.cmd == "evict":
+        limit = None if args.max_mb is None else int(args.max_mb * 1024 * 1024)
+        print(f"[PDF-CACHE] evicted {cache.evict(limit)} entries")
+    elif args.cmd == "clear":
+        cache.clear()
+        print("[PDF-CACHE] cleared")
+    print(json.dumps(cache.stats(), ensure_ascii=False, indent=2))
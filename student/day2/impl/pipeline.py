@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""
+스트리밍 코퍼스 파이프라인
+- 텍스트 추출을 프로세스 풀에서 병렬 수행 (파일 단위, 큰 PDF 는 페이지 구간 단위)
+- 문서가 완성되는 순서대로 청크를 만들어 batch_chunks 개씩 yield → 임베딩/인덱스 삽입이 바로 소비
+- 동시에 떠 있는 추출 작업 수를 제한해 메모리를 일정하게 유지하고, 추출(CPU)과 임베딩(네트워크)을 겹침
+- PDF 추출 캐시(pdf_cache) 적중 파일은 추출 작업 없이 바로 청크, 새로 추출한 PDF 는 캐시에 기록
+- 추출이 실패한 파일은 캐시에 넣지 않고 청크도 내지 않음 → stats["failed_files"] (빌드는 매니페스트에서 빼고 다음에 재시도)
+청크 id/텍스트는 build_corpus 와 동일 (페이지 구간을 원래 순서로 이어 붙인 뒤 청크)
+"""
+
+from __future__ import annotations
+import os, time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, Any, List, Iterator, Tuple
+
+from .ingest import read_text_file, clean_text, chunk_text, child_spans, extract_pdf_pages, file_sha256
+from .pdf_cache import default_pdf_cache
+
+PAGES_PER_TASK = 16
+
+# (path, part, n_parts, kind, start_page, end_page)
+Task = Tuple[str, int, int, str, int, int]
+
+
+def _pdf_pages(path: str) -> int:
+    from pypdf import PdfReader  # type: ignore
+    try:
+        return len(PdfReader(path).pages)
+    except Exception:
+        return 0
+
+
+def plan_tasks(files: List[str], pages_per_task: int = PAGES_PER_TASK) -> List[Task]:
+    """파일 → 추출 작업 목록. pages_per_task 보다 긴 PDF 는 페이지 구간으로 분할"""
+    tasks: List[Task] = []
+    for fp in files:
+        ext = fp.lower().split(".")[-1]
+        if ext in ("txt", "md"):
+            tasks.append((fp, 0, 1, "text", 0, 0))
+        elif ext == "pdf":
+            n = _pdf_pages(fp)
+            ranges = [(s, min(n, s + pages_per_task)) for s in range(0, n, pages_per_task)] or [(0, 0)]
+            tasks.extend((fp, i, len(ranges), "pdf", s, e) for i, (s, e) in enumerate(ranges))
+    return tasks
+
+
+def extract_task(task: Task) -> Tuple[str, int, List[str], int, float]:
+    """작업 1건 추출 (워커 프로세스에서 실행) → (path, part, 페이지 텍스트들 | 실패 시 None, pages, 소요초)"""
+    fp, part, _, kind, start, end = task
+    t0 = time.perf_counter()
+    if kind == "text":
+        return fp, part, [read_text_file(fp)], 0, time.perf_counter() - t0
+    try:
+        pages = extract_pdf_pages(fp, start, end)
+    except Exception as e:
+        print(f"[WARN] PDF 추출 실패 {fp} p{start}-{end}: {type(e).__name__}: {e}")
+        return fp, part, None, 0, time.perf_counter() - t0
+    return fp, part, pages, end - start, time.perf_counter() - t0
+
+
+def _doc_chunks(path: str, text: str) -> List[Dict[str, Any]]:
+    return [{"id": f"{path}::chunk_{i:04d}", "text": ch, "meta": {"path": path, "chunk": i}}
+            for i, ch in enumerate(chunk_text(clean_text(text)))]
+
+
+def _child_chunks(path: str, text: str, span_size: int) -> List[Dict[str, Any]]:
+    """겹치지 않는 child span (meta 에 원문 오프셋). 빈 span 은 제외"""
+    out = []
+    for s, e in child_spans(text, span_size):
+        if text[s:e].strip():
+            out.append({"id": f"{path}::span_{s:07d}", "text": text[s:e],
+                        "meta": {"path": path, "chunk": len(out), "start": s, "end": e}})
+    return out
+
+
+def iter_corpus_batches(files: List[str], batch_chunks: int = 256, workers: int | None = None,
+                        pages_per_task: int = PAGES_PER_TASK,
+                        stats: Dict[str, Any] | None = None, chunk_mode: str = "window",
+                        span_size: int = 1000, doc_texts=None) -> Iterator[List[Dict[str, Any]]]:
+    """
+    files 를 추출·청크해 최대 batch_chunks 개씩 yield
+    - chunk_mode: window(chunk_text, 겹침 있음) | child(겹치지 않는 span_size 구간, doc_texts 에 원문 저장)
+    - workers: 프로세스 수 (None=CPU 수, 0/1=현재 프로세스에서 순차)
+    - stats: 넘기면 files/pages/chunks/cached_files/extract_s(워커 합계)/wall_s/failed_files(추출 실패 경로) 를 채움
+    """
+    stats = stats if stats is not None else {}
+    stats.update({"files": 0, "pages": 0, "chunks": 0, "cached_files": 0, "extract_s": 0.0, "wall_s": 0.0,
+                  "failed_files": []})
+    t_start = time.perf_counter()
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    # 추출 캐시 조회 (적중한 PDF 는 작업 계획에서 제외, 페이지 텍스트는 소비 시점에 읽음)
+    cache = default_pdf_cache()
+    shas: Dict[str, str] = {}
+    if cache is not None:
+        shas = {fp: file_sha256(fp) for fp in files if fp.lower().endswith(".pdf")}
+    cached = [fp for fp, sha in shas.items() if cache.has(sha)]
+    if cache is not None:
+        cache.note_misses(len(shas) - len(cached))
+    tasks = plan_tasks([fp for fp in files if fp not in cached], pages_per_task)
+
+    parts: Dict[str, Dict[int, List[str]]] = {}
+    n_parts = {t[0]: t[2] for t in tasks}
+    n_parts.update((fp, 1) for fp in cached)
+    buf: List[Dict[str, Any]] = []
+
+    def _consume(result) -> Iterator[List[Dict[str, Any]]]:
+        fp, part, pages, n_pages, dt = result
+        stats["pages"] += n_pages
+        stats["extract_s"] += dt
+        got = parts.setdefault(fp, {})
+        got[part] = pages
+        if len(got) < n_parts[fp]:
+            return
+        del parts[fp]
+        if any(got[i] is None for i in range(n_parts[fp])):  # 일부 구간이라도 실패 → 파일 전체를 다음 빌드로
+            stats["failed_files"].append(fp)
+            return
+        pages = [p for i in range(n_parts[fp]) for p in got[i]]
+        stats["files"] += 1
+        if fp in shas and not cache.has(shas[fp]):
+            cache.put(shas[fp], pages, fp)
+        elif fp in shas:
+            stats["cached_files"] += 1
+        if chunk_mode == "child":
+            text = clean_text("\n".join(pages))
+            if doc_texts is not None:
+                doc_texts.put(fp, text)
+            chunks = _child_chunks(fp, text, span_size)
+        else:
+            chunks = _doc_chunks(fp, "\n".join(pages))
+        for ch in chunks:
+            buf.append(ch)
+            if len(buf) >= batch_chunks:
+                stats["chunks"] += len(buf)
+                yield buf[:]
+                buf.clear()
+
+    for fp in cached:
+        pages = cache.get(shas[fp])
+        if pages is None:  # 조회 사이 제거/손상 → 직접 추출
+            pages = extract_pdf_pages(fp)
+        yield from _consume((fp, 0, pages, len(pages), 0.0))
+    if workers <= 1:
+        for t in tasks:
+            yield from _consume(extract_task(t))
+    else:
+        # 떠 있는 작업 수 제한 → 추출 결과가 소비 속도보다 많이 쌓이지 않음
+        max_inflight = workers * 2
+        it = iter(tasks)
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            inflight = set()
+            for t in it:
+                inflight.add(ex.submit(extract_task, t))
+                if len(inflight) >= max_inflight:
+                    break
+            while inflight:
+                done, inflight = wait(inflight, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    nxt = next(it, None)
+                    if nxt is not None:
+                        inflight.add(ex.submit(extract_task, nxt))
+                    yield from _consume(fut.result())
+    if buf:
+        stats["chunks"] += len(buf)
+        yield buf[:]
+        buf.clear()
+    stats["wall_s"] = time.perf_counter() - t_start
+    if cache is not None:
+        cache.flush()
+
+
+def report_pipeline(stats: Dict[str, Any]):
+    wall = max(stats.get("wall_s", 0.0), 1e-9)
+    print(f"[INGEST] {stats['files']} files / {stats['pages']} pages / {stats['chunks']} chunks "
+          f"in {wall:.2f}s → {stats['pages'] / wall:.1f} pages/s, {stats['chunks'] / wall:.1f} chunks/s "
+          f"(extract cpu {stats['extract_s']:.2f}s, cache hits {stats.get('cached_files', 0)} files)")
+    if stats.get("failed_files"):
+        print(f"[INGEST] extraction failed for {len(stats['failed_files'])} files (not indexed, retried next build): "
+              f"{stats['failed_files'][:5]}")
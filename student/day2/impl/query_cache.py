@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+질의 결과 캐시 (Day2Agent.handle 앞단, 프로세스 내)
+- 1차: 정규화한 질의 문자열 해시 완전 일치 → 임베딩 호출도 생략
+- 2차: 과거 질의 벡터에 대한 작은 brute-force 내적 검색 → 코사인 ≥ threshold 면 그 결과 재사용 (표현만 다른 질문)
+- 항목 키에 검색 설정(plan_key)을 포함 → top_k/필터/모드가 다른 결과는 섞이지 않음
+- 인덱스 버전(파일 시그니처)이 바뀌면 전체 비움. 용량 초과는 LRU, 만료는 TTL
+캐시하는 것은 contexts/gating 만 (answer 는 호출마다 다시 만듦)
+"""
+
+from __future__ import annotations
+import re, copy, time, hashlib, threading, unicodedata
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_CAPACITY = 1024
+_WS_RE = re.compile(r"\s+")
+_EDGE_PUNCT = " \t\n?!.,~。？！"
+
+
+def normalize_query(query: str) -> str:
+    """NFKC + casefold + 공백 정리 + 앞뒤 문장부호 제거 ("전기차  충전소?" == "전기차 충전소")"""
+    q = unicodedata.normalize("NFKC", query or "").casefold()
+    return _WS_RE.sub(" ", q).strip(_EDGE_PUNCT)
+
+
+def _qhash(plan_key: str, query: str) -> str:
+    return hashlib.sha1(f"{plan_key}\0{normalize_query(query)}".encode("utf-8")).hexdigest()
+
+
+class QueryCache:
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, ttl_s: float = 600.0):
+        self.capacity = capacity
+        self.ttl_s = ttl_s
+        self.version: Any = None
+        self._lock = threading.Lock()
+        # qhash -> slot (순서 = LRU, 앞이 가장 오래됨)
+        self._lru: "OrderedDict[str, int]" = OrderedDict()
+        self._entries: list = [None] * capacity  # slot -> (qhash, plan_key, 저장 시각, value)
+        self._vecs: Optional[np.ndarray] = None   # (capacity, D) 첫 put 때 차원 결정
+        self._plan_ids = np.full(capacity, -1, dtype="int64")  # slot -> plan_key 번호 (-1 = 빈 칸)
+        self._plan_no: Dict[str, int] = {}
+        self._free = list(range(capacity - 1, -1, -1))
+        self.stats: Dict[str, int] = {"lookups": 0, "exact_hits": 0, "semantic_hits": 0, "misses": 0,
+                                      "expired": 0, "evictions": 0, "invalidations": 0}
+
+    # ---------- 버전 ----------
+    def check_version(self, version: Any):
+        """인덱스가 다시 빌드되면(시그니처 변경) 모든 항목 폐기"""
+        with self._lock:
+            if version == self.version:
+                return
+            if self.version is not None and self._lru:
+                self.stats["invalidations"] += 1
+            self.version = version
+            self._lru.clear()
+            self._entries = [None] * self.capacity
+            self._plan_ids[:] = -1
+            self._plan_no.clear()
+            self._free = list(range(self.capacity - 1, -1, -1))
+
+    def _drop(self, slot: int):
+        qhash = self._entries[slot][0]
+        self._lru.pop(qhash, None)
+        self._entries[slot] = None
+        self._plan_ids[slot] = -1
+        self._free.append(slot)
+
+    def _alive(self, slot: int, now: float) -> bool:
+        if self.ttl_s and now - self._entries[slot][2] > self.ttl_s:
+            self._drop(slot)
+            self.stats["expired"] += 1
+            return False
+        return True
+
+    def _hit(self, slot: int, kind: str) -> Dict[str, Any]:
+        self._lru.move_to_end(self._entries[slot][0])
+        self.stats[kind] += 1
+        return copy.deepcopy(self._entries[slot][3])  # 호출 측 수정이 캐시에 번지지 않도록
+
+    # ---------- 조회 ----------
+    def get_exact(self, plan_key: str, query: str) -> Optional[Dict[str, Any]]:
+        """정규화 질의 완전 일치. 실패해도 lookups/misses 는 get_similar 에서 한 번만 셈"""
+        with self._lock:
+            slot = self._lru.get(_qhash(plan_key, query))
+            if slot is None or not self._alive(slot, time.time()):
+                return None
+            self.stats["lookups"] += 1
+            return self._hit(slot, "exact_hits")
+
+    def get_similar(self, plan_key: str, qv: np.ndarray, threshold: float,
+                    query: Optional[str] = None) -> Tuple[Optional[Dict[str, Any]], float]:
+        """
+        같은 plan_key 의 과거 질의 중 코사인 최대 항목 → (값 | None, 유사도)
+        query 를 주면 적중 시 그 문장도 같은 결과로 등록 (다음에는 완전 일치로 임베딩 생략)
+        별칭 항목의 벡터/저장 시각은 원래 항목 것 → 유사 질의가 꼬리를 물며 원래 질의에서 멀어지지 않음
+        """
+        with self._lock:
+            self.stats["lookups"] += 1
+            pid = self._plan_no.get(plan_key)
+            if pid is None or self._vecs is None or self._vecs.shape[1] != qv.shape[-1]:
+                self.stats["misses"] += 1
+                return None, 0.0
+            now = time.time()
+            cand = np.flatnonzero(self._plan_ids == pid)
+            while len(cand):
+                sims = self._vecs[cand] @ qv
+                j = int(np.argmax(sims))
+                slot, sim = int(cand[j]), float(sims[j])
+                if sim < threshold:
+                    break
+                if self._alive(slot, now):
+                    value = self._hit(slot, "semantic_hits")
+                    if query is not None:
+                        self._insert(_qhash(plan_key, query), plan_key, self._vecs[slot].copy(),
+                                     self._entries[slot][2], self._entries[slot][3])
+                    return value, sim
+                cand = np.delete(cand, j)  # 만료 → 다음 후보
+            self.stats["misses"] += 1
+            return None, 0.0
+
+    # ---------- 저장 ----------
+    def put(self, plan_key: str, query: str, qv: np.ndarray, value: Dict[str, Any]):
+        with self._lock:
+            self._insert(_qhash(plan_key, query), plan_key, qv, time.time(), copy.deepcopy(value))
+
+    def _insert(self, qhash: str, plan_key: str, qv: np.ndarray, stamp: float, value: Dict[str, Any]):
+        qv = np.asarray(qv, dtype="float32").reshape(-1)
+        if self._vecs is None or self._vecs.shape[1] != qv.shape[0]:
+            self._vecs = np.zeros((self.capacity, qv.shape[0]), dtype="float32")
+            self._plan_ids[:] = -1
+            self._lru.clear()
+            self._entries = [None] * self.capacity
+            self._free = list(range(self.capacity - 1, -1, -1))
+        slot = self._lru.get(qhash)
+        if slot is None:
+            if not self._free:
+                self._drop(next(iter(self._lru.values())))  # LRU
+                self.stats["evictions"] += 1
+            slot = self._free.pop()
+        self._vecs[slot] = qv
+        self._plan_ids[slot] = self._plan_no.setdefault(plan_key, len(self._plan_no))
+        self._entries[slot] = (qhash, plan_key, stamp, value)  # value 는 항목끼리 공유해도 됨 (꺼낼 때 복사)
+        self._lru[qhash] = slot
+        self._lru.move_to_end(qhash)
+
+    def __len__(self) -> int:
+        return len(self._lru)
+
+    def metrics(self) -> Dict[str, Any]:
+        st = dict(self.stats, size=len(self._lru), capacity=self.capacity)
+        hits = st["exact_hits"] + st["semantic_hits"]
+        st["hit_rate"] = hits / st["lookups"] if st["lookups"] else 0.0
+        return st
@@ -1,34 +1,98 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
 import os, json
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Tuple
 import numpy as np
 
 from student.common.schemas import Day2Plan
 from .embeddings import Embeddings
 from .store import FaissStore
-
-def _idx_paths(index_dir: str):
-    return (
-        os.path.join(index_dir, "faiss.index"),
-        os.path.join(index_dir, "docs.jsonl"),
-    )
+from .registry import REGISTRY
+from .lexical import rrf_fuse
+from .doctext import expand_parents
+from .filters import match_path
 
 def _load_store(plan: Day2Plan, emb: Embeddings) -> FaissStore:
-    index_path, docs_path = _idx_paths(plan.index_dir)
-    if not (os.path.exists(index_path) and os.path.exists(docs_path)):
-        raise FileNotFoundError(f"FAISS 인덱스가 없습니다. 먼저 ingest를 실행하세요: {plan.index_dir}")
-    store = FaissStore.load(index_path, docs_path)
-    # 차원 체크
-    test_dim = emb.encode(["__dim_check__"]).shape[1]
-    if store.dim != test_dim:
-        raise ValueError(f"임베딩 차원이 인덱스와 다릅니다. (index={store.dim}, embedder={test_dim})")
-    return store
+    # 프로세스 상주 캐시: 파일이 바뀌지 않았으면 재로딩/차원 체크 없이 재사용
+    return REGISTRY.store(plan.index_dir, emb, mmap=plan.mmap)
+
+def _hybrid_search(store: FaissStore, searcher, lex, query: str, qv: np.ndarray,
+                   plan: Day2Plan, top_k: int, where: Dict[str, Any] | None) -> List[Dict[str, Any]]:
+    """
+    dense / BM25 후보를 각각 hybrid_pool 개씩 가져와 RRF 로 융합.
+    score 는 게이트 기준을 유지하도록 코사인 그대로 두고(BM25 전용 후보는 저장 벡터로 계산),
+    bm25/rrf 점수를 함께 붙인다. docs 는 store.hits 로만 읽음 (읽기 잠금, 동시 삭제된 vid 는 빠짐)
+    """
+    pool = max(top_k, plan.hybrid_pool)
+    dense = searcher.search(qv, top_k=pool, nprobe=plan.nprobe, ef_search=plan.ef_search, where=where)
+    if lex is None:
+        return dense[:top_k]
+    lexical = lex.search(query, top_k=pool, allow=store.filters.select(where) if where else None)
+
+    by_id = {c["doc_id"]: c for c in dense}
+    lex_hits = store.hits([vid for vid, _ in lexical], [s for _, s in lexical])  # score = BM25 점수
+    bm25 = {h["doc_id"]: h["score"] for h in lex_hits}
+    missing = [h for h in lex_hits if h["doc_id"] not in by_id]
+    if missing:
+        try:
+            cos = store.score([h["vid"] for h in missing], qv)  # PCA 인덱스면 qv 를 저장 차원으로 축소해 계산
+        except (RuntimeError, KeyError):
+            cos = np.zeros(len(missing), dtype="float32")  # reconstruct 미지원 인덱스 / 그새 삭제됨
+        for h, s in zip(missing, cos):
+            by_id[h["doc_id"]] = dict(h, score=float(s))
+
+    fused = rrf_fuse([[c["doc_id"] for c in dense], list(bm25)], k=plan.rrf_k)
+    ranked = sorted(fused, key=fused.get, reverse=True)[:top_k]
+    return [dict(by_id[d], rrf=fused[d], bm25=bm25.get(d, 0.0)) for d in ranked]
+
+def mmr_select(relevance: np.ndarray, vecs: np.ndarray, k: int, lam: float) -> List[int]:
+    """
+    MMR: argmax λ·rel(i) − (1−λ)·max_{j∈선택} sim(i, j)
+    후보 간 유사도 행렬을 한 번에 계산하고, 선택마다 '선택 집합과의 최대 유사도' 벡터만 갱신
+    """
+    n = len(relevance)
+    k = min(k, n)
+    if k == 0:
+        return []
+    sim = vecs @ vecs.T
+    max_sim = np.zeros(n, dtype="float32")
+    taken = np.zeros(n, dtype=bool)
+    picked: List[int] = []
+    for _ in range(k):
+        score = lam * relevance - (1.0 - lam) * max_sim
+        score[taken] = -np.inf
+        i = int(np.argmax(score))
+        picked.append(i)
+        taken[i] = True
+        np.maximum(max_sim, sim[i], out=max_sim)
+    return picked
+
+def _relevance(candidates: List[Dict[str, Any]]) -> np.ndarray:
+    """
+    MMR 관련성: dense 는 코사인 점수, hybrid(RRF 융합 결과) 는 rrf 점수를 후보 안에서 [0, 1] 로 정규화
+    (코사인으로 다시 매기면 BM25 가 올린 후보가 밀리고 융합 순서가 무너짐)
+    """
+    if not all("rrf" in c for c in candidates):
+        return np.array([c["score"] for c in candidates], dtype="float32")
+    rrf = np.array([c["rrf"] for c in candidates], dtype="float32")
+    lo, hi = float(rrf.min()), float(rrf.max())
+    return (rrf - lo) / (hi - lo) if hi > lo else np.ones_like(rrf)
+
+def _mmr(store: FaissStore, candidates: List[Dict[str, Any]], plan: Day2Plan) -> List[Dict[str, Any]]:
+    """후보 벡터는 인덱스에서 복원 (재임베딩 없음). 복원 불가 인덱스면 원래 순서 유지"""
+    if len(candidates) <= plan.top_k or plan.mmr_lambda >= 1.0:
+        return candidates[:plan.top_k]
+    try:
+        vecs = store.vectors([c["vid"] for c in candidates])
+    except RuntimeError:
+        return candidates[:plan.top_k]
+    rel = _relevance(candidates)
+    return [candidates[i] for i in mmr_select(rel, vecs, plan.top_k, plan.mmr_lambda)]
 
 def _gate(contexts: List[Dict[str, Any]], plan: Day2Plan) -> Dict[str, Any]:
     if not contexts:
         return {"status":"insufficient","top_score":0.0,"mean_topk":0.0}
-    top_score = float(contexts[0]["score"])
+    top_score = float(max(c["score"] for c in contexts))  # hybrid 는 RRF 순이라 첫 항목이 최대가 아닐 수 있음
     mean_topk = float(np.mean([c["score"] for c in contexts[:plan.top_k]]))
     if top_score >= plan.min_score and mean_topk >= plan.min_mean_topk:
         return {"status":"enough","top_score":top_score,"mean_topk":mean_topk}
@@ -46,19 +110,72 @@ def _draft_answer(query: str, contexts: List[Dict[str, Any]], plan: Day2Plan) ->
             break
     return f"질의: {query}\n\n핵심 근거 요약:\n" + "\n".join(buf) if buf else ""
 
+# 결과(contexts/gating)에 영향이 없는 설정 → 캐시 키에서 제외
+_CACHE_IGNORED = ("force_rag_only", "return_draft_when_enough", "mmap", "micro_batch",
+                  "query_cache", "cache_threshold", "cache_ttl_s")
+
+def _cache_key(plan: Day2Plan) -> str:
+    conf = {k: v for k, v in plan.__dict__.items() if k not in _CACHE_IGNORED}
+    return json.dumps(conf, sort_keys=True, ensure_ascii=False, default=str)
+
 class Day2Agent:
     def __init__(self, plan_defaults: Day2Plan = Day2Plan()):
         self.plan_defaults = plan_defaults
 
+    def _retrieve(self, query: str, qv: np.ndarray, plan: Day2Plan, emb: Embeddings,
+                  store: FaissStore) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """질의 벡터 → (contexts, gating). 질의 결과 캐시가 감싸는 단위"""
+        if plan.micro_batch:
+            searcher = REGISTRY.batcher(plan.index_dir, emb, mmap=plan.mmap, store=store)
+        else:
+            searcher = store
+        pool_k = plan.top_k * max(1, plan.mmr_pool) if plan.mmr else plan.top_k
+        where = plan.filters or None
+        if plan.route_docs > 0:
+            # 1단계: 문서 중심으로 상위 문서 선택 → 2단계 청크 검색은 그 문서들 안에서만 (docindex 없으면 전체)
+            router = REGISTRY.doc_router(plan.index_dir, store)
+            if router is not None:
+                routed = router.route(qv, plan.route_docs, where=where)
+                # 호출자 필터(경로 포함)와 교집합: 라우팅은 후보 문서를 좁히기만 하고 필터를 넓히지 않음
+                where = dict(where or {}, path=[p for p in routed if match_path(p, where)])
+        if plan.retrieval_mode == "hybrid":
+            lex = REGISTRY.lexical(plan.index_dir, store)  # bm25.npz 가 없으면 None → dense 만
+            candidates = _hybrid_search(store, searcher, lex, query, qv, plan, pool_k, where)
+        else:
+            candidates = searcher.search(qv, top_k=pool_k, nprobe=plan.nprobe, ef_search=plan.ef_search,
+                                         where=where)
+
+        # 게이트는 다양화 전 상위 top_k 기준 (근거 충분성 판단이 MMR 설정에 흔들리지 않도록)
+        gate = _gate(candidates[:plan.top_k], plan)
+        contexts = _mmr(store, candidates, plan) if plan.mmr else candidates[:plan.top_k]
+        if plan.parent_window > 0 and store.meta.get("chunking", {}).get("mode") == "child":
+            # 작은 child span 으로 찾고, 답변 근거는 앞뒤를 붙인 부모 창 (겹치는 창은 병합)
+            contexts = expand_parents(contexts, REGISTRY.doc_texts(plan.index_dir, store), plan.parent_window,
+                                      max_chars=plan.max_context)
+        return contexts, gate
+
     def handle(self, query: str, plan: Day2Plan = None) -> Dict[str, Any]:
         plan = plan or self.plan_defaults
-        emb = Embeddings(model=plan.embedding_model)
+        emb = REGISTRY.embedder(plan.embedding_model, plan.embedding_dimensions or None)
 
         store = _load_store(plan, emb)
-        qv = emb.encode([query])[0]
-        contexts = store.search(qv, top_k=plan.top_k)
-
-        gate = _gate(contexts, plan)
+        cache = REGISTRY.query_cache(plan.index_dir, emb, ttl_s=plan.cache_ttl_s) if plan.query_cache else None
+        cache_state = None
+        if cache is not None:
+            plan_key = _cache_key(plan)
+            hit = cache.get_exact(plan_key, query)  # 같은 질문(정규화 일치)이면 임베딩도 생략
+            cache_state = "exact" if hit is not None else None
+            if hit is None:
+                qv = emb.encode([query])[0]
+                hit, _ = cache.get_similar(plan_key, qv, plan.cache_threshold, query=query)
+                cache_state = "semantic" if hit is not None else "miss"
+            if hit is not None:
+                contexts, gate = hit["contexts"], hit["gating"]
+            else:
+                contexts, gate = self._retrieve(query, qv, plan, emb, store)
+                cache.put(plan_key, query, qv, {"contexts": contexts, "gating": gate})
+        else:
+            contexts, gate = self._retrieve(query, emb.encode([query])[0], plan, emb, store)
         payload: Dict[str, Any] = {
             "type": "rag_answer",
             "query": query,
@@ -68,6 +185,8 @@ class Day2Agent:
             "answer": "",
             "notice": "web_merge_in_day4_only",
         }
+        if cache_state is not None:
+            payload["cache"] = cache_state
         if plan.force_rag_only or (gate["status"] == "enough" and plan.return_draft_when_enough):
             payload["answer"] = _draft_answer(query, contexts, plan)
         return payload
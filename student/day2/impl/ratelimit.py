@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+임베딩 호출용 속도 제한/동시성 제어
+- TokenBucket / RateLimiter: 분당 요청 수(rpm)·분당 토큰 수(tpm) 상한
+- AIMDController: 429 응답 시 동시 요청 수를 곱셈 감소, 성공이 이어지면 덧셈 증가
+"""
+
+from __future__ import annotations
+import time, threading
+from typing import Dict, Any, Optional
+
+
+class TokenBucket:
+    def __init__(self, rate_per_min: float, capacity: Optional[float] = None):
+        """
+        - rate_per_min: 분당 보충량
+        - capacity: 최대 적립량 (기본 = 1분치)
+        """
+        self.rate_s = float(rate_per_min) / 60.0
+        self.capacity = float(capacity if capacity is not None else rate_per_min)
+        self._tokens = self.capacity
+        self._ts = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._ts) * self.rate_s)
+        self._ts = now
+
+    def acquire(self, n: float = 1.0) -> float:
+        """n 만큼 확보될 때까지 대기. 실제 대기 시간(초)을 반환"""
+        n = min(float(n), self.capacity)  # 용량보다 큰 요청은 용량만큼만 요구 (무한 대기 방지)
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= n:
+                    self._tokens -= n
+                    return waited
+                wait = (n - self._tokens) / self.rate_s
+            time.sleep(wait)
+            waited += wait
+
+
+class RateLimiter:
+    def __init__(self, rpm: Optional[float] = None, tpm: Optional[float] = None):
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.waited_s = 0.0
+
+    def acquire(self, tokens: int) -> float:
+        waited = 0.0
+        if self.requests is not None:
+            waited += self.requests.acquire(1)
+        if self.tokens is not None:
+            waited += self.tokens.acquire(tokens)
+        self.waited_s += waited
+        return waited
+
+
+class AIMDController:
+    def __init__(self, initial: int, min_limit: int = 1, max_limit: Optional[int] = None,
+                 decrease: float = 0.5, cooldown_s: float = 1.0):
+        """
+        - initial: 시작 동시성, max_limit: 상한 (기본 = initial)
+        - decrease: 스로틀 시 곱해지는 비율
+        - cooldown_s: 같은 혼잡 구간에서 연달아 여러 번 줄이지 않도록 하는 최소 간격
+        """
+        self.max_limit = max(1, int(max_limit or initial))
+        self.min_limit = max(1, min(int(min_limit), self.max_limit))
+        self.limit = max(self.min_limit, min(int(initial), self.max_limit))
+        self.decrease = decrease
+        self.cooldown_s = cooldown_s
+        self._in_flight = 0
+        self._successes = 0
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+        self.stats: Dict[str, Any] = {"throttles": 0, "decreases": 0, "increases": 0,
+                                      "min_seen": self.limit, "max_seen": self.limit}
+
+    def acquire(self):
+        with self._cond:
+            while self._in_flight >= self.limit:
+                self._cond.wait()
+            self._in_flight += 1
+
+    def release(self, throttled: bool = False):
+        with self._cond:
+            self._in_flight -= 1
+            if throttled:
+                self.stats["throttles"] += 1
+                now = time.monotonic()
+                if now - self._last_decrease >= self.cooldown_s:
+                    self.limit = max(self.min_limit, int(self.limit * self.decrease))
+                    self._last_decrease = now
+                    self._successes = 0
+                    self.stats["decreases"] += 1
+            else:
+                # 현재 한도만큼 연속 성공하면 1 증가 (≈ 왕복 1회당 +1)
+                self._successes += 1
+                if self._successes >= self.limit and self.limit < self.max_limit:
+                    self.limit += 1
+                    self._successes = 0
+                    self.stats["increases"] += 1
+            self.stats["min_seen"] = min(self.stats["min_seen"], self.limit)
+            self.stats["max_seen"] = max(self.stats["max_seen"], self.limit)
+            self._cond.notify_all()
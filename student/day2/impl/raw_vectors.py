@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""
+원본 float32 벡터 사이드카 (fp16/sq8 인덱스의 정확 재채점용)
+- vectors.f32.npy: (N, D) float32, vectors.vids.npy: (N,) int64 — vid 오름차순
+- 로드 시 mmap 으로만 열어 RAM 에 올리지 않음 → 상주 메모리는 압축 인덱스 크기
+  재채점은 질의마다 후보 (k × rescore) 개 행만 읽음
+- 빌드 중 추가/삭제는 메모리 변경분에 모았다가 save() 에서 병합
+  추가 벡터는 두 배씩 늘리는 (cap, D) float32 버퍼 하나에 이어 쓰고 vid → 행 번호만 dict 로 (벡터별 배열 객체 없음)
+"""
+
+from __future__ import annotations
+import os
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+RAW_VECS_FILENAME = "vectors.f32.npy"
+RAW_VIDS_FILENAME = "vectors.vids.npy"
+
+
+def _paths(index_dir: str) -> Tuple[str, str]:
+    return os.path.join(index_dir, RAW_VECS_FILENAME), os.path.join(index_dir, RAW_VIDS_FILENAME)
+
+
+def raw_vector_paths(index_dir: str) -> List[str]:
+    return list(_paths(index_dir))
+
+
+def remove_raw_vectors(index_dir: str):
+    for p in _paths(index_dir):
+        try:
+            os.remove(p)
+        except OSError:
+            pass
+
+
+class RawVectors:
+    def __init__(self, dim: int):
+        self.dim = dim
+        self._vids = np.zeros(0, dtype="int64")
+        self._vecs: np.ndarray = np.zeros((0, dim), dtype="float32")
+        self._reset_pending()
+
+    @classmethod
+    def open(cls, index_dir: str, dim: int) -> Optional["RawVectors"]:
+        """사이드카가 없거나 차원이 다르면 None (재채점 없이 동작)"""
+        vec_path, vid_path = _paths(index_dir)
+        try:
+            vecs = np.load(vec_path, mmap_mode="r")
+            vids = np.load(vid_path)
+        except (OSError, ValueError):
+            return None
+        if vecs.ndim != 2 or vecs.shape[1] != dim or len(vecs) != len(vids):
+            return None
+        raw = cls(dim)
+        raw._vecs, raw._vids = vecs, vids
+        return raw
+
+    def _reset_pending(self):
+        self._buf = np.zeros((0, self.dim), dtype="float32")
+        self._n = 0
+        self._row: Dict[int, int] = {}  # 새 vid → _buf 행 (교체/삭제된 행은 write 때 버려짐)
+        self._drop: set = set()
+
+    def add(self, vids: Iterable[int], vecs: np.ndarray):
+        vids = [int(v) for v in vids]
+        need = self._n + len(vids)
+        if need > len(self._buf):
+            buf = np.empty((max(need, 2 * len(self._buf), 1024), self.dim), dtype="float32")
+            buf[:self._n] = self._buf[:self._n]
+            self._buf = buf
+        self._buf[self._n:need] = vecs
+        for i, vid in enumerate(vids, self._n):
+            self._row[vid] = i
+            self._drop.add(vid)  # 기존 행이 있으면 새 값으로 가림
+        self._n = need
+
+    def remove(self, vids: Iterable[int]):
+        for vid in vids:
+            vid = int(vid)
+            self._row.pop(vid, None)
+            self._drop.add(vid)
+
+    def get(self, vids: Iterable[int]) -> Optional[np.ndarray]:
+        """vid 순서대로 (n, D). 하나라도 없으면 None"""
+        vids = np.asarray(list(vids), dtype="int64")
+        out = np.empty((len(vids), self.dim), dtype="float32")
+        base_rows, base_pos = [], []
+        for i, vid in enumerate(vids.tolist()):
+            r = self._row.get(vid)
+            if r is not None:
+                out[i] = self._buf[r]
+                continue
+            if vid in self._drop:
+                return None
+            base_rows.append(i)
+            base_pos.append(vid)
+        if base_pos:
+            if len(self._vids) == 0:
+                return None
+            pos = np.minimum(np.searchsorted(self._vids, base_pos), len(self._vids) - 1)
+            if not np.array_equal(self._vids[pos], base_pos):
+                return None
+            order = np.argsort(pos)  # mmap 을 파일 순서대로 읽음
+            out[np.asarray(base_rows)[order]] = self._vecs[pos[order]]
+        return out
+
+    def memory_usage(self) -> Dict[str, int]:
+        """ram: vid 배열 + 아직 저장 안 된 벡터 버퍼, mapped: raw_vectors.npy"""
+        return {"ram": int(self._vids.nbytes) + int(self._buf.nbytes), "mapped": int(self._vecs.nbytes)}
+
+    def save(self, index_dir: str):
+        """기존 행(가려진 것 제외) + 새 행을 vid 순으로 병합해 tmp → rename. 저장 후 새 파일을 mmap 으로 다시 엶"""
+        pairs = self.write(index_dir, ".tmp")
+        for tmp, final in pairs:
+            os.replace(tmp, final)
+        self.reopen(index_dir)
+
+    def reopen(self, index_dir: str):
+        """저장한 파일로 다시 엶 (변경분 비움)"""
+        vec_path, vid_path = _paths(index_dir)
+        self._vecs = np.load(vec_path, mmap_mode="r")
+        self._vids = np.load(vid_path)
+        self._reset_pending()
+
+    def release(self) -> bool:
+        """기존 파일 매핑 해제 (Windows 는 매핑된 파일을 교체/삭제할 수 없음). 변경분은 유지. 해제했으면 True"""
+        if not isinstance(self._vecs, np.memmap):
+            return False
+        self._vecs = np.zeros((0, self.dim), dtype="float32")
+        return True
+
+    def remap(self, index_dir: str):
+        """release 로 놓은 기존 파일을 다시 매핑 (교체가 일어나지 않은 경우)"""
+        self._vecs = np.load(_paths(index_dir)[0], mmap_mode="r")
+
+    def write(self, index_dir: str, suffix: str) -> List[Tuple[str, str]]:
+        """병합 결과를 <파일><suffix> 에 기록하고 (tmp, 최종) 경로 목록 반환 (교체는 호출 쪽에서)"""
+        vec_path, vid_path = _paths(index_dir)
+        keep = ~np.isin(self._vids, np.fromiter(self._drop, dtype="int64", count=len(self._drop)))
+        base_vids = self._vids[keep]
+        new_vids = np.array(sorted(self._row), dtype="int64")
+        new_rows = np.array([self._row[v] for v in new_vids.tolist()], dtype="int64")
+        vids = np.concatenate([base_vids, new_vids])
+        order = np.argsort(vids, kind="stable")
+        n_base = len(base_vids)
+        base_idx = np.flatnonzero(keep)
+        tmp = vec_path + suffix
+        # open_memmap 으로 행 단위 기록 → 전체 벡터를 RAM 에 만들지 않음
+        if len(vids) == 0:
+            with open(tmp, "wb") as f:
+                np.save(f, np.zeros((0, self.dim), dtype="float32"))
+            out = None
+        else:
+            out = np.lib.format.open_memmap(tmp, mode="w+", dtype="float32", shape=(len(vids), self.dim))
+        step = 65536
+        for s in range(0, len(order), step):
+            src = order[s:s + step]
+            rows = np.empty((len(src), self.dim), dtype="float32")
+            from_base = src < n_base
+            if from_base.any():
+                rows[from_base] = self._vecs[base_idx[src[from_base]]]
+            if not from_base.all():
+                rows[~from_base] = self._buf[new_rows[src[~from_base] - n_base]]
+            out[s:s + len(src)] = rows
+        if out is not None:
+            out.flush()
+            del out
+        with open(vid_path + suffix, "wb") as f:
+            np.save(f, vids[order])
+        return [(tmp, vec_path), (vid_path + suffix, vid_path)]
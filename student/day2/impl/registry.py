@@ -0,0 +1,517 @@
+# -*- coding: utf-8 -*-
+"""
+Day2 프로세스 상주 레지스트리
+- 요청마다 Embeddings(OpenAI 클라이언트)와 FaissStore 를 새로 만들지 않도록 재사용
+- 스토어 키: (index_dir, embedding_model) + 인덱스 파일들의 (mtime, size) 시그니처
+  → 파일이 다시 빌드되면 시그니처가 달라져 자동으로 재로딩
+- 버전 인덱스(index_dir/CURRENT, versions.py): 시그니처 = 버전 이름. 새 버전이 게시되면 백그라운드에서 로드하는
+  동안 이전 버전으로 계속 응답하고, 준비되면 참조만 교체 (watch() 는 이를 주기적으로 확인하는 스레드)
+  이전 버전은 진행 중이던 질의가 끝나 스토어 참조가 사라지면 사용 중 표시를 풀고 GC
+- 여러 index_dir(팀/프로젝트별 인덱스) 를 요청 시 로드하고, 스토어별 추정 메모리(memory_usage 의 ram) 합이
+  예산(budget_mb, 기본 DAY2_STORE_BUDGET_MB, 0=무제한)을 넘으면 가장 오래 안 쓴 스토어부터 내림 (LRU)
+  pin() 한 index_dir 은 내리지 않음. mmap 파일(mapped)은 OS 가 회수 가능한 페이지 캐시라 예산에서 제외
+  로드는 index_dir 별 잠금에서 → 한 테넌트의 느린 로드가 다른 테넌트 조회를 막지 않음
+"""
+
+from __future__ import annotations
+import os, time, threading, weakref
+from collections import OrderedDict, deque
+from typing import Dict, Any, List, Tuple, Optional
+
+import numpy as np
+
+from .embeddings import Embeddings
+from .store import FaissStore, meta_path_for
+from .batcher import SearchBatcher
+from .lexical import LexicalIndex, lexical_path
+from .doc_router import DocRouter, doc_index_path
+from .doctext import DocTextStore
+from .docstore import docs_exist, columnar_path
+from .query_cache import QueryCache
+from .sharded import ShardedStore, ShardedDocTexts, read_shards, shard_dirs, SHARDS_FILENAME
+from .versions import resolve_index_dir, mark_in_use, release, gc_versions, KEEP_VERSIONS
+
+SWAP_RETRY_S = 30.0  # 새 버전 로드 실패 후 같은 버전 재시도 간격
+
+
+def index_paths(index_dir: str) -> Tuple[str, str]:
+    return (
+        os.path.join(index_dir, "faiss.index"),
+        os.path.join(index_dir, "docs.jsonl"),
+    )
+
+
+def _file_sig(path: str) -> Tuple[int, int]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return (0, 0)
+    return (st.st_mtime_ns, st.st_size)
+
+
+def index_signature(index_dir: str) -> Tuple[Tuple[int, int], ...]:
+    """faiss.index / docs.jsonl / docs.col / index_meta.json 의 (mtime_ns, size) 묶음. 샤드 인덱스는 샤드별 묶음까지"""
+    index_path, docs_path = index_paths(index_dir)
+    sig = tuple(_file_sig(p) for p in (index_path, docs_path, columnar_path(docs_path), meta_path_for(index_path)))
+    shards = shard_dirs(index_dir)
+    if shards:
+        sig += (_file_sig(os.path.join(index_dir, SHARDS_FILENAME)),) + tuple(s for d in shards for s in index_signature(d))
+    return sig
+
+
+def _load(index_dir: str, emb: Embeddings, mmap: bool) -> FaissStore:
+    """index_dir(버전이면 해석된 실제 디렉토리) 의 단일/샤드 스토어 로드 + 차원 검사"""
+    if read_shards(index_dir) is not None:
+        store = ShardedStore.load(index_dir, mmap=mmap)
+    else:
+        index_path, docs_path = index_paths(index_dir)
+        if not (os.path.exists(index_path) and docs_exist(docs_path)):
+            raise FileNotFoundError(f"FAISS 인덱스가 없습니다. 먼저 ingest를 실행하세요: {index_dir}")
+        store = FaissStore.load(index_path, docs_path, mmap=mmap)
+    _check_dim(store, emb)
+    return store
+
+
+def _closers(store: FaissStore) -> List[Any]:
+    """스토어를 교체/내릴 때 닫을 자원 (샤드 스토어의 스레드 풀). 잡고 있던 요청은 닫힌 뒤에도 순차 검색으로 끝남"""
+    return [store] if isinstance(store, ShardedStore) else []
+
+
+def _retire(index_dir: str, vdir: str, keep: int):
+    """버전 스토어가 해제될 때 (weakref.finalize): 사용 중 표시 해제 후 남길 필요 없는 버전 정리"""
+    release(vdir)
+    try:
+        gc_versions(index_dir, keep=keep)
+    except OSError:
+        pass
+
+
+class StoreRegistry:
+    def __init__(self, budget_mb: Optional[float] = None):
+        self._lock = threading.Lock()
+        # (model, dimensions) -> Embeddings
+        self._embedders: Dict[Tuple[str, int], Embeddings] = {}
+        # (index_dir, model, dimensions, mmap) -> (signature, store). 순서 = LRU (앞이 가장 오래 안 씀)
+        self._stores: "OrderedDict[Tuple[str, str, int, bool], Tuple[Tuple, FaissStore]]" = OrderedDict()
+        self._bytes: Dict[Tuple[str, str, int, bool], Dict[str, int]] = {}  # 스토어별 memory_usage
+        self._key_locks: Dict[Tuple[str, str, int, bool], threading.Lock] = {}  # 키별 로드 잠금
+        self._pinned: set = set()  # 내리지 않을 index_dir (절대 경로)
+        # index_dir -> 테넌트별 지표
+        self._tenants: Dict[str, Dict[str, Any]] = {}
+        self._load_ms: deque = deque(maxlen=256)
+        if budget_mb is None:
+            budget_mb = float(os.getenv("DAY2_STORE_BUDGET_MB", "0"))
+        self.budget_bytes = int(budget_mb * 1024 * 1024)
+        self._batchers: Dict[Tuple[str, str, int, bool], SearchBatcher] = {}
+        # 실제 디렉토리(버전 인덱스면 versions/<이름>) -> (signature, LexicalIndex) / DocTextStore
+        self._lexicals: Dict[str, Tuple[Tuple, LexicalIndex]] = {}
+        self._routers: Dict[str, Tuple[Tuple, DocRouter]] = {}
+        self._doc_texts: Dict[str, DocTextStore] = {}
+        # (index_dir, model, dimensions) -> QueryCache (질의 벡터 공간이 같은 범위)
+        self._query_caches: Dict[Tuple[str, str, int], QueryCache] = {}
+        # index_dir -> 현재 서비스 중인 실제 디렉토리 (버전 인덱스면 versions/<이름>), 스토어 -> 로드한 디렉토리
+        self._served: Dict[str, str] = {}
+        self._store_dirs: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+        # 백그라운드 로드 중인 스토어 키, 실패한 (키 → (버전 시그니처, 시각))
+        self._swapping: set = set()
+        self._swap_failed: Dict[Tuple, Tuple[Tuple, float]] = {}
+        self.keep_versions = KEEP_VERSIONS
+        self.stats: Dict[str, Any] = {
+            "hits": 0,
+            "misses": 0,
+            "reloads": 0,
+            "load_time_s": 0.0,
+            "last_load_time_s": 0.0,
+            "embedder_hits": 0,
+            "embedder_misses": 0,
+            "swaps": 0,
+            "swap_errors": 0,
+            "last_swap_error": "",
+            "evictions": 0,
+            "evicted_bytes": 0,
+            "over_budget": 0,
+        }
+
+    # ---------- Embeddings ----------
+    def embedder(self, model: Optional[str] = None, dimensions: Optional[int] = None) -> Embeddings:
+        key = (model or "", int(dimensions or 0))
+        with self._lock:
+            emb = self._embedders.get(key)
+            if emb is not None:
+                self.stats["embedder_hits"] += 1
+                return emb
+            self.stats["embedder_misses"] += 1
+            emb = Embeddings(model=model, dimensions=dimensions)
+            self._embedders[key] = emb
+            return emb
+
+    # ---------- Store ----------
+    def store(self, index_dir: str, emb: Embeddings, mmap: bool = False) -> FaissStore:
+        """
+        캐시된 스토어 반환. 없거나 파일 시그니처가 바뀌었으면 로드 + 차원 검사 후 교체
+        버전 인덱스는 새 버전을 백그라운드로 로드하고 그동안 이전 스토어를 반환 (첫 로드만 동기)
+        새로 올린 뒤 메모리 예산을 넘으면 LRU 스토어를 내림
+        """
+        real_dir, version = resolve_index_dir(index_dir)
+        real_dir = os.path.abspath(real_dir)
+        key = (os.path.abspath(index_dir), emb.model, emb.dimensions or 0, bool(mmap))
+        sig = ("version", version) if version else index_signature(real_dir)
+        with self._lock:
+            cached = self._stores.get(key)
+            if cached is not None and (cached[0] == sig or version is not None):
+                self._touch(key)
+                if cached[0] != sig:
+                    self._swap_async(key, index_dir, real_dir, sig, emb, mmap)
+                return cached[1]
+            klock = self._key_locks.setdefault(key, threading.Lock())
+
+        with klock:  # 같은 키의 동시 미스는 한 번만 로드
+            with self._lock:
+                cached = self._stores.get(key)
+                if cached is not None and cached[0] == sig:
+                    self._touch(key)
+                    return cached[1]
+                self.stats["misses"] += 1
+                if cached is not None:
+                    self.stats["reloads"] += 1
+            t0 = time.perf_counter()
+            store = _load(real_dir, emb, mmap)
+            dt = time.perf_counter() - t0
+            if version is not None:
+                self._track(store, index_dir, real_dir)
+            usage = store.memory_usage()
+            with self._lock:
+                replaced = self._stores.get(key)
+                self._put(key, sig, store, real_dir, usage, dt)
+                evicted = self._evict_locked(protect=key)
+        if replaced is not None:
+            evicted.extend(_closers(replaced[1]))
+        for b in evicted:
+            b.close()
+        return store
+
+    def _touch(self, key: Tuple):
+        """(self._lock 보유) 적중: LRU 맨 뒤로"""
+        self._stores.move_to_end(key)
+        self.stats["hits"] += 1
+        t = self._tenant(key[0])
+        t["hits"] += 1
+        t["last_used"] = time.time()
+
+    def _tenant(self, tenant: str) -> Dict[str, Any]:
+        return self._tenants.setdefault(tenant, {"hits": 0, "loads": 0, "evictions": 0, "load_time_s": 0.0,
+                                                 "last_load_time_s": 0.0, "last_used": 0.0})
+
+    def _put(self, key: Tuple, sig: Tuple, store: FaissStore, real_dir: str, usage: Dict[str, int], dt: float):
+        """(self._lock 보유) 새로 로드한 스토어 등록 + 지표"""
+        self._stores[key] = (sig, store)
+        self._stores.move_to_end(key)
+        self._bytes[key] = usage
+        self._served[key[0]] = real_dir
+        self._store_dirs[store] = real_dir
+        self.stats["load_time_s"] += dt
+        self.stats["last_load_time_s"] = dt
+        self._load_ms.append(dt * 1000)
+        t = self._tenant(key[0])
+        t["loads"] += 1
+        t["load_time_s"] += dt
+        t["last_load_time_s"] = dt
+        t["last_used"] = time.time()
+
+    def _measure_locked(self):
+        """(self._lock 보유) 상주 스토어 사용량 다시 재기 (memory_usage 는 표본 추정이라 가벼움)"""
+        for key, (_, store) in self._stores.items():
+            self._bytes[key] = store.memory_usage()
+
+    def _evict_locked(self, protect: Tuple) -> List[SearchBatcher]:
+        """
+        (self._lock 보유) ram 합이 예산 이하가 될 때까지 LRU 순으로 내림 (pin/방금 올린 키 제외)
+        사용량은 로드 시점 값이 아니라 지금 다시 잼 (쓰기 가능한 스토어의 docs 변경분 등은 로드 뒤에 늘어남)
+        내린 스토어는 참조 중인 요청이 끝나면 GC, 키별 로드 잠금도 버림. 닫아야 할 배처/샤드 스토어 목록 반환
+        (잠금 밖에서 close — 닫힌 배처/샤드 스토어를 아직 쥔 요청은 호출 스레드에서 직접 검색)
+        """
+        if not self.budget_bytes:
+            return []
+        self._measure_locked()
+        total = sum(u["ram"] for u in self._bytes.values())
+        closed = []
+        for key in list(self._stores):
+            if total <= self.budget_bytes:
+                break
+            if key == protect or key[0] in self._pinned:
+                continue
+            usage = self._bytes.pop(key, {"ram": 0})
+            _, store = self._stores.pop(key)
+            self._key_locks.pop(key, None)  # 이 키를 로드 중인 스레드가 있으면 그 잠금은 그 스레드가 끝까지 씀
+            total -= usage["ram"]
+            self.stats["evictions"] += 1
+            self.stats["evicted_bytes"] += usage["ram"]
+            self._tenant(key[0])["evictions"] += 1
+            b = self._batchers.pop(key, None)
+            if b is not None:
+                closed.append(b)
+            closed.extend(_closers(store))
+            if not any(k[0] == key[0] for k in self._stores):  # 이 index_dir 의 BM25/원문/질의 캐시도
+                real_dir = self._served.pop(key[0], None)
+                self._lexicals.pop(real_dir, None)
+                self._routers.pop(real_dir, None)
+                self._doc_texts.pop(real_dir, None)
+                for qk in [qk for qk in self._query_caches if qk[0] == key[0]]:
+                    self._query_caches.pop(qk)
+        if total > self.budget_bytes:
+            self.stats["over_budget"] += 1
+            print(f"[WARN] 스토어 메모리 {total / 2**20:.1f}MB > 예산 {self.budget_bytes / 2**20:.1f}MB "
+                  f"(pin/사용 중인 스토어만 남음)")
+        return closed
+
+    def set_budget(self, budget_mb: float):
+        """메모리 예산 변경 (0=무제한). 줄였으면 바로 내림"""
+        with self._lock:
+            self.budget_bytes = int(budget_mb * 1024 * 1024)
+            evicted = self._evict_locked(protect=())
+        for b in evicted:
+            b.close()
+
+    def pin(self, index_dir: str):
+        """이 index_dir 의 스토어는 예산을 넘어도 내리지 않음 (미리 올리려면 이어서 store() 호출)"""
+        with self._lock:
+            self._pinned.add(os.path.abspath(index_dir))
+
+    def unpin(self, index_dir: str):
+        with self._lock:
+            self._pinned.discard(os.path.abspath(index_dir))
+            evicted = self._evict_locked(protect=())
+        for b in evicted:
+            b.close()
+
+    def _track(self, store: FaissStore, index_dir: str, vdir: str):
+        """버전 디렉토리에 사용 중 표시, 스토어가 GC 되면(참조하던 질의가 모두 끝나면) 해제"""
+        mark_in_use(vdir)
+        weakref.finalize(store, _retire, index_dir, vdir, self.keep_versions)
+
+    def _swap_async(self, key: Tuple, index_dir: str, real_dir: str, sig: Tuple, emb: Embeddings, mmap: bool):
+        """(self._lock 보유 상태에서 호출) 새 버전 백그라운드 로드 → 준비되면 참조 교체"""
+        failed = self._swap_failed.get(key)
+        if key in self._swapping or (failed and failed[0] == sig and time.time() - failed[1] < SWAP_RETRY_S):
+            return
+        self._swapping.add(key)
+
+        def _run():
+            old_batcher, old, evicted = None, None, []
+            try:
+                t0 = time.perf_counter()
+                store = _load(real_dir, emb, mmap)
+                dt = time.perf_counter() - t0
+                self._track(store, index_dir, real_dir)
+                usage = store.memory_usage()
+                with self._lock:
+                    prev = self._served.get(key[0])
+                    old = self._stores.get(key)
+                    self._put(key, sig, store, real_dir, usage, dt)
+                    if prev != real_dir:  # 이전 버전의 BM25/원문 캐시 (진행 중 질의가 다시 필요하면 한 번 재로드)
+                        self._lexicals.pop(prev, None)
+                        self._routers.pop(prev, None)
+                        self._doc_texts.pop(prev, None)
+                    old_batcher = self._batchers.pop(key, None)
+                    self._swap_failed.pop(key, None)
+                    self.stats["swaps"] += 1
+                    self.stats["reloads"] += 1
+                    evicted = self._evict_locked(protect=key)
+                print(f"[SWAP] {index_dir} → {os.path.basename(real_dir)} ({dt:.2f}s)")
+            except Exception as e:  # 새 버전이 깨졌으면 이전 버전으로 계속 서비스
+                with self._lock:
+                    self._swap_failed[key] = (sig, time.time())
+                    self.stats["swap_errors"] += 1
+                    self.stats["last_swap_error"] = f"{real_dir}: {type(e).__name__}: {e}"
+                print(f"[WARN] 새 인덱스 버전 로드 실패, 이전 버전 유지: {real_dir} ({e})")
+            finally:
+                with self._lock:
+                    self._swapping.discard(key)
+            if old_batcher is not None:
+                old_batcher.close()  # 대기 중이던 요청은 이전 스토어로 마저 처리
+            for b in evicted + (_closers(old[1]) if old is not None else []):
+                b.close()
+
+        threading.Thread(target=_run, daemon=True, name="index-swap").start()
+
+    def watch(self, index_dir: str, emb: Embeddings, mmap: bool = False, interval_s: float = 2.0) -> threading.Event:
+        """
+        상주 프로세스용: interval_s 마다 CURRENT 를 확인해 새 버전을 미리 로드·교체하는 데몬 스레드
+        (요청이 없어도 교체되도록). 반환한 Event 를 set() 하면 중지
+        """
+        stop = threading.Event()
+
+        def _loop():
+            while not stop.wait(interval_s):
+                try:
+                    self.store(index_dir, emb, mmap=mmap)
+                except Exception as e:
+                    print(f"[WARN] index watch: {e}")
+
+        threading.Thread(target=_loop, daemon=True, name="index-watch").start()
+        return stop
+
+    def _dir(self, index_dir: str, store: Optional[FaissStore] = None) -> str:
+        """
+        store 를 로드한 실제 디렉토리 (한 요청 안에서 dense/BM25/원문이 같은 버전이 되도록).
+        store 가 없으면 서비스 중인 디렉토리, 아직 안 읽었으면 CURRENT 해석 결과
+        """
+        with self._lock:
+            served = self._store_dirs.get(store) if store is not None else None
+            served = served or self._served.get(os.path.abspath(index_dir))
+        return served or os.path.abspath(resolve_index_dir(index_dir)[0])
+
+    def batcher(self, index_dir: str, emb: Embeddings, mmap: bool = False,
+                store: Optional[FaissStore] = None) -> SearchBatcher | FaissStore:
+        """
+        스토어별 마이크로 배처. 스토어가 재로딩되면 이전 배처를 닫고 새로 만든다
+        store: 요청이 이미 잡은 스토어. 그 사이 새 버전으로 교체됐으면 배처 없이 그 스토어를 그대로 반환
+        """
+        current = self.store(index_dir, emb, mmap=mmap)
+        if store is not None and store is not current:
+            return store
+        store = current
+        key = (os.path.abspath(index_dir), emb.model, emb.dimensions or 0, bool(mmap))
+        old = None
+        with self._lock:
+            b = self._batchers.get(key)
+            if b is None or b.store is not store:
+                old = b
+                b = SearchBatcher(store)
+                self._batchers[key] = b
+        if old is not None:
+            old.close()
+        return b
+
+    def lexical(self, index_dir: str, store: Optional[FaissStore] = None) -> Optional[LexicalIndex]:
+        """
+        BM25 역색인 (bm25.npz). 없으면 None (하이브리드 검색 시 dense 만 사용)
+        인덱스 재빌드로 시그니처가 바뀌면 다시 로드. store 를 주면 그 스토어와 같은 버전
+        """
+        key = self._dir(index_dir, store)
+        path = lexical_path(key)
+        if not os.path.exists(path):
+            return None
+        sig = index_signature(key) + (_file_sig(path),)
+        with self._lock:
+            cached = self._lexicals.get(key)
+            if cached is not None and cached[0] == sig:
+                return cached[1]
+            lex = LexicalIndex.load(path)
+            self._lexicals[key] = (sig, lex)
+            return lex
+
+    def doc_router(self, index_dir: str, store: Optional[FaissStore] = None) -> Optional[DocRouter]:
+        """
+        문서 라우팅 중심 (docindex.npz). 없으면 None (구버전 인덱스 → 전체 청크 검색)
+        PCA 축소 인덱스는 store 의 reducer 로 질의를 변환. store 를 주면 그 스토어와 같은 버전
+        """
+        key = self._dir(index_dir, store)
+        path = doc_index_path(key)
+        if not os.path.exists(path):
+            return None
+        sig = index_signature(key) + (_file_sig(path),)
+        with self._lock:
+            cached = self._routers.get(key)
+            if cached is not None and cached[0] == sig:
+                return cached[1]
+        router = DocRouter.load(path, reducer=getattr(store, "reducer", None))
+        with self._lock:
+            self._routers[key] = (sig, router)
+        return router
+
+    def doc_texts(self, index_dir: str, store: Optional[FaissStore] = None) -> DocTextStore:
+        """부모 창 원문 저장소 (파일을 직접 읽으므로 재빌드 후에도 재생성 불필요, 디코딩 LRU 만 공유)
+        버전 인덱스는 버전 디렉토리별. store 를 주면 그 스토어와 같은 버전"""
+        key = self._dir(index_dir, store)
+        conf = read_shards(key)
+        with self._lock:
+            ds = self._doc_texts.get(key)
+            if ds is None or (conf is not None and getattr(ds, "n_shards", 0) != conf["n_shards"]):
+                ds = ShardedDocTexts(key, conf["n_shards"]) if conf else DocTextStore(key)
+                self._doc_texts[key] = ds
+            return ds
+
+    def query_cache(self, index_dir: str, emb: Embeddings, ttl_s: float = 600.0) -> QueryCache:
+        """
+        질의 결과 캐시. 인덱스 버전 = 인덱스 파일들 + bm25.npz 시그니처 → 재빌드되면 캐시가 스스로 비움
+        """
+        key = (os.path.abspath(index_dir), emb.model, emb.dimensions or 0)
+        real_dir = self._dir(index_dir)
+        version = (real_dir,) + index_signature(real_dir) + (_file_sig(lexical_path(real_dir)),)
+        with self._lock:
+            cache = self._query_caches.get(key)
+            if cache is None:
+                cache = self._query_caches[key] = QueryCache(ttl_s=ttl_s)
+        cache.ttl_s = ttl_s
+        cache.check_version(version)
+        return cache
+
+    def clear(self):
+        with self._lock:
+            batchers = list(self._batchers.values())
+            batchers += [c for _, st in self._stores.values() for c in _closers(st)]
+            self._batchers.clear()
+            self._query_caches.clear()
+            self._lexicals.clear()
+            self._routers.clear()
+            self._doc_texts.clear()
+            self._stores.clear()
+            self._bytes.clear()
+            self._key_locks.clear()
+            self._served.clear()
+            self._swap_failed.clear()
+            self._embedders.clear()
+        for b in batchers:
+            b.close()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            self._measure_locked()
+            out = dict(self.stats)
+            out["stores"] = len(self._stores)
+            out["embedders"] = len(self._embedders)
+            out["lexicals"] = len(self._lexicals)
+            out["served"] = dict(self._served)
+            out["budget_bytes"] = self.budget_bytes
+            out["resident_bytes"] = sum(u["ram"] for u in self._bytes.values())
+            out["mapped_bytes"] = sum(u["mapped"] for u in self._bytes.values())
+            out["pinned"] = sorted(self._pinned)
+            loads = np.array(self._load_ms) if self._load_ms else None
+            out["load_ms_p50"] = float(np.percentile(loads, 50)) if loads is not None else 0.0
+            out["load_ms_p95"] = float(np.percentile(loads, 95)) if loads is not None else 0.0
+            tenants = {name: dict(t, ram_bytes=0, mapped_bytes=0, resident=False, pinned=name in self._pinned)
+                       for name, t in self._tenants.items()}
+            for key, usage in self._bytes.items():
+                t = tenants[key[0]]
+                t["ram_bytes"] += usage["ram"]
+                t["mapped_bytes"] += usage["mapped"]
+                t["resident"] = True
+            out["tenants"] = tenants
+            batchers = list(self._batchers.items())
+            caches = list(self._query_caches.items())
+        out["batchers"] = {k[0]: b.snapshot() for k, b in batchers}
+        out["query_caches"] = {k[0]: c.metrics() for k, c in caches}
+        return out
+
+
+def _check_dim(store: FaissStore, emb: Embeddings):
+    """
+    인덱스 메타에 같은 모델의 차원이 기록돼 있으면 원격 호출 없이 검사.
+    메타가 없는 구버전 인덱스는 embedder 차원(표 또는 1회 확인값)으로 비교
+    차원 축소 인덱스: api 는 embedder 의 dimensions 가 같아야 하고, pca 는 변환 전 차원(in_dim)과 비교
+    """
+    reduce = store.meta.get("reduce") or {}
+    if reduce.get("method") == "api" and emb.dimensions != reduce.get("dim"):
+        raise ValueError(f"인덱스가 dimensions={reduce.get('dim')} 로 생성됐습니다. "
+                         f"Day2Plan.embedding_dimensions={reduce.get('dim')} 로 질의하세요. (embedder={emb.dimensions})")
+    if store.meta.get("embedding_model") == emb.model and "dim" in store.meta and not emb.dimensions:
+        emb_dim = int(reduce.get("in_dim", store.meta["dim"]))
+    else:
+        emb_dim = emb.dim
+    if store.input_dim != emb_dim:
+        raise ValueError(f"임베딩 차원이 인덱스와 다릅니다. (index={store.input_dim}, embedder={emb_dim})")
+
+
+# 프로세스 전역 레지스트리
+REGISTRY = StoreRegistry()
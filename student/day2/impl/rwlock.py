@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+읽기/쓰기 잠금 (FaissStore 동시 검색 + 증분 추가용)
+- 읽기는 여러 스레드가 동시에 (faiss 검색은 GIL 을 풀므로 실제로 병렬), 쓰기는 하나씩 단독
+- 쓰기 대기 중이면 새 읽기는 기다림 → 질의가 계속 들어와도 쓰기가 굶지 않음
+- 같은 스레드 재진입 허용: 읽기 안의 읽기, 쓰기 안의 읽기/쓰기 (upsert → remove_ids + add 등)
+  읽기 안에서 쓰기(승격)는 교착이므로 RuntimeError
+"""
+
+from __future__ import annotations
+import time, threading
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator
+
+
+class RWLock:
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer: int | None = None  # 쓰기 보유 스레드 ident
+        self._waiting_writers = 0
+        self._local = threading.local()  # 스레드별 읽기/쓰기 깊이
+        self.stats: Dict[str, Any] = {"reads": 0, "writes": 0, "write_wait_s": 0.0, "max_write_wait_s": 0.0}
+
+    def _depth(self, kind: str) -> int:
+        return getattr(self._local, kind, 0)
+
+    @contextmanager
+    def read(self) -> Iterator[None]:
+        if self._depth("r") or self._depth("w"):  # 재진입 (쓰기 중 읽기 포함)
+            self._local.r = self._depth("r") + 1
+            try:
+                yield
+            finally:
+                self._local.r -= 1
+            return
+        with self._cond:
+            while self._writer is not None or self._waiting_writers:
+                self._cond.wait()
+            self._readers += 1
+            self.stats["reads"] += 1
+        self._local.r = 1
+        try:
+            yield
+        finally:
+            self._local.r = 0
+            with self._cond:
+                self._readers -= 1
+                if self._readers == 0:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write(self) -> Iterator[None]:
+        if self._depth("w"):
+            self._local.w += 1
+            try:
+                yield
+            finally:
+                self._local.w -= 1
+            return
+        if self._depth("r"):
+            raise RuntimeError("읽기 잠금을 가진 채로 쓰기 잠금을 얻을 수 없습니다.")
+        t0 = time.perf_counter()
+        with self._cond:
+            self._waiting_writers += 1
+            try:
+                while self._writer is not None or self._readers:
+                    self._cond.wait()
+            finally:
+                self._waiting_writers -= 1
+            self._writer = threading.get_ident()
+            wait = time.perf_counter() - t0
+            self.stats["writes"] += 1
+            self.stats["write_wait_s"] += wait
+            self.stats["max_write_wait_s"] = max(self.stats["max_write_wait_s"], wait)
+        self._local.w = 1
+        try:
+            yield
+        finally:
+            self._local.w = 0
+            with self._cond:
+                self._writer = None
+                self._cond.notify_all()
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+인덱스 디렉토리 다중 파일 원자 저장 (FaissStore.save)
+- 모든 새 파일을 <이름>.tmp-<토큰> 으로 끝까지 쓰고 fsync
+- 교체 목록(tmp → 최종, 지울 낡은 파일)을 save.journal.json 으로 tmp → rename (이 rename 이 커밋 시점)
+- 목록대로 rename (index_meta.json 이 마지막) → 낡은 파일 삭제 → 저널 삭제
+- 중간에 죽으면: 커밋 전이면 기존 파일 그대로(남은 tmp 는 다음 저장이 정리), 커밋 후면 다음 load/save 가
+  저널을 마저 적용 (롤포워드). 토큰이 저장마다 달라 오래된 저널이 다음 저장의 tmp 를 옮기지 않음
+"""
+
+from __future__ import annotations
+import os, json, uuid
+from typing import Dict, List, Tuple
+
+JOURNAL_FILENAME = "save.journal.json"
+_TMP_MARK = ".tmp-"
+
+
+def journal_path(index_dir: str) -> str:
+    return os.path.join(index_dir, JOURNAL_FILENAME)
+
+
+def new_token() -> str:
+    return uuid.uuid4().hex[:12]
+
+
+def tmp_name(path: str, token: str) -> str:
+    return f"{path}{_TMP_MARK}{token}"
+
+
+def _fsync_file(path: str):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _fsync_dir(path: str):
+    try:
+        _fsync_file(path)
+    except OSError:  # 디렉토리 fsync 미지원 (Windows 등)
+        pass
+
+
+def commit(index_dir: str, renames: List[Tuple[str, str]], remove: List[str]):
+    """
+    renames: (tmp, 최종) 경로 — 모두 index_dir 안, 마지막 항목이 가장 나중에 교체됨 (메타를 마지막에)
+    remove: 교체 후 지울 낡은 파일 (형식이 바뀌어 더는 쓰지 않는 파일)
+    """
+    for tmp, _ in renames:
+        _fsync_file(tmp)
+    plan = {"replace": [[os.path.relpath(t, index_dir), os.path.relpath(f, index_dir)] for t, f in renames],
+            "remove": [os.path.relpath(p, index_dir) for p in remove]}
+    jp = journal_path(index_dir)
+    with open(jp + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(plan, f, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(jp + ".tmp", jp)
+    _fsync_dir(index_dir)
+    _apply(index_dir, plan)
+
+
+def _apply(index_dir: str, plan: Dict[str, List]):
+    for tmp, final in plan["replace"]:
+        try:
+            os.replace(os.path.join(index_dir, tmp), os.path.join(index_dir, final))
+        except FileNotFoundError:  # 이미 적용됨 (다른 프로세스가 먼저 롤포워드)
+            pass
+    for name in plan["remove"]:
+        try:
+            os.remove(os.path.join(index_dir, name))
+        except FileNotFoundError:
+            pass
+    _fsync_dir(index_dir)
+    try:
+        os.remove(journal_path(index_dir))
+    except FileNotFoundError:
+        pass
+
+
+def recover(index_dir: str) -> bool:
+    """커밋됐지만 적용이 끝나지 않은 저장이 있으면 마저 적용. 적용했으면 True"""
+    jp = journal_path(index_dir)
+    try:
+        with open(jp, "r", encoding="utf-8") as f:
+            plan = json.load(f)
+    except FileNotFoundError:
+        return False
+    _apply(index_dir, plan)
+    return True
+
+
+def pending(index_dir: str) -> bool:
+    return os.path.exists(journal_path(index_dir))
+
+
+def clean_uncommitted(index_dir: str):
+    """커밋 전에 중단된 저장이 남긴 tmp 파일 삭제 (저널이 없을 때만 호출)"""
+    try:
+        names = os.listdir(index_dir)
+    except OSError:
+        return
+    for name in names:
+        if _TMP_MARK in name:
+            try:
+                os.remove(os.path.join(index_dir, name))
+            except OSError:
+                pass
@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+"""
+샤드 인덱스 (index_dir/shards.json + index_dir/shards/shard_NNN/)
+- 문서 경로 해시로 샤드 결정 → 한 문서의 청크는 항상 같은 샤드 (증분/삭제/부모 창이 샤드 안에서 끝남)
+- 각 샤드는 보통 인덱스 디렉토리 그대로 (faiss.index, docs.col, manifest ...) → 샤드 하나만 다시 빌드 가능
+- ShardedStore: FaissStore 와 같은 search/search_batch/hits/vectors/docs/filters 계약
+  질의를 모든 샤드에 스레드 풀로 동시에 보내고(faiss 는 검색 중 GIL 해제) 샤드별 top-k 를 힙으로 병합
+  로드에 실패한 샤드는 failed 에 기록하고 나머지로 검색 (전부 실패하면 예외)
+  close() 는 스레드 풀만 내림 → 레지스트리가 교체/내린 스토어를 아직 잡고 있던 요청은 호출 스레드에서 순차 검색
+- PCA 축소(--reduce pca) 는 전체 샤드가 reducer 하나를 공유 (최상위 reducer.pca 를 각 샤드에 복사)
+- BM25(bm25.npz) 는 index_dir 최상위에 전체 청크로 하나 (IDF 가 샤드별로 갈리지 않도록)
+"""
+
+from __future__ import annotations
+import os, json, heapq, hashlib
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from .store import FaissStore, read_index_meta
+from .filters import FilterIndex
+from .doctext import DocTextStore
+
+SHARDS_FILENAME = "shards.json"
+SHARDS_DIRNAME = "shards"
+
+
+def shard_of(path: str, n_shards: int) -> int:
+    return int(hashlib.sha1(path.encode("utf-8")).hexdigest()[:8], 16) % n_shards
+
+
+def shard_dir(index_dir: str, i: int) -> str:
+    return os.path.join(index_dir, SHARDS_DIRNAME, f"shard_{i:03d}")
+
+
+def read_shards(index_dir: str) -> Optional[Dict[str, Any]]:
+    """샤드 설정. 샤드 인덱스가 아니면 None"""
+    try:
+        with open(os.path.join(index_dir, SHARDS_FILENAME), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_shards(index_dir: str, n_shards: int, reduce: Optional[Dict[str, Any]] = None):
+    """reduce: 샤드 공통 PCA 설정 (방식/차원/임베딩 모델 — 다음 빌드가 reducer.pca 재사용 여부 판단)"""
+    p = os.path.join(index_dir, SHARDS_FILENAME)
+    conf: Dict[str, Any] = {"n_shards": int(n_shards), "route": "sha1(path) % n_shards"}
+    if reduce:
+        conf["reduce"] = reduce
+    with open(p + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(conf, f)
+    os.replace(p + ".tmp", p)
+
+
+def shard_dirs(index_dir: str) -> List[str]:
+    conf = read_shards(index_dir)
+    return [shard_dir(index_dir, i) for i in range(conf["n_shards"])] if conf else []
+
+
+def shard_index_dims(index_dir: str, n_shards: int) -> Dict[int, int]:
+    """저장된 샤드별 인덱스 차원 (아직 없는 샤드는 빠짐)"""
+    out = {}
+    for i in range(n_shards):
+        dim = read_index_meta(os.path.join(shard_dir(index_dir, i), "faiss.index")).get("dim")
+        if dim:
+            out[i] = int(dim)
+    return out
+
+
+def check_shard_dims(dims: Dict[int, int], index_dir: str):
+    """샤드끼리 차원이 다르면 병합 점수가 의미 없음 → 명확한 오류"""
+    if len(set(dims.values())) > 1:
+        raise ValueError(f"샤드 인덱스 차원이 서로 다릅니다 {dims}: {index_dir} (--full 로 전체 재생성 필요)")
+
+
+class ShardedDocs(Mapping):
+    """샤드별 docs 를 합친 읽기 전용 vid → 레코드 매핑"""
+
+    def __init__(self, parts: List[Mapping]):
+        self.parts = parts
+
+    def owner(self, vid: int) -> int:
+        for i, d in enumerate(self.parts):
+            if vid in d:
+                return i
+        return -1
+
+    def __getitem__(self, vid: int) -> Dict[str, Any]:
+        i = self.owner(int(vid))
+        if i < 0:
+            raise KeyError(vid)
+        return self.parts[i][int(vid)]
+
+    def __contains__(self, vid) -> bool:
+        return self.owner(int(vid)) >= 0
+
+    def __len__(self) -> int:
+        return sum(len(d) for d in self.parts)
+
+    def __iter__(self) -> Iterator[int]:
+        return chain.from_iterable(self.parts)
+
+    def path_column(self) -> Tuple[np.ndarray, List[str]]:
+        vids, paths = [], []
+        for d in self.parts:
+            if hasattr(d, "path_column"):
+                v, p = d.path_column()
+            else:
+                v = np.fromiter(d.keys(), dtype="int64", count=len(d))
+                p = [(d[int(x)].get("meta") or {}).get("path", "") for x in v]
+            vids.append(v)
+            paths.extend(p)
+        return (np.concatenate(vids) if vids else np.zeros(0, dtype="int64")), paths
+
+
+class ShardedDocTexts:
+    """부모 창 원문: 경로 → 해당 샤드의 doctext/"""
+
+    def __init__(self, index_dir: str, n_shards: int):
+        self.n_shards = n_shards
+        self._stores = [DocTextStore(shard_dir(index_dir, i)) for i in range(n_shards)]
+
+    def get(self, doc_path: str) -> Optional[str]:
+        return self._stores[shard_of(doc_path, self.n_shards)].get(doc_path)
+
+
+class ShardedStore:
+    def __init__(self, shards: List[FaissStore], index_dir: str = "", failed: Dict[int, str] | None = None,
+                 workers: int = 0):
+        """shards: 로드된 샤드 스토어 (실패한 샤드 제외), workers: 팬아웃 스레드 수 (0=max(샤드 수, CPU 수))"""
+        if not shards:
+            raise ValueError(f"사용 가능한 샤드가 없습니다: {index_dir} {failed or ''}")
+        self.index_dir = index_dir
+        self.shards = shards
+        self.failed: Dict[int, str] = dict(failed or {})  # 샤드 번호 → 로드 오류
+        self.docs = ShardedDocs([s.docs for s in shards])
+        self._filters: FilterIndex | None = None
+        self._pool = ThreadPoolExecutor(max_workers=workers or max(len(shards), os.cpu_count() or 1),
+                                        thread_name_prefix="shard") if len(shards) > 1 else None
+
+    @classmethod
+    def load(cls, index_dir: str, mmap: bool = False, workers: int = 0) -> "ShardedStore":
+        shards, failed = [], {}
+        for i, d in enumerate(shard_dirs(index_dir)):
+            try:
+                shards.append(FaissStore.load(os.path.join(d, "faiss.index"), os.path.join(d, "docs.jsonl"),
+                                              mmap=mmap))
+            except Exception as e:  # 손상/누락 샤드는 건너뛰고 나머지로 서비스
+                failed[i] = f"{type(e).__name__}: {e}"
+        if failed:
+            print(f"[WARN] 샤드 로드 실패 {sorted(failed)} → 나머지 {len(shards)}개로 검색")
+        loaded = [i for i in range(len(shards) + len(failed)) if i not in failed]
+        check_shard_dims({i: s.input_dim for i, s in zip(loaded, shards)}, index_dir)
+        check_shard_dims({i: s.dim for i, s in zip(loaded, shards)}, index_dir)
+        return cls(shards, index_dir=index_dir, failed=failed, workers=workers)
+
+    # ---------- FaissStore 호환 속성 ----------
+    def __len__(self) -> int:
+        return sum(len(s) for s in self.shards)
+
+    @property
+    def dim(self) -> int:
+        return self.shards[0].dim
+
+    @property
+    def input_dim(self) -> int:
+        return self.shards[0].input_dim
+
+    @property
+    def meta(self) -> Dict[str, Any]:
+        return dict(self.shards[0].meta, count=len(self.docs), shards=len(self.shards) + len(self.failed))
+
+    @property
+    def supports_ids(self) -> bool:
+        return True
+
+    @property
+    def reducer(self):
+        return self.shards[0].reducer
+
+    @property
+    def filters(self) -> FilterIndex:
+        """전체 샤드 기준 필터 색인 (BM25 allow 용). 샤드별 검색 필터는 각 샤드의 filters.npz"""
+        if self._filters is None:
+            self._filters = FilterIndex.build(self.docs)
+        return self._filters
+
+    def memory_usage(self) -> Dict[str, int]:
+        usage = [s.memory_usage() for s in self.shards]
+        return {"ram": sum(u["ram"] for u in usage), "mapped": sum(u["mapped"] for u in usage)}
+
+    def close(self):
+        """스레드 풀 종료 (여러 번 호출해도 안전). 이후 검색은 샤드를 순차로 돎"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+
+    # ---------- Search ----------
+    def search(self, query_vec: np.ndarray, top_k: int = 5,
+               nprobe: int = 0, ef_search: int = 0, where: Dict[str, Any] | None = None) -> List[Dict[str, Any]]:
+        if query_vec.ndim == 1:
+            query_vec = query_vec[None, :]
+        return self.search_batch(query_vec[:1], top_k, nprobe=nprobe, ef_search=ef_search, where=where)[0]
+
+    def search_batch(self, queries: np.ndarray, top_k: int = 5, nprobe: int = 0, ef_search: int = 0,
+                     where: Dict[str, Any] | None = None) -> List[List[Dict[str, Any]]]:
+        """모든 샤드에 (Q, D) 를 동시에 보내고 질의별로 샤드 결과를 점수 순 top_k 병합"""
+        def _one(s: FaissStore):
+            return s.search_batch(queries, top_k, nprobe=nprobe, ef_search=ef_search, where=where)
+
+        futures = None
+        if self._pool is not None:
+            try:
+                futures = [self._pool.submit(_one, s) for s in self.shards]
+            except RuntimeError:  # close() 뒤 (이미 제출한 작업은 풀이 마저 끝냄)
+                futures = None
+        if futures is None:
+            per_shard = [_one(s) for s in self.shards]
+        else:
+            per_shard = [f.result() for f in futures]
+        return [heapq.nlargest(top_k, chain.from_iterable(r[q] for r in per_shard), key=lambda h: h["score"])
+                for q in range(len(queries))]
+
+    def _group(self, vids: List[int]) -> Dict[int, List[int]]:
+        """vid 목록 → 샤드 번호별 (입력 위치) 목록"""
+        groups: Dict[int, List[int]] = {}
+        for pos, vid in enumerate(vids):
+            groups.setdefault(self.docs.owner(vid), []).append(pos)
+        if -1 in groups:
+            raise KeyError([vids[p] for p in groups[-1]])
+        return groups
+
+    def vectors(self, vids: Iterable[int]) -> np.ndarray:
+        vids = [int(v) for v in vids]
+        out = np.zeros((len(vids), self.dim), dtype="float32")
+        for i, pos in self._group(vids).items():
+            out[pos] = self.shards[i].vectors([vids[p] for p in pos])
+        return out
+
+    def score(self, vids: Iterable[int], query_vec: np.ndarray) -> np.ndarray:
+        vids = [int(v) for v in vids]
+        out = np.zeros(len(vids), dtype="float32")
+        for i, pos in self._group(vids).items():
+            out[pos] = self.shards[i].score([vids[p] for p in pos], query_vec)
+        return out
+
+    def hits(self, vids: Iterable[int], scores: Iterable[float]) -> List[Dict[str, Any]]:
+        """FaissStore.hits 와 같음: 입력 순서, 이미 삭제된 vid 는 건너뜀"""
+        vids, scores = [int(v) for v in vids], list(scores)
+        groups: Dict[int, List[int]] = {}
+        for pos, vid in enumerate(vids):
+            groups.setdefault(self.docs.owner(vid), []).append(pos)
+        groups.pop(-1, None)
+        found: Dict[int, Dict[str, Any]] = {}
+        for i, pos in groups.items():
+            for h in self.shards[i].hits([vids[p] for p in pos], [scores[p] for p in pos]):
+                found[h["vid"]] = h
+        return [found[v] for v in vids if v in found]
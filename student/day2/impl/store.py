@@ -1,54 +1,591 @@
 # -*- coding: utf-8 -*-
-import os, json
-from typing import List, Dict, Any, Tuple
+import os, json, time, hashlib, threading, functools
+from collections import OrderedDict
+from typing import List, Dict, Any, Tuple, Iterable
 import numpy as np
 import faiss
 
+from .docs_offsets import LazyDocs, write_offsets, offsets_path
+from .docstore import ColumnarDocs, DocsOverlay, write_columnar, columnar_path, records_nbytes, DOCS_FORMATS
+from .index_factory import (
+    resolve_index_type, default_params, make_index, train_index,
+    apply_search_defaults, search_params, precision_of, needs_training, MAX_TRAIN,
+)
+from .raw_vectors import RawVectors, raw_vector_paths
+from .dimreduce import PcaReducer, reducer_path
+from .filters import FilterIndex, FILTERS_FILENAME
+from .rwlock import RWLock
+from . import save_journal
+
+META_FILENAME = "index_meta.json"
+LOAD_RETRIES = 3  # 읽는 도중 저장이 끝났을 때 다시 읽는 횟수
+LOAD_WAIT_S = 0.2  # 읽기 전용 로드가 다른 프로세스의 커밋 적용을 기다리는 간격
+# 필터 결과가 이 개수 이하면 IDSelector 스캔 대신 해당 벡터만 정확 채점 (HNSW 가 걸러진 그래프에서 헤매지 않도록)
+FILTER_EXACT_MAX = 1024
+_SELECTOR_CACHE = 32  # where 별 (허용 vid, IDSelector) 재사용 개수
+
+
+def chunk_vid(chunk_id: str) -> int:
+    """청크 id 문자열 → 안정적인 64bit 벡터 id (faiss idx_t, 음수/−1 제외)"""
+    h = hashlib.blake2b(chunk_id.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(h, "little") & 0x7FFF_FFFF_FFFF_FFFF
+
+
+def meta_path_for(index_path: str) -> str:
+    """인덱스 옆에 두는 메타 파일 경로 (임베딩 모델/차원 등)"""
+    return os.path.join(os.path.dirname(index_path), META_FILENAME)
+
+
+def _stat_sig(path: str) -> Tuple[int, int]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return (0, 0)
+    return (st.st_mtime_ns, st.st_size)
+
+
+def read_index_meta(index_path: str) -> Dict[str, Any]:
+    """메타 파일이 없거나 깨져 있으면 빈 dict (구버전 인덱스 호환)"""
+    try:
+        with open(meta_path_for(index_path), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def index_nbytes(index: faiss.Index) -> Tuple[int, int]:
+    """
+    faiss 인덱스 바이트 추정 (직렬화 없이) → (전체, 그중 벡터 코드)
+    코드 + IDMap id 배열 + HNSW 이웃 그래프 + IVF 중심/리스트 id + PQ 코드북
+    """
+    index = faiss.downcast_index(index)
+    n = int(index.ntotal)
+    if isinstance(index, (faiss.IndexIDMap, faiss.IndexIDMap2)):
+        total, codes = index_nbytes(index.index)
+        return total + 8 * n, codes
+    if isinstance(index, faiss.IndexHNSW):
+        total, codes = index_nbytes(index.storage)
+        return total + int(index.hnsw.neighbors.size()) * 4 + 12 * n, codes
+    if isinstance(index, faiss.IndexIVF):
+        codes = n * int(index.code_size)
+        total = index_nbytes(index.quantizer)[0] + codes + 8 * n
+        if isinstance(index, faiss.IndexIVFPQ):
+            total += int(index.pq.M * index.pq.ksub * index.pq.dsub) * 4
+        return total, codes
+    codes = n * int(getattr(index, "code_size", 0) or index.d * 4)
+    return codes, codes
+
+
+def _reading(fn):
+    """검색/조회: 읽기 잠금 (여러 스레드 동시)"""
+    @functools.wraps(fn)
+    def wrapper(self, *args, **kwargs):
+        with self._rw.read():
+            return fn(self, *args, **kwargs)
+    return wrapper
+
+
+def _writing(fn):
+    """add/remove/save: 쓰기 잠금 (단독) → 검색은 변경 전 또는 변경 완료 후 상태만 봄"""
+    @functools.wraps(fn)
+    def wrapper(self, *args, **kwargs):
+        with self._rw.write():
+            return fn(self, *args, **kwargs)
+    return wrapper
+
+
+def _read_index(index_path: str, index_type: str, mmap: bool) -> faiss.Index:
+    """
+    mmap 플래그: IVF 는 IO_FLAG_MMAP(역리스트 매핑), flat/hnsw 는 IO_FLAG_MMAP_IFC(코드 배열 매핑).
+    해당 플래그를 지원하지 않는 faiss/인덱스면 일반 로드로 대체
+    """
+    if not mmap:
+        return faiss.read_index(index_path)
+    flag = faiss.IO_FLAG_MMAP
+    if not index_type.startswith("ivf"):
+        flag = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP)
+    try:
+        return faiss.read_index(index_path, flag | faiss.IO_FLAG_READ_ONLY)
+    except RuntimeError:
+        return faiss.read_index(index_path)
+
+
 class FaissStore:
-    def __init__(self, dim: int, index_path: str, docs_path: str):
+    def __init__(self, dim: int, index_path: str, docs_path: str,
+                 index_type: str = "flat", index_params: Dict[str, Any] | None = None):
+        """
+        - index_type: flat | hnsw | ivf_flat | ivf_pq | auto (index_factory 참고)
+        - index_params: nlist/nprobe/m/ef_search 등 기본값 덮어쓰기
+          precision: fp32 | fp16 | sq8 (인덱스 벡터 정밀도, fp32 외에는 원본 float32 를 사이드카로 디스크에 보관)
+          rescore: fp16/sq8 에서 top_k × rescore 개 후보를 원본 float32 로 다시 채점 (0/1=끔)
+        학습이 필요한 종류/auto/sq8 은 첫 add 때 실제 데이터로 생성·학습
+        """
         self.dim = dim
         self.index_path = index_path
         self.docs_path = docs_path
-        self.index = faiss.IndexFlatIP(dim)  # 코사인=내적 (임베딩 정규화 가정)
-        self.docs: List[Dict[str, Any]] = []
+        self.index_type = index_type
+        self.index_params: Dict[str, Any] = dict(index_params or {})
+        # 코사인=내적 (임베딩 정규화 가정). 안정 id 기반 삭제/교체 지원
+        self.index: faiss.Index | None = None
+        if not needs_training(index_type, self.index_params):
+            self._create_index(np.zeros((0, dim), dtype="float32"))
+        self.raw: RawVectors | None = None if self.precision == "fp32" else RawVectors(dim)
+        self.reducer: PcaReducer | None = None  # 로컬 PCA 축소 인덱스: 입력(원래 차원) → dim
+        self._filters: FilterIndex | None = None
+        self._filters_on_disk = False  # load 직후에만 filters.npz 가 docs 와 일치
+        self._selectors: "OrderedDict[str, tuple]" = OrderedDict()
+        self._positions: Tuple[np.ndarray, np.ndarray, np.ndarray] | None = None
+        self._sel_lock = threading.Lock()
+        # 인덱스 + docs 를 함께 보호 (검색 중에 add 가 끼어 id 는 있는데 docs 가 없는 상태를 보지 않도록)
+        self._rw = RWLock()
+        # 벡터 id → 문서 레코드 (구버전 순번 인덱스는 0..N-1)
+        self.docs: Dict[int, Dict[str, Any]] = {}
+        self.meta: Dict[str, Any] = {}  # 예: {"embedding_model": ..., "dim": ...}
+        self._positional = False  # 구버전 IndexFlatIP(순번 id) 여부
+        self.docs_format = "columnar"  # columnar(docs.col) | jsonl(docs.jsonl, 구버전 인덱스)
+        self.read_only = False    # mmap 로드 시 True
+
+    def __len__(self) -> int:
+        return int(self.index.ntotal) if self.index is not None else 0
+
+    @property
+    def supports_ids(self) -> bool:
+        return not self._positional
+
+    def memory_usage(self) -> Dict[str, int]:
+        """
+        추정 바이트: ram = 힙에 올라간 인덱스/docs/원본 벡터 변경분, mapped = mmap 된 파일 (OS 가 회수 가능)
+        mmap 로드한 인덱스는 벡터 코드를 mapped 로 셈 (HNSW 그래프 등 나머지는 ram)
+        """
+        ram = mapped = 0
+        if self.index is not None:
+            total, codes = index_nbytes(self.index)
+            if self.read_only:
+                ram, mapped = total - codes, codes
+            else:
+                ram = total
+        if hasattr(self.docs, "memory_usage"):
+            usage = self.docs.memory_usage()
+            ram, mapped = ram + usage["ram"], mapped + usage["mapped"]
+        else:
+            ram += records_nbytes(self.docs.values(), len(self.docs))
+        if self.raw is not None:
+            usage = self.raw.memory_usage()
+            ram, mapped = ram + usage["ram"], mapped + usage["mapped"]
+        return {"ram": int(ram), "mapped": int(mapped)}
+
+    @property
+    def precision(self) -> str:
+        return precision_of(self.index_params)
+
+    @property
+    def input_dim(self) -> int:
+        """add/search 에 넣을 임베딩 차원 (PCA 축소 인덱스면 변환 전 차원)"""
+        return self.reducer.d_in if self.reducer is not None else self.dim
+
+    @property
+    @_reading
+    def filters(self) -> FilterIndex:
+        """메타데이터 필터 색인. 저장된 filters.npz 가 최신이면 읽고, 아니면 docs 로 만듦"""
+        if self._filters is None:
+            path = os.path.join(os.path.dirname(self.index_path), FILTERS_FILENAME)
+            if self._filters_on_disk and os.path.exists(path):
+                self._filters = FilterIndex.load(path)
+            else:
+                self._filters = FilterIndex.build(self.docs)
+        return self._filters
+
+    def _invalidate_filters(self):
+        with self._sel_lock:
+            self._filters, self._filters_on_disk = None, False
+            self._selectors.clear()
+            self._positions = None
+
+    def _selector(self, where: Dict[str, Any]) -> tuple:
+        """
+        where → (허용 vid | None, 검색할 인덱스, IDSelector, 내부 위치→vid 배열 | None). 최근 where 는 캐시
+        - IDMap(flat/hnsw): 내부 인덱스를 위치 비트맵(IDSelectorBitmap)으로 직접 검색 → id 변환/해시 조회 없음
+        - IVF: 리스트에 vid 가 저장돼 있으므로 IDSelectorBatch(해시 + 블룸 필터)
+        """
+        key = json.dumps(where, sort_keys=True, ensure_ascii=False, default=str)
+        with self._sel_lock:
+            hit = self._selectors.get(key)
+            if hit is not None:
+                self._selectors.move_to_end(key)
+                return hit
+        allowed = self.filters.select(where)
+        index, sel, labels = self.index, None, None
+        if allowed is None or len(allowed) == len(self.docs) or len(allowed) <= FILTER_EXACT_MAX:
+            pass  # 조건 없음/전부 허용(선택자 불필요) 또는 소수(정확 부분 검색)
+        elif isinstance(self.index, (faiss.IndexIDMap, faiss.IndexIDMap2)) or self._positional:
+            labels, sorted_ids, order = self._position_map()
+            bits = np.zeros(len(labels), dtype=bool)
+            bits[order[np.searchsorted(sorted_ids, allowed)]] = True
+            packed = np.packbits(bits, bitorder="little")
+            sel = faiss.IDSelectorBitmap(len(labels), faiss.swig_ptr(packed))
+            sel.packed = packed  # 비트맵 버퍼 수명 = 선택자 수명
+            if not self._positional:
+                index = faiss.downcast_index(self.index.index)
+            else:
+                labels = None
+        else:
+            sel = faiss.IDSelectorBatch(allowed)
+        entry = (allowed, index, sel, labels)
+        with self._sel_lock:
+            self._selectors[key] = entry
+            while len(self._selectors) > _SELECTOR_CACHE:
+                self._selectors.popitem(last=False)
+        return entry
+
+    def _position_map(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """내부 위치 → vid (IDMap.id_map) 와 vid 정렬본/정렬 순서. 추가/삭제 전까지 캐시"""
+        with self._sel_lock:
+            if self._positions is None:
+                if self._positional:
+                    labels = np.arange(self.index.ntotal, dtype="int64")
+                else:
+                    labels = faiss.vector_to_array(self.index.id_map).astype("int64", copy=False)
+                order = np.argsort(labels, kind="stable")
+                self._positions = (labels, labels[order], order)
+            return self._positions
+
+    def _reduce(self, x: np.ndarray) -> np.ndarray:
+        if self.reducer is not None and x.shape[1] == self.reducer.d_in:
+            return self.reducer.apply(x)
+        return x
+
+    def _create_index(self, vecs: np.ndarray):
+        kind = resolve_index_type(self.index_type, len(vecs))
+        params = {**default_params(kind, self.dim, len(vecs)), **self.index_params}
+        index = make_index(kind, self.dim, params)
+        train_index(index, vecs)
+        self.index, self.index_type, self.index_params = index, kind, params
 
     # ---------- Build ----------
+    @_writing
     def add(self, embeddings: np.ndarray, items: List[Dict[str, Any]]):
+        """
+        items 마다 "vid"(없으면 id 해시) 를 부여해 추가. 이미 있는 vid 는 upsert 를 사용
+        reducer 가 있으면 원래 차원 임베딩을 받아 축소 후 저장
+        """
+        embeddings = self._reduce(embeddings)
         assert embeddings.shape[1] == self.dim
-        self.index.add(embeddings.astype("float32"))
-        self.docs.extend(items)
+        assert embeddings.shape[0] == len(items)
+        self._check_writable()
+        if self.index is None:
+            self._create_index(embeddings)
+        if not self.supports_ids:
+            # 구버전(순번) 인덱스: 순서대로 추가
+            base = len(self.docs)
+            self.index.add(embeddings.astype("float32"))
+            self.docs.update((base + i, it) for i, it in enumerate(items))
+            return
+        ids = np.array([it.setdefault("vid", chunk_vid(it["id"])) for it in items], dtype="int64")
+        self.index.add_with_ids(np.ascontiguousarray(embeddings, dtype="float32"), ids)
+        if self.raw is not None:
+            self.raw.add(ids.tolist(), embeddings)
+        self.docs.update(zip(ids.tolist(), items))
+        self._invalidate_filters()
+
+    @_writing
+    def remove_ids(self, ids: Iterable[int]) -> int:
+        """벡터 id 목록 삭제. 실제 삭제된 개수 반환"""
+        if not self.supports_ids:
+            raise ValueError("순번 기반(구버전) 인덱스는 id 삭제를 지원하지 않습니다. --full 로 재생성하세요.")
+        self._check_writable()
+        ids = np.array([i for i in ids if i in self.docs], dtype="int64")
+        if len(ids) == 0:
+            return 0
+        try:
+            n = int(self.index.remove_ids(ids))
+        except RuntimeError:
+            # HNSW 등 삭제 미지원 인덱스: 남길 벡터로 재구성
+            n = self._rebuild_without(set(ids.tolist()))
+        for i in ids.tolist():
+            self.docs.pop(i, None)
+        if self.raw is not None:
+            self.raw.remove(ids.tolist())
+        self._invalidate_filters()
+        return n
+
+    def _check_writable(self):
+        if self.read_only:
+            raise ValueError("mmap 으로 로드한 스토어는 읽기 전용입니다. mmap=False 로 로드하세요.")
 
+    def _rebuild_without(self, drop: set) -> int:
+        keep = np.array([vid for vid in self.docs if vid not in drop], dtype="int64")
+        vecs = self.vectors(keep)  # fp16/sq8 는 원본이 있으면 원본으로 (양자화 오차 누적 방지)
+        index = make_index(self.index_type, self.dim, self.index_params)
+        train_index(index, vecs)
+        if len(keep):
+            index.add_with_ids(vecs, keep)
+        removed = int(self.index.ntotal) - len(keep)
+        self.index = index
+        return removed
+
+    @_writing
+    def retrain(self, index_type: str, index_params: Dict[str, Any] | None = None, chunk: int = 65536):
+        """
+        저장 벡터로 인덱스 종류/파라미터를 바꿔 다시 만듦 (재임베딩 없음. auto 가 규모 임계를 넘었을 때 등)
+        학습은 표본(MAX_TRAIN 개), 옮기기는 chunk 개씩 → 기존 + 새 인덱스 외에 전체 벡터 복사본을 만들지 않음
+        """
+        self._check_writable()
+        if not self.supports_ids:
+            raise ValueError("순번 기반(구버전) 인덱스는 재학습을 지원하지 않습니다. --full 로 재생성하세요.")
+        vids = np.array(list(self.docs), dtype="int64")
+        kind = resolve_index_type(index_type, len(vids))
+        params = {**default_params(kind, self.dim, len(vids)), **(index_params or {})}
+        sample = vids
+        if len(vids) > MAX_TRAIN:
+            sample = np.random.default_rng(0).choice(vids, MAX_TRAIN, replace=False)
+        index = make_index(kind, self.dim, params)
+        train_index(index, self.vectors(sample))
+        for s in range(0, len(vids), chunk):
+            index.add_with_ids(np.ascontiguousarray(self.vectors(vids[s:s + chunk])), vids[s:s + chunk])
+        self.index, self.index_type, self.index_params = index, kind, params
+        self._invalidate_filters()
+
+    @_writing
+    def upsert(self, embeddings: np.ndarray, items: List[Dict[str, Any]]):
+        """같은 vid 가 있으면 교체, 없으면 추가"""
+        for it in items:
+            it.setdefault("vid", chunk_vid(it["id"]))
+        self.remove_ids([it["vid"] for it in items])
+        self.add(embeddings, items)
+
+    @_writing
     def save(self):
-        os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
-        faiss.write_index(self.index, self.index_path)
-        with open(self.docs_path, "w", encoding="utf-8") as f:
-            for it in self.docs:
-                f.write(json.dumps(it, ensure_ascii=False) + "\n")
+        """
+        모든 파일을 tmp 에 끝까지 쓴 뒤 저널 하나로 커밋하고 교체 (save_journal.py)
+        → 중간에 죽어도 load 는 이전 저장 전체 또는 이번 저장 전체만 봄 (새 인덱스 + 옛 메타 같은 조합 없음)
+        """
+        index_dir = os.path.dirname(self.index_path)
+        os.makedirs(index_dir, exist_ok=True)
+        save_journal.recover(index_dir)  # 이전 저장이 커밋 후 중단됐으면 먼저 마무리
+        save_journal.clean_uncommitted(index_dir)
+        if self.index is None:
+            self._create_index(np.zeros((0, self.dim), dtype="float32"))
+        if self.docs_format not in DOCS_FORMATS:
+            raise ValueError(f"지원하지 않는 docs 형식: {self.docs_format} (가능: {', '.join(DOCS_FORMATS)})")
+        token = save_journal.new_token()
+        renames: List[Tuple[str, str]] = []
+
+        def _tmp(final: str) -> str:
+            renames.append((save_journal.tmp_name(final, token), final))
+            return renames[-1][0]
+
+        faiss.write_index(self.index, _tmp(self.index_path))
+        col_path = columnar_path(self.docs_path)
+        mapped = self.docs.base if isinstance(self.docs, DocsOverlay) else None  # 교체 전에 놓아야 할 docs.col 매핑
+        if self.docs_format == "columnar":
+            docs_bytes = write_columnar(_tmp(col_path), self.docs, positional=self._positional)
+            stale = [self.docs_path, offsets_path(self.docs_path)]
+        else:
+            if mapped is not None:  # docs.col 에서 jsonl 로 전환 → 레코드를 메모리로 (docs.col 은 삭제 대상)
+                self.docs = {vid: self.docs[vid] for vid in self.docs}
+            # docs.jsonl 을 쓰면서 줄 시작 오프셋도 기록 → docs.offsets.npy (mmap 로드용)
+            pairs, docs_bytes = [], 0
+            with open(_tmp(self.docs_path), "wb") as f:
+                for vid, it in self.docs.items():
+                    line = (json.dumps(it, ensure_ascii=False) + "\n").encode("utf-8")
+                    f.write(line)
+                    pairs.append((vid, docs_bytes))
+                    docs_bytes += len(line)
+            write_offsets(self.docs_path, np.array(pairs, dtype="int64"),
+                          out=_tmp(offsets_path(self.docs_path)))
+            stale = [col_path]
+        if self.raw is not None:
+            renames.extend(self.raw.write(index_dir, save_journal.tmp_name("", token)))
+        else:
+            stale.extend(raw_vector_paths(index_dir))
+        if self.reducer is not None:
+            self.reducer.write(_tmp(reducer_path(index_dir)))
+        else:
+            stale.append(reducer_path(index_dir))
+        filters = FilterIndex.build(self.docs)
+        filters.save(_tmp(os.path.join(index_dir, FILTERS_FILENAME)))
+        meta = dict(self.meta, dim=self.dim, count=len(self.docs), docs_bytes=docs_bytes,
+                    docs_format=self.docs_format, index={"type": self.index_type, "params": self.index_params})
+        with open(_tmp(meta_path_for(self.index_path)), "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+        # 교체/삭제할 파일의 매핑 해제 (Windows 는 매핑 중인 파일을 rename 으로 덮어쓰거나 지울 수 없음)
+        if mapped is not None:
+            mapped.close()
+        raw_released = self.raw is not None and self.raw.release()
+        # 커밋: 이 시점 이후 중단되면 다음 load/save 가 교체를 마저 적용
+        try:
+            save_journal.commit(index_dir, renames, [p for p in stale if os.path.exists(p)])
+        except BaseException:
+            # 교체 전 실패면 기존 파일 그대로 → 다시 매핑해 변경분과 함께 계속 사용
+            if isinstance(self.docs, DocsOverlay):
+                self.docs.base = ColumnarDocs.open(col_path)
+            if raw_released:
+                self.raw.remap(index_dir)
+            raise
+        if self.raw is not None:
+            self.raw.reopen(index_dir)
+        self._filters, self._filters_on_disk = filters, True
+        if self.docs_format == "columnar" and not self.read_only:
+            # 저장한 파일을 기준으로 다시 엶 → 레코드 dict 는 버리고 변경분만 메모리에
+            self.docs = DocsOverlay(ColumnarDocs.open(col_path))
 
     # ---------- Load ----------
     @classmethod
-    def load(cls, index_path: str, docs_path: str):
-        index = faiss.read_index(index_path)
-        dim = index.d
-        store = cls(dim, index_path, docs_path)
+    def load(cls, index_path: str, docs_path: str, mmap: bool = False):
+        """
+        mmap=True: 벡터를 RAM 에 올리지 않고 파일 매핑(읽기 전용), docs 는 오프셋 사이드카로
+        검색 결과 top-k 만 디코딩 → 콜드 스타트/상주 메모리가 코퍼스 크기에 거의 비례하지 않음
+        docs.col(컬럼형) 은 mmap 여부와 관계없이 매핑 (mmap=False 면 변경분을 얹는 DocsOverlay)
+        커밋 후 중단된 저장이 있으면 먼저 마저 적용하고, 읽는 도중 다른 프로세스의 저장이 끝났으면
+        (메타가 바뀜 — 메타는 항상 마지막에 교체) 다시 읽음
+        mmap(읽기 전용) 로드는 저널을 적용하지 않음 — 쓰는 프로세스의 커밋을 읽는 쪽이 대신 끝내면
+        같은 파일을 두 프로세스가 동시에 교체하게 됨. 적용이 끝나기를 기다렸다가 읽고, 끝나지 않으면 오류
+        """
+        index_dir = os.path.dirname(index_path)
+        meta_path = meta_path_for(index_path)
+        for _ in range(LOAD_RETRIES):
+            if not mmap:
+                save_journal.recover(index_dir)
+            elif save_journal.pending(index_dir):
+                time.sleep(LOAD_WAIT_S)
+                continue
+            before = _stat_sig(meta_path)
+            store = cls._load(index_path, docs_path, mmap)
+            if _stat_sig(meta_path) == before and not save_journal.pending(index_dir):
+                return store
+        if mmap and save_journal.pending(index_dir):
+            raise RuntimeError(f"적용되지 않은 저장 저널이 있어 읽기 전용으로 열 수 없습니다 "
+                               f"(쓰기 모드 로드/빌드가 마저 적용): {index_dir}")
+        raise RuntimeError(f"인덱스 저장이 계속 진행 중이라 일관된 상태로 읽지 못했습니다: {index_dir}")
+
+    @classmethod
+    def _load(cls, index_path: str, docs_path: str, mmap: bool):
+        meta = read_index_meta(index_path)
+        conf = meta.get("index") or {"type": "flat", "params": {}}
+        index = _read_index(index_path, conf["type"], mmap)
+        store = cls(index.d, index_path, docs_path, index_type=conf["type"], index_params=conf.get("params"))
         store.index = index
-        store.docs = []
+        store._positional = isinstance(index, faiss.IndexFlat)
+        apply_search_defaults(index, store.index_params)
+        store.meta = meta
+        store._filters_on_disk = True
+        if store.raw is not None:
+            store.raw = RawVectors.open(os.path.dirname(index_path), store.dim)  # 항상 mmap
+        if (meta.get("reduce") or {}).get("method") == "pca":
+            store.reducer = PcaReducer.load(os.path.dirname(index_path))
+        store.docs_format = meta.get("docs_format", "jsonl")
+        if mmap:
+            store.read_only = True
+        if store.docs_format == "columnar":
+            docs = ColumnarDocs.open(columnar_path(docs_path))
+            store.docs = docs if mmap else DocsOverlay(docs)
+            return store
+        if mmap:
+            store.docs = LazyDocs.open(docs_path, positional=store._positional,
+                                       expected_bytes=meta.get("docs_bytes"))
+            return store
         with open(docs_path, "r", encoding="utf-8") as f:
-            for line in f:
-                store.docs.append(json.loads(line))
+            records = [json.loads(line) for line in f]
+        if store.supports_ids:
+            store.docs = {int(r["vid"]): r for r in records}
+        else:
+            store.docs = dict(enumerate(records))
         return store
 
     # ---------- Search ----------
-    def search(self, query_vec: np.ndarray, top_k: int = 5) -> List[Dict[str, Any]]:
+    def search(self, query_vec: np.ndarray, top_k: int = 5,
+               nprobe: int = 0, ef_search: int = 0, where: Dict[str, Any] | None = None) -> List[Dict[str, Any]]:
+        """nprobe(IVF) / ef_search(HNSW): 0 이면 인덱스에 저장된 기본값, where: 메타데이터 필터 (filters.py)"""
         if query_vec.ndim == 1:
             query_vec = query_vec[None, :]
-        D, I = self.index.search(query_vec.astype("float32"), top_k)
+        return self.search_batch(query_vec[:1], top_k, nprobe=nprobe, ef_search=ef_search, where=where)[0]
+
+    @_reading
+    def search_batch(self, queries: np.ndarray, top_k: int = 5, nprobe: int = 0, ef_search: int = 0,
+                     where: Dict[str, Any] | None = None) -> List[List[Dict[str, Any]]]:
+        """
+        (Q, D) 질의를 index.search 1회로 처리 → 질의별 결과 리스트
+        단일 질의 반복보다 BLAS 행렬곱을 한 번에 쓰므로 질의당 비용이 훨씬 작음
+        PCA 축소 인덱스는 원래 차원 질의를 받아 같은 변환을 적용
+        where 가 있으면 필터 색인으로 허용 vid 를 구해 IDSelector 로 스캔 안에서 거름 (사후 필터처럼 결과가 모자라지 않음)
+        """
+        queries = self._reduce(np.atleast_2d(queries))
+        if self.index is None or self.index.ntotal == 0:
+            return [[] for _ in range(len(queries))]
+        queries = np.ascontiguousarray(queries, dtype="float32")
+        index, sel, labels = self.index, None, None
+        allowed = None
+        if where:
+            allowed, index, sel, labels = self._selector(where)
+        if allowed is not None:
+            if len(allowed) == 0:
+                return [[] for _ in range(len(queries))]
+            if len(allowed) <= FILTER_EXACT_MAX:
+                return self._search_subset(queries, allowed, top_k)
+        params = search_params(index, nprobe, ef_search, sel=sel)
+        rescore = int(self.index_params.get("rescore") or 0) if self.raw is not None else 0
+        k = top_k * rescore if rescore > 1 else top_k
+        D, I = index.search(queries, k, params=params)
+        if labels is not None:  # 내부 인덱스 직접 검색 → 위치를 vid 로
+            I = np.where(I >= 0, labels[np.maximum(I, 0)], -1)
+        if rescore > 1:
+            return [self._rescored(q, i, top_k) for q, i in zip(queries, I)]
+        return [self._hits(d, i) for d, i in zip(D, I)]
+
+    def _search_subset(self, queries: np.ndarray, vids: np.ndarray, top_k: int) -> List[List[Dict[str, Any]]]:
+        """허용 vid 가 적을 때: 그 벡터만 꺼내 (Q, m) 내적 한 번으로 정확 top_k"""
+        scores = queries @ self.vectors(vids).T
+        k = min(top_k, len(vids))
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        out = []
+        for row, cand in zip(scores, top):
+            cand = cand[np.argsort(-row[cand], kind="stable")]
+            out.append(self._hits(row[cand], vids[cand]))
+        return out
+
+    def _rescored(self, query: np.ndarray, ids: np.ndarray, top_k: int) -> List[Dict[str, Any]]:
+        """양자화 점수로 뽑은 후보를 원본 float32 내적으로 다시 정렬 (점수도 정확값)"""
+        ids = ids[ids >= 0]
+        vecs = self.raw.get(ids) if len(ids) else None
+        if vecs is None:
+            vecs = self.vectors(ids)
+        scores = vecs @ query
+        order = np.argsort(-scores, kind="stable")[:top_k]
+        return self._hits(scores[order], ids[order])
+
+    @_reading
+    def vectors(self, vids: Iterable[int]) -> np.ndarray:
+        """저장된 벡터 복원 (재임베딩 없이). 원본 사이드카가 있으면 정확값, 없으면 ivf_pq/fp16/sq8 은 근사값"""
+        vids = [int(v) for v in vids]
+        if not vids:
+            return np.zeros((0, self.dim), dtype="float32")
+        if self.raw is not None:
+            vecs = self.raw.get(vids)
+            if vecs is not None:
+                return vecs
+        return self.index.reconstruct_batch(np.asarray(vids, dtype="int64")).astype("float32", copy=False)
+
+    @_reading
+    def score(self, vids: Iterable[int], query_vec: np.ndarray) -> np.ndarray:
+        """저장 벡터와 질의의 내적 (질의는 search 와 같이 인덱스 차원으로 축소). reconstruct 미지원이면 RuntimeError"""
+        q = self._reduce(np.atleast_2d(np.asarray(query_vec, dtype="float32")))[0]
+        return self.vectors(vids) @ q
+
+    @_reading
+    def hits(self, vids: Iterable[int], scores: Iterable[float]) -> List[Dict[str, Any]]:
+        """vid/점수 목록 → search 와 같은 형식의 결과 (외부 검색기 결과 변환용). 이미 삭제된 vid 는 건너뜀"""
+        return self._hits(np.asarray(list(scores), dtype="float32"), np.asarray(list(vids), dtype="int64"))
+
+    def _hits(self, scores: np.ndarray, ids: np.ndarray) -> List[Dict[str, Any]]:
         out = []
-        for rank, (score, idx) in enumerate(zip(D[0], I[0])):
+        for score, idx in zip(scores, ids):
             if idx == -1:
                 continue
-            doc = self.docs[idx]
+            doc = self.docs.get(int(idx))
+            if doc is None:
+                continue
             out.append({
+                "vid": int(idx),  # 저장 벡터 조회(MMR 등)용
                 "doc_id": doc["id"],
                 "chunk": doc["text"],
                 "score": float(score),  # 내적값(정규화 가정 → 코사인)
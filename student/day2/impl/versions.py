@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""
+버전 인덱스 디렉토리 (blue/green)
+- index_dir/versions/<이름>/ 마다 완결된 인덱스 (단일/샤드 모두), index_dir/CURRENT 에 서비스할 버전 이름
+- 빌드는 versions/_next 에서 진행 (증분이면 현재 버전을 하드링크로 복제 → 저장은 모두 tmp → rename 이라 원본 불변)
+  끝나면 _next → 새 이름으로 rename 후 CURRENT 를 tmp → rename 으로 교체 (읽는 쪽은 항상 완성된 버전만 봄)
+- 서비스 프로세스는 로드한 버전에 .inuse/<pid> 표시 → GC 는 CURRENT·최근 keep 개·사용 중(살아 있는 pid) 버전을 남김
+- 처음 --versioned 로 빌드하면 기존 최상위 인덱스 파일을 첫 버전의 기반으로 복제 (최상위 파일은 그대로 둠)
+"""
+
+from __future__ import annotations
+import os, shutil, threading, time
+from typing import Dict, List, Optional, Tuple
+
+from . import save_journal
+
+CURRENT_FILENAME = "CURRENT"
+VERSIONS_DIRNAME = "versions"
+STAGING_NAME = "_next"
+INUSE_DIRNAME = ".inuse"
+KEEP_VERSIONS = 2
+
+_inuse_lock = threading.Lock()
+_inuse_counts: Dict[str, int] = {}  # 이 프로세스에서 버전 디렉토리별 로드된 스토어 수
+
+
+def versions_dir(index_dir: str) -> str:
+    return os.path.join(index_dir, VERSIONS_DIRNAME)
+
+
+def current_version(index_dir: str) -> Optional[str]:
+    try:
+        with open(os.path.join(index_dir, CURRENT_FILENAME), "r", encoding="utf-8") as f:
+            name = f.read().strip()
+    except OSError:
+        return None
+    return name if name and os.path.isdir(os.path.join(versions_dir(index_dir), name)) else None
+
+
+def resolve_index_dir(index_dir: str) -> Tuple[str, Optional[str]]:
+    """(실제로 읽을 디렉토리, 버전 이름 | None). 버전 인덱스가 아니면 index_dir 그대로"""
+    name = current_version(index_dir)
+    return (os.path.join(versions_dir(index_dir), name), name) if name else (index_dir, None)
+
+
+def list_versions(index_dir: str) -> List[str]:
+    """게시된 버전 이름 (오래된 순)"""
+    try:
+        names = [n for n in os.listdir(versions_dir(index_dir)) if n != STAGING_NAME and not n.startswith(".")]
+    except OSError:
+        return []
+    return sorted(names)
+
+
+def _link_or_copy(src: str, dst: str):
+    try:
+        os.link(src, dst)
+    except OSError:  # 다른 파일시스템 등
+        shutil.copy2(src, dst)
+
+
+def staging_dir(index_dir: str, base: Optional[str]) -> str:
+    """
+    빌드용 versions/_next. base 가 있으면 그 인덱스를 하드링크로 복제 (증분 기준)
+    이전 빌드가 중단돼 _next 가 남아 있으면 그대로 재사용 (.build 저널로 이어서 진행)
+    """
+    stage = os.path.join(versions_dir(index_dir), STAGING_NAME)
+    if os.path.isdir(stage):
+        return stage
+    tmp = stage + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    if base and os.path.isdir(base):
+        save_journal.recover(base)  # 커밋 후 중단된 저장이 있으면 마무리한 상태를 복제
+        shutil.copytree(base, tmp, copy_function=_link_or_copy,
+                        ignore=shutil.ignore_patterns(VERSIONS_DIRNAME, CURRENT_FILENAME, INUSE_DIRNAME,
+                                                      ".build", "*.tmp", "*.tmp-*", save_journal.JOURNAL_FILENAME))
+    else:
+        os.makedirs(tmp)
+    os.replace(tmp, stage)
+    return stage
+
+
+def publish(index_dir: str) -> str:
+    """_next → 새 버전 이름으로 옮기고 CURRENT 를 원자적으로 교체. 새 버전 이름 반환"""
+    base = time.strftime("v%Y%m%d-%H%M%S")
+    name, i = base, 1
+    while os.path.exists(os.path.join(versions_dir(index_dir), name)):
+        name, i = f"{base}-{i}", i + 1
+    os.rename(os.path.join(versions_dir(index_dir), STAGING_NAME), os.path.join(versions_dir(index_dir), name))
+    p = os.path.join(index_dir, CURRENT_FILENAME)
+    with open(p + ".tmp", "w", encoding="utf-8") as f:
+        f.write(name + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(p + ".tmp", p)
+    return name
+
+
+# ---------- 사용 중 표시 / GC ----------
+def _marker(vdir: str) -> str:
+    return os.path.join(vdir, INUSE_DIRNAME, str(os.getpid()))
+
+
+def mark_in_use(vdir: str):
+    with _inuse_lock:
+        n = _inuse_counts.get(vdir, 0)
+        _inuse_counts[vdir] = n + 1
+        if n == 0:
+            os.makedirs(os.path.dirname(_marker(vdir)), exist_ok=True)
+            open(_marker(vdir), "w").close()
+
+
+def release(vdir: str):
+    """스토어가 해제될 때(진행 중이던 질의가 모두 끝나 참조가 사라진 뒤) 호출"""
+    with _inuse_lock:
+        n = _inuse_counts.get(vdir, 0) - 1
+        if n > 0:
+            _inuse_counts[vdir] = n
+            return
+        _inuse_counts.pop(vdir, None)
+        try:
+            os.remove(_marker(vdir))
+        except OSError:
+            pass
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def in_use(vdir: str) -> bool:
+    """살아 있는 프로세스의 표시가 있으면 True (죽은 프로세스의 표시는 지움)"""
+    d = os.path.join(vdir, INUSE_DIRNAME)
+    try:
+        pids = os.listdir(d)
+    except OSError:
+        return False
+    alive = False
+    for p in pids:
+        if p.isdigit() and _pid_alive(int(p)):
+            alive = True
+        else:
+            try:
+                os.remove(os.path.join(d, p))
+            except OSError:
+                pass
+    return alive
+
+
+def gc_versions(index_dir: str, keep: int = KEEP_VERSIONS) -> List[str]:
+    """CURRENT·최근 keep 개·사용 중 버전을 제외하고 삭제. 삭제한 이름 반환"""
+    names = list_versions(index_dir)
+    protect = set(names[-keep:]) if keep > 0 else set()
+    cur = current_version(index_dir)
+    if cur:
+        protect.add(cur)
+    removed = []
+    for name in names:
+        vdir = os.path.join(versions_dir(index_dir), name)
+        if name in protect or in_use(vdir):
+            continue
+        shutil.rmtree(vdir, ignore_errors=True)
+        removed.append(name)
+    return removed
@@ -57,6 +57,14 @@ def _file_info(p: Path) -> str:
         return f"{p} (size: ?)"""
 
 def _read_docs_head(docs_path: Path, n: int = 5):
+    if not docs_path.exists():  # 컬럼형(docs.col) 인덱스
+        from itertools import islice
+        from student.day2.impl.docstore import ColumnarDocs, columnar_path
+        docs = ColumnarDocs.open(columnar_path(str(docs_path)))
+        head = [docs[v] for v in islice(docs, n)]
+        empty_cnt = sum(1 for r in head if not (r.get("text") or "").strip())
+        return len(docs), empty_cnt, [{"i": i, "id": r.get("id"), "path": r["meta"].get("path"),
+                                       "len": len((r.get("text") or "").strip())} for i, r in enumerate(head)]
     lines = docs_path.read_text(encoding="utf-8", errors="ignore").splitlines()
     out = []
     empty_cnt = 0
@@ -110,8 +118,9 @@ def _diagnose(index_dir: str, paths: str, model: str, autobuild: bool, batch_siz
     if not idx_path.exists():
         print("[WARN] faiss.index 없음 →", idx_path)
         ok = False
-    if not docs_path.exists():
-        print("[WARN] docs.jsonl 없음  →", docs_path)
+    from student.day2.impl.docstore import docs_exist, columnar_path
+    if not docs_exist(str(docs_path)):
+        print("[WARN] docs.jsonl/docs.col 없음  →", docs_path)
         ok = False
     if not ok:
         if not autobuild:
@@ -123,14 +132,14 @@ def _diagnose(index_dir: str, paths: str, model: str, autobuild: bool, batch_siz
 
     # 파일 정보
     print("[INFO] 인덱스 파일:", _file_info(idx_path))
-    print("[INFO] 문서 파일  :", _file_info(docs_path))
+    print("[INFO] 문서 파일  :", _file_info(docs_path if docs_path.exists() else Path(columnar_path(str(docs_path)))))
     try:
         total, empty_cnt, head = _read_docs_head(docs_path, n=5)
-        print(f"[OK] docs.jsonl 라인수={total}, (빈 텍스트 {empty_cnt})")
+        print(f"[OK] docs 청크 수={total}, (빈 텍스트 {empty_cnt})")
         for r in head:
             print("   ", r)
     except Exception as e:
-        print("[WARN] docs.jsonl 파싱 이슈:", e)
+        print("[WARN] docs 파싱 이슈:", e)
 
     # FAISS 로드
     try:
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+Day2 테스트 공용 픽스처
+- OpenAI 임베딩 대신 텍스트 해시로 결정되는 가짜 클라이언트 (네트워크/API 키 없이 빌드·질의)
+- 임베딩/PDF 캐시는 테스트마다 임시 디렉토리 (공용 indices/ 를 건드리지 않음)
+"""
+
+from __future__ import annotations
+import os, sys, hashlib
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+FAKE_DIM = 64
+
+
+class _FakeEmbeddingsAPI:
+    def __init__(self, dim: int):
+        self.dim = dim
+        self.calls = 0
+
+    def create(self, model, input, **kw):
+        self.calls += 1
+        items = input if isinstance(input, list) else [input]
+        data = []
+        for i, text in enumerate(items):
+            seed = int(hashlib.md5(text.encode("utf-8")).hexdigest()[:8], 16)
+            v = np.random.default_rng(seed).standard_normal(kw.get("dimensions") or self.dim)
+            data.append(SimpleNamespace(embedding=v.astype("float32").tolist(), index=i))
+        return SimpleNamespace(data=data, usage=None)
+
+
+class FakeOpenAI:
+    def __init__(self, api_key=None, dim: int = FAKE_DIM, **kw):
+        self.embeddings = _FakeEmbeddingsAPI(dim)
+
+
+@pytest.fixture(autouse=True)
+def day2_env(tmp_path, monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setenv("DAY2_EMB_CACHE_DIR", "off")
+    monkeypatch.setenv("DAY2_PDF_CACHE_DIR", str(tmp_path / "pdf_cache"))
+    import student.day2.impl.embeddings as E
+    monkeypatch.setattr(E, "OpenAI", FakeOpenAI)
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    """주제가 다른 짧은 md 문서 몇 개 (문서당 청크 여러 개)"""
+    d = tmp_path / "corpus"
+    d.mkdir()
+    topics = ["전기차 충전 인프라", "의료기기 AI 규제", "배터리 재활용", "자율주행 보험", "수소 연료전지"]
+    for i, t in enumerate(topics):
+        body = "\n\n".join(f"{t} 관련 문단 {j}: " + " ".join(f"{t}-{j}-{k}" for k in range(80)) for j in range(6))
+        (d / f"doc_{i}.md").write_text(f"# {t}\n\n{body}\n", encoding="utf-8")
+    return d
+
+
+def _synthetic(n: int, dim: int = 32, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    x = rng.standard_normal((n, dim)).astype("float32")
+    x /= np.linalg.norm(x, axis=1, keepdims=True)
+    items = [{"id": f"doc_{i % 10}.md::chunk_{i:05d}", "text": f"chunk {i}",
+              "meta": {"path": f"doc_{i % 10}.md", "chunk": i}} for i in range(n)]
+    return x, items
+
+
+@pytest.fixture
+def synthetic():
+    """(n, dim, seed) → 정규화 벡터 + FaissStore.add 용 항목 (문서 10개로 나눈 path 메타)"""
+    return _synthetic
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+import threading, time
+
+from student.day2.impl import batcher as batcher_mod
+from student.day2.impl.batcher import SearchBatcher
+from student.day2.impl.store import FaissStore
+
+
+def _store(synthetic, n=300):
+    x, items = synthetic(n)
+    store = FaissStore(x.shape[1], "", "")
+    store.add(x, items)
+    return store, x, items
+
+
+def test_submit_after_close_searches_directly(synthetic):
+    store, x, items = _store(synthetic)
+    b = SearchBatcher(store)
+    assert b.search(x[3], top_k=1)[0]["vid"] == items[3]["vid"]
+    b.close()
+    res = b.submit(x[5], top_k=2).result(timeout=2)
+    assert res[0]["vid"] == items[5]["vid"] and len(res) == 2
+    assert b.search(x[7], top_k=1, where={"path": ["doc_7.md"]})[0]["vid"] == items[7]["vid"]
+    assert b.snapshot()["direct_after_close"] == 2
+    b.close()  # 두 번 닫아도 안전
+
+
+def test_close_while_submitting_never_hangs(synthetic):
+    store, x, items = _store(synthetic)
+    b = SearchBatcher(store, max_wait_ms=1.0)
+    errors, results = [], []
+
+    def _worker(i):
+        for j in range(50):
+            q = (i * 50 + j) % len(x)
+            try:
+                results.append(b.submit(x[q], top_k=1).result(timeout=5)[0]["vid"] == items[q]["vid"])
+            except Exception as e:  # 닫히는 순간 큐에 있던 요청도 실패 없이 처리돼야 함
+                errors.append(e)
+
+    threads = [threading.Thread(target=_worker, args=(i,)) for i in range(4)]
+    for t in threads:
+        t.start()
+    b.close()
+    for t in threads:
+        t.join(timeout=30)
+    assert not any(t.is_alive() for t in threads)
+    assert not errors
+    assert all(results) and len(results) == 200
+
+
+class _SlowFirstStore:
+    """첫 search_batch 만 gate 가 열릴 때까지 막힘 (작업 스레드가 앞 배치를 오래 처리하는 상황)"""
+
+    def __init__(self, store):
+        self.store, self.gate, self.calls = store, threading.Event(), 0
+
+    def search_batch(self, *a, **kw):
+        self.calls += 1
+        if self.calls == 1:
+            self.gate.wait(10)
+        return self.store.search_batch(*a, **kw)
+
+
+def test_close_serves_queued_queries_when_worker_is_busy(synthetic, monkeypatch):
+    monkeypatch.setattr(batcher_mod, "CLOSE_JOIN_S", 0.1)
+    store, x, items = _store(synthetic)
+    slow = _SlowFirstStore(store)
+    b = SearchBatcher(slow, max_batch=1, max_wait_ms=0.0)
+    first = b.submit(x[0], top_k=1)
+    while slow.calls == 0:
+        time.sleep(0.001)
+    queued = [b.submit(x[i], top_k=1) for i in range(1, 6)]
+    b.close()  # 작업 스레드는 첫 배치에 묶여 있음 → 큐에 있던 5개는 close 가 직접 처리
+    assert [f.result(timeout=1)[0]["vid"] for f in queued] == [items[i]["vid"] for i in range(1, 6)]
+    slow.gate.set()
+    assert first.result(timeout=5)[0]["vid"] == items[0]["vid"]
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+import os, shutil
+
+import pytest
+
+from student.day2.impl import index_factory
+from student.day2.impl.build_index import build_index
+from student.day2.impl.registry import index_paths
+from student.day2.impl.store import FaissStore
+
+
+def _load(index_dir):
+    return FaissStore.load(*index_paths(str(index_dir)))
+
+
+def test_incremental_auto_switches_to_ivf_when_corpus_grows(tmp_path, corpus, monkeypatch):
+    monkeypatch.setattr(index_factory, "AUTO_FLAT_MAX", 20)
+    src = tmp_path / "src"
+    src.mkdir()
+    for name in ("doc_0.md", "doc_1.md"):
+        shutil.copy(corpus / name, src / name)
+    idx = tmp_path / "idx"
+    build_index([str(src)], str(idx), workers=1, dedup=0)
+    first = _load(idx)
+    assert first.index_type == "flat" and len(first) < 20
+
+    for name in ("doc_2.md", "doc_3.md", "doc_4.md"):
+        shutil.copy(corpus / name, src / name)
+    build_index([str(src)], str(idx), workers=1, dedup=0)
+    store = _load(idx)
+    assert len(store) >= 20
+    assert store.index_type == "ivf_flat"
+    # 재학습 후에도 저장 벡터로 자기 자신을 찾음
+    vid = next(iter(store.docs))
+    assert store.search(store.vectors([vid])[0], top_k=1, nprobe=64)[0]["vid"] == vid
+
+
+def test_fresh_trained_build_fits_on_bounded_sample(tmp_path, corpus, monkeypatch):
+    from student.day2.impl import build_index as B
+    monkeypatch.setattr(B, "TRAIN_CHUNKS", 8)
+    fitted = []
+    orig_fit = B.PcaReducer.fit.__func__
+
+    def _fit(cls, vecs, dim, **kw):
+        fitted.append(len(vecs))
+        return orig_fit(cls, vecs, dim, **kw)
+
+    monkeypatch.setattr(B.PcaReducer, "fit", classmethod(_fit))
+    idx = tmp_path / "idx"
+    build_index([str(corpus)], str(idx), workers=1, dedup=0, batch_chunks=4,
+                index_type="ivf_flat", dimensions=8, reduce="pca")
+    store = _load(idx)
+    assert fitted and fitted[0] < 8 + 4  # 표본만 모으고 나머지 배치는 바로 삽입
+    assert len(store) > 20
+    assert store.index_type == "ivf_flat" and store.reducer is not None
+    vid = next(iter(store.docs))
+    assert store.search(store.vectors([vid])[0], top_k=1, nprobe=64)[0]["vid"] == vid
+
+
+def test_dedup_is_opt_in_and_incremental_seeds_from_index(tmp_path, corpus):
+    src = tmp_path / "src"
+    src.mkdir()
+    shutil.copy(corpus / "doc_0.md", src / "doc_0.md")
+    idx = tmp_path / "idx"
+    build_index([str(src)], str(idx), workers=1)  # 기본은 중복 제거 끔
+    n0 = len(_load(idx))
+
+    shutil.copy(corpus / "doc_0.md", src / "copy_of_0.md")
+    build_index([str(src)], str(idx), workers=1)
+    assert len(_load(idx)) == 2 * n0
+
+    shutil.copy(corpus / "doc_0.md", src / "copy_again.md")
+    build_index([str(src)], str(idx), workers=1, dedup=0.9)
+    store = _load(idx)
+    assert len(store) == 2 * n0  # 새 파일 청크는 이미 인덱스에 있는 청크와 같아서 모두 버림
+    aliases = [a for vid in store.docs for a in store.docs[vid]["meta"].get("aliases", [])]
+    assert len(aliases) == n0 and all(a["path"].endswith("copy_again.md") for a in aliases)
+
+
+def test_sharded_pca_shares_one_reducer(tmp_path, corpus):
+    from student.day2.impl.dimreduce import PcaReducer
+    from student.day2.impl.sharded import ShardedStore, shard_dirs
+    src = tmp_path / "src"
+    src.mkdir()
+    for name in ("doc_0.md", "doc_1.md", "doc_2.md"):
+        shutil.copy(corpus / name, src / name)
+    idx = tmp_path / "idx"
+    build_index([str(src)], str(idx), workers=1, shards=4, dimensions=8, reduce="pca")  # 빈 샤드도 생김
+    shared = PcaReducer.load(str(idx))
+    assert all(shared.same_as(PcaReducer.load(d)) for d in shard_dirs(str(idx)))
+
+    shutil.copy(corpus / "doc_3.md", src / "doc_3.md")
+    build_index([str(src)], str(idx), workers=1, shards=4, dimensions=8, reduce="pca")
+    assert shared.same_as(PcaReducer.load(str(idx)))  # 증분은 다시 학습하지 않음
+    store = ShardedStore.load(str(idx))
+    assert all(shared.same_as(s.reducer) for s in store.shards)
+    vid = next(iter(store.docs))
+    assert store.search(store.vectors([vid])[0], top_k=1)[0]["vid"] == vid
+    store.close()
+
+
+def test_empty_shard_matches_sibling_dim(tmp_path, corpus):
+    from student.day2.impl.sharded import ShardedStore, shard_index_dims
+    src = tmp_path / "src"
+    src.mkdir()
+    shutil.copy(corpus / "doc_0.md", src / "doc_0.md")
+    idx = tmp_path / "idx"
+    build_index([str(src)], str(idx), workers=1, shards=3)  # 파일 하나 → 샤드 둘은 빈 샤드
+    assert set(shard_index_dims(str(idx), 3).values()) == {64}  # 모델 표(1536)가 아닌 실제 임베딩 차원
+    store = ShardedStore.load(str(idx))
+    assert store.search(store.vectors([next(iter(store.docs))])[0], top_k=1)
+    store.close()
+
+
+def test_sharded_load_rejects_mismatched_dims(tmp_path, synthetic):
+    from student.day2.impl.sharded import ShardedStore, shard_dir, write_shards
+    for i, dim in enumerate((8, 16)):
+        x, items = synthetic(20, dim=dim, seed=i)
+        d = shard_dir(str(tmp_path), i)
+        os.makedirs(d)
+        store = FaissStore(dim, *index_paths(d))
+        store.add(x, items)
+        store.save()
+    write_shards(str(tmp_path), 2)
+    with pytest.raises(ValueError, match="차원"):
+        ShardedStore.load(str(tmp_path))
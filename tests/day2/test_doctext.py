@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+from student.day2.impl.doctext import DocTextStore, expand_parents
+
+
+def test_expand_parents_reads_each_document_once(tmp_path):
+    texts = DocTextStore(str(tmp_path))
+    texts.put("a.md", "가" * 100 + "나" * 100 + "다" * 100)
+    hits = [{"doc_id": "a.md::span_0000100", "score": 0.9, "chunk": "나" * 100,
+             "meta": {"path": "a.md", "start": 100, "end": 200}}]
+    calls = []
+    orig_get = texts.get
+
+    def _get_once(path):  # 두 번째 조회 사이에 원문이 삭제된 경우
+        calls.append(path)
+        return orig_get(path) if len(calls) == 1 else None
+
+    texts.get = _get_once
+    out = expand_parents(hits, texts, window=10)
+    assert calls == ["a.md"]
+    assert out[0]["chunk"] == "가" * 10 + "나" * 100 + "다" * 10 and out[0]["meta"]["span"] == [90, 210]
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+import multiprocessing as mp
+
+import numpy as np
+
+from student.day2.impl.emb_cache import EmbeddingCache, text_key
+
+DIM = 8
+
+
+def _vec(text):
+    seed = int.from_bytes(text_key(text)[:4], "little")
+    return np.random.default_rng(seed).standard_normal(DIM).astype("float32")
+
+
+def test_two_instances_on_one_dir_do_not_overwrite_each_other(tmp_path):
+    a = EmbeddingCache(str(tmp_path), "m", DIM)
+    b = EmbeddingCache(str(tmp_path), "m", DIM)  # a 가 쓰기 전에 열림 → 빈 행 목록이 같음
+    ka, kb = text_key("query A"), text_key("chunk B")
+    a.put_many([ka], _vec("query A")[None])
+    b.put_many([kb], _vec("chunk B")[None])
+
+    for c in (a, b, EmbeddingCache(str(tmp_path), "m", DIM)):
+        got = c.get_many([ka, kb])
+        assert np.array_equal(got[ka], _vec("query A"))
+        assert np.array_equal(got[kb], _vec("chunk B"))
+
+
+def test_row_reused_by_other_instance_reads_as_miss(tmp_path):
+    a = EmbeddingCache(str(tmp_path), "m", DIM)
+    ka, kb = text_key("query A"), text_key("chunk B")
+    a.put_many([ka], _vec("query A")[None])
+    row = a._rows[ka]
+    # 다른 프로세스가 축출 후 같은 행에 다른 키를 쓴 상황 (a 의 세대는 그대로라 행 사전은 옛 것)
+    a._keys[row] = np.frombuffer(kb, dtype="uint8")
+    a._vecs[row] = _vec("chunk B")
+    assert a.get_many([ka]) == {}
+    assert a.stats["misses"] == 1
+
+
+def _worker(cache_dir, prefix, n):
+    c = EmbeddingCache(cache_dir, "m", DIM, max_mb=0)
+    for i in range(0, n, 10):
+        texts = [f"{prefix}-{j}" for j in range(i, i + 10)]
+        c.put_many([text_key(t) for t in texts], np.stack([_vec(t) for t in texts]))
+    c.flush()
+
+
+def test_concurrent_processes_share_one_dir(tmp_path):
+    ctx = mp.get_context("fork")
+    procs = [ctx.Process(target=_worker, args=(str(tmp_path), p, 600)) for p in ("x", "y")]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join(60)
+        assert p.exitcode == 0
+
+    c = EmbeddingCache(str(tmp_path), "m", DIM, max_mb=0)
+    texts = [f"{p}-{j}" for p in ("x", "y") for j in range(600)]
+    got = c.get_many([text_key(t) for t in texts])
+    # 합계 1200 > 용량 1024 → 일부는 축출되지만 남은 행은 모두 자기 벡터
+    assert 900 <= len(c) <= 1024 and len(got) == len(c)
+    for t in texts:
+        k = text_key(t)
+        if k in got:
+            assert np.array_equal(got[k], _vec(t))
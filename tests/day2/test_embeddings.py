@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+import random, threading, time
+
+import numpy as np
+
+from student.day2.impl.embeddings import Embeddings, estimate_tokens
+
+
+def _single(emb, text):
+    return emb._embed_batch([text])[0]
+
+
+def test_pack_batches_respects_count_and_token_limits():
+    emb = Embeddings(batch_size=3, max_batch_tokens=50)
+    texts = ["a" * 4] * 4 + ["가" * 45, "b", "가" * 80, "c"]  # 45+ 토큰 청크, 한도보다 큰 청크
+    batches = emb.pack_batches(texts)
+    assert [i for b in batches for i in b] == list(range(len(texts)))  # 순서 그대로, 빠짐/중복 없음
+    for b in batches:
+        assert len(b) <= 3
+        assert len(b) == 1 or sum(estimate_tokens(texts[i]) for i in b) <= 50  # 큰 청크는 혼자
+    assert [6] in batches
+
+
+def test_encode_keeps_input_order_with_packing_and_concurrency():
+    texts = [f"청크 {i} " + "내용 " * random.Random(i).randint(1, 60) for i in range(60)]
+    emb = Embeddings(batch_size=7, max_batch_tokens=120, concurrency=4)
+    want = np.stack([_single(emb, t) for t in texts])
+
+    api = emb.client.embeddings
+    real_create = api.create
+    lock, active = threading.Lock(), {"max": 0, "now": 0}
+
+    def _slow_shuffled(model, input, **kw):
+        with lock:
+            active["now"] += 1
+            active["max"] = max(active["max"], active["now"])
+        time.sleep(random.Random(len(input) + len(input[0])).uniform(0, 0.02))  # 배치마다 끝나는 순서가 다름
+        resp = real_create(model, input, **kw)
+        resp.data.reverse()  # 응답 data 순서가 입력과 달라도 index 로 복원
+        with lock:
+            active["now"] -= 1
+        return resp
+
+    api.create = _slow_shuffled
+    got = emb.encode(texts)
+    assert len(emb.pack_batches(texts)) > 4 and active["max"] > 1
+    assert np.allclose(got, want, atol=1e-6)
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+
+from student.day2.impl.filters import FilterIndex
+from student.day2.impl.store import FILTER_EXACT_MAX, FaissStore
+
+PATHS = [
+    "data/raw/20251110_a.pdf",
+    "data/raw/20251112_b.md",
+    "data/processed/2025-11-12_c.md",
+    "data/processed/notes.txt",  # 날짜 없음
+]
+
+
+def _docs():
+    return {vid: {"id": f"c{vid}", "text": "", "meta": {"path": PATHS[vid % len(PATHS)]}} for vid in range(40)}
+
+
+def _expected(pred):
+    return np.array([vid for vid, d in _docs().items() if pred(d["meta"]["path"])], dtype="int64")
+
+
+def test_filter_index_select_and_intersect(tmp_path):
+    fi = FilterIndex.build(_docs())
+    assert fi.select(None) is None and fi.select({}) is None
+    assert np.array_equal(fi.select({"path_prefix": "data/raw/"}), _expected(lambda p: p.startswith("data/raw/")))
+    assert np.array_equal(fi.select({"path": [PATHS[1], PATHS[3]]}), _expected(lambda p: p in PATHS[1::2]))
+    assert np.array_equal(fi.select({"doc_type": [".MD"]}), _expected(lambda p: p.endswith(".md")))
+    assert np.array_equal(fi.select({"date_from": "2025-11-11", "date_to": 20251112}),
+                          _expected(lambda p: p in PATHS[1:3]))  # 날짜 없는 문서는 기간 필터에서 빠짐
+    # 여러 조건은 교집합, 빈 경로 목록은 허용 문서 없음
+    assert np.array_equal(fi.select({"path_prefix": "data/processed/", "doc_type": "md"}),
+                          _expected(lambda p: p == PATHS[2]))
+    assert len(fi.select({"path": []})) == 0
+    with pytest.raises(ValueError):
+        fi.select({"author": "x"})
+
+    fi.save(str(tmp_path / "filters.npz"))
+    again = FilterIndex.load(str(tmp_path / "filters.npz"))
+    assert np.array_equal(again.select({"doc_type": "pdf"}), fi.select({"doc_type": "pdf"}))
+
+
+@pytest.mark.parametrize("n,n_paths,exact", [(2000, 10, True), (6000, 2, False)])
+def test_filtered_search_exact_subset_and_selector(tmp_path, n, n_paths, exact, monkeypatch):
+    rng = np.random.default_rng(0)
+    x = rng.standard_normal((n, 16)).astype("float32")
+    x /= np.linalg.norm(x, axis=1, keepdims=True)
+    items = [{"id": f"c{i}", "text": "", "meta": {"path": f"doc_{i % n_paths}.md"}} for i in range(n)]
+    store = FaissStore(16, str(tmp_path / "faiss.index"), str(tmp_path / "docs.jsonl"))
+    store.add(x, items)
+    calls = []
+    real = FaissStore._search_subset
+    monkeypatch.setattr(FaissStore, "_search_subset", lambda self, *a: calls.append(len(a[1])) or real(self, *a))
+
+    where = {"path": ["doc_1.md"]}
+    allowed = np.flatnonzero([it["meta"]["path"] == "doc_1.md" for it in items])
+    assert (len(allowed) <= FILTER_EXACT_MAX) == exact
+    q = x[:3] + 0.1 * rng.standard_normal((3, 16)).astype("float32")
+    for qi, hits in zip(q, store.search_batch(q, top_k=5, where=where)):
+        want = allowed[np.argsort(-(x[allowed] @ qi), kind="stable")[:5]]
+        assert [h["doc_id"] for h in hits] == [f"c{i}" for i in want]
+    # 허용 vid 가 FILTER_EXACT_MAX 이하면 그 벡터만 정확 검색, 넘으면 IDSelector 스캔
+    assert calls == ([len(allowed)] if exact else [])
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+
+from student.day2.impl.lexical import LexicalIndex, lexical_path, rrf_fuse, tokenize
+
+
+def test_tokenize_hangul_bigrams_and_identifiers():
+    assert tokenize("전기차 충전") == ["전기", "기차", "충전"]
+    assert tokenize("차") == ["차"]  # 1음절은 unigram
+    # 식별자는 통째 + 조각, 영문은 소문자
+    assert tokenize("EV-2025 규정") == ["ev-2025", "ev", "2025", "규정"]
+    assert tokenize("") == [] and tokenize(None) == []
+
+
+DOCS = [
+    (10, "배터리 재활용 공정"),
+    (20, "배터리 재활용 재활용 재활용 비용"),
+    (30, "수소 연료전지 충전소"),
+    (40, "전기차 배터리"),
+]
+
+
+def test_bm25_ranks_term_frequency_and_rare_terms(tmp_path):
+    lex = LexicalIndex.build(DOCS)
+    hits = lex.search("재활용", top_k=5)
+    assert [vid for vid, _ in hits] == [20, 10]  # tf 가 높은 문서가 위, 일치 없는 문서는 제외
+    assert hits[0][1] > hits[1][1] > 0
+
+    # 한 문서에만 있는 용어(연료전지)가 여러 문서에 있는 용어(배터리)보다 점수 기여가 큼
+    assert lex.search("배터리 연료전지", top_k=1)[0][0] == 30
+    assert [v for v, _ in lex.search("배터리", top_k=5, allow=np.array([40]))] == [40]
+    assert lex.search("없는단어", top_k=5) == []
+
+    lex.save(lexical_path(str(tmp_path)))
+    again = LexicalIndex.load(lexical_path(str(tmp_path)))
+    assert again.search("재활용", top_k=5) == hits
+
+
+def test_rrf_fuse_order():
+    fused = rrf_fuse([["a", "b", "c"], ["c", "a"]], k=60)
+    assert fused["a"] == pytest.approx(1 / 61 + 1 / 62)
+    assert fused["c"] == pytest.approx(1 / 63 + 1 / 61)
+    assert fused["b"] == pytest.approx(1 / 62)
+    # 두 목록 모두 상위인 a > 한쪽 1위인 c > 한쪽에만 있는 b
+    assert sorted(fused, key=fused.get, reverse=True) == ["a", "c", "b"]
+    assert rrf_fuse([]) == {}
@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+from student.day2.impl import pipeline
+from student.day2.impl.build_index import build_index
+from student.day2.impl.manifest import load_manifest
+from student.day2.impl.pdf_cache import default_pdf_cache
+from student.day2.impl.ingest import file_sha256
+
+
+def test_failed_extraction_is_not_cached_and_retried(tmp_path, monkeypatch):
+    src = tmp_path / "src"
+    src.mkdir()
+    pdf = src / "report.pdf"
+    pdf.write_bytes(b"%PDF-1.4 not really a pdf")
+    (src / "note.md").write_text("# 메모\n\n" + "충전 인프라 현황 " * 200, encoding="utf-8")
+
+    def _broken(path, start=0, end=None):
+        raise OSError("일시적 읽기 실패")
+
+    monkeypatch.setattr(pipeline, "extract_pdf_pages", _broken)
+    idx = tmp_path / "idx"
+    build_index([str(src)], str(idx), workers=1, dedup=0)
+    files = load_manifest(str(idx))["files"]
+    assert str(pdf) not in files and str(src / "note.md") in files
+    assert not default_pdf_cache().has(file_sha256(str(pdf)))
+
+    monkeypatch.setattr(pipeline, "extract_pdf_pages", lambda path, start=0, end=None: ["보조금 정책 " * 300])
+    build_index([str(src)], str(idx), workers=1, dedup=0)
+    files = load_manifest(str(idx))["files"]
+    assert files[str(pdf)]["chunk_ids"]
+    assert default_pdf_cache().has(file_sha256(str(pdf)))
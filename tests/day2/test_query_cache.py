@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+import shutil
+
+import numpy as np
+import pytest
+
+from student.common.schemas import Day2Plan
+from student.day2.impl import query_cache as qc_mod
+from student.day2.impl.build_index import build_index
+from student.day2.impl.query_cache import QueryCache
+from student.day2.impl.rag import Day2Agent
+from student.day2.impl.registry import REGISTRY
+
+V = {"contexts": [{"doc_id": "a"}], "gating": {"status": "enough"}}
+
+
+def _unit(*xs):
+    v = np.array(xs, dtype="float32")
+    return v / np.linalg.norm(v)
+
+
+def test_exact_hit_normalizes_query_and_separates_plans():
+    cache = QueryCache(capacity=4)
+    cache.put("k", "전기차  충전소?", _unit(1, 0), V)
+    hit = cache.get_exact("k", " 전기차 충전소")
+    assert hit == V
+    hit["contexts"].clear()  # 꺼낸 값을 고쳐도 캐시는 그대로
+    assert cache.get_exact("k", "전기차 충전소") == V
+    assert cache.get_exact("other-plan", "전기차 충전소") is None
+    assert cache.stats["exact_hits"] == 2
+
+
+def test_semantic_hit_at_threshold_and_alias():
+    cache = QueryCache(capacity=4)
+    cache.put("k", "q1", np.array([1, 0], dtype="float32"), V)
+    qv = np.array([0.6, 0.8], dtype="float32")
+    sim = float(np.float32(0.6))
+    assert cache.get_similar("k", qv, float(np.nextafter(np.float32(sim), np.float32(1))))[0] is None
+    value, got = cache.get_similar("k", qv, sim, query="q2")  # 코사인 == threshold 면 적중
+    assert value == V and got == sim
+    assert cache.get_exact("k", "q2") == V  # 적중한 문장은 완전 일치로 등록
+    assert cache.get_similar("k2", qv, 0.0)[0] is None  # plan_key 가 다르면 후보 아님
+    assert cache.stats["semantic_hits"] == 1
+
+
+def test_ttl_expiry(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(qc_mod.time, "time", lambda: now[0])
+    cache = QueryCache(capacity=4, ttl_s=10)
+    cache.put("k", "q", _unit(1, 0), V)
+    now[0] += 10
+    assert cache.get_exact("k", "q") == V  # 경계까지는 유효
+    now[0] += 0.5
+    assert cache.get_exact("k", "q") is None
+    assert cache.get_similar("k", _unit(1, 0), 0.5)[0] is None
+    assert cache.stats["expired"] == 1 and len(cache) == 0
+
+
+def test_version_swap_invalidates():
+    cache = QueryCache(capacity=4)
+    cache.check_version("v1")
+    cache.put("k", "q", _unit(1, 0), V)
+    cache.check_version("v1")
+    assert cache.get_exact("k", "q") == V
+    cache.check_version("v2")
+    assert cache.get_exact("k", "q") is None and len(cache) == 0
+    assert cache.get_similar("k", _unit(1, 0), 0.5)[0] is None
+    assert cache.stats["invalidations"] == 1
+
+
+@pytest.fixture
+def _fresh_registry():
+    REGISTRY.clear()
+    yield
+    REGISTRY.clear()
+
+
+def test_agent_cache_cleared_when_index_rebuilt(tmp_path, corpus, _fresh_registry):
+    src, idx = tmp_path / "src", tmp_path / "idx"
+    src.mkdir()
+    shutil.copy(corpus / "doc_0.md", src / "doc_0.md")
+    build_index([str(src)], str(idx), workers=1)
+    plan = Day2Plan(index_dir=str(idx), query_cache=True)
+    agent = Day2Agent()
+    assert agent.handle("전기차 충전 인프라", plan)["cache"] == "miss"
+    assert agent.handle("전기차 충전 인프라?", plan)["cache"] == "exact"
+
+    shutil.copy(corpus / "doc_2.md", src / "doc_2.md")
+    build_index([str(src)], str(idx), workers=1)  # 인덱스 파일이 바뀜 → 새 버전
+    out = agent.handle("전기차 충전 인프라", plan)
+    assert out["cache"] == "miss"
+    assert agent.handle("전기차 충전 인프라", plan)["contexts"] == out["contexts"]
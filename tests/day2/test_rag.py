@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+
+from student.common.schemas import Day2Plan
+from student.day2.impl.build_index import build_index
+from student.day2.impl.rag import Day2Agent
+from student.day2.impl.registry import REGISTRY, index_paths
+from student.day2.impl.store import FaissStore
+
+
+@pytest.fixture(autouse=True)
+def _fresh_registry():
+    REGISTRY.clear()
+    yield
+    REGISTRY.clear()
+
+
+@pytest.mark.parametrize("shards", [0, 2])
+def test_hybrid_on_pca_index(tmp_path, corpus, shards):
+    idx = tmp_path / "idx"
+    build_index([str(corpus)], str(idx), workers=1, dimensions=8, reduce="pca", shards=shards)
+    # dense 후보를 좁혀 BM25 전용 후보가 생기게 함 → 저장 벡터(8D)와 질의(64D) 점수 계산 경로
+    plan = Day2Plan(index_dir=str(idx), retrieval_mode="hybrid", hybrid_pool=2, top_k=3, mmr=True)
+    out = Day2Agent().handle("배터리 재활용-3-17 배터리 재활용-3-18", plan)
+    assert out["contexts"]
+    assert any(c["bm25"] > 0 for c in out["contexts"])
+    assert all(-1.0 - 1e-4 <= c["score"] <= 1.0 + 1e-4 for c in out["contexts"])
+
+
+def test_hybrid_mmr_keeps_fused_order_as_relevance(tmp_path, corpus):
+    idx = tmp_path / "idx"
+    build_index([str(corpus)], str(idx), workers=1)
+    fused = Day2Agent().handle("배터리 재활용", Day2Plan(index_dir=str(idx), retrieval_mode="hybrid", mmr=False, top_k=3))
+    mmr = Day2Agent().handle("배터리 재활용", Day2Plan(index_dir=str(idx), retrieval_mode="hybrid", mmr=True, top_k=3))
+    assert mmr["contexts"][0]["doc_id"] == fused["contexts"][0]["doc_id"]
+    # 코사인만 보면 BM25 에 안 걸린 청크가 올라옴 → RRF 기준이면 어휘 일치 청크만 남음
+    assert all(c["bm25"] > 0 and c["meta"]["path"].endswith("doc_2.md") for c in mmr["contexts"])
+
+
+def test_mmr_select_trades_relevance_for_diversity():
+    from student.day2.impl.rag import mmr_select
+    vecs = np.array([[1, 0], [1, 0], [0, 1]], dtype="float32")  # 0, 1 은 같은 벡터
+    rel = np.array([1.0, 0.9, 0.5], dtype="float32")
+    assert mmr_select(rel, vecs, 3, lam=1.0) == [0, 1, 2]  # λ=1: 관련성 순
+    assert mmr_select(rel, vecs, 2, lam=0.5) == [0, 2]     # 중복은 건너뜀
+    assert mmr_select(rel, vecs, 5, lam=0.5) == [0, 2, 1]  # k 가 후보보다 크면 후보 수만큼
+    assert mmr_select(rel[:0], vecs[:0], 3, lam=0.5) == []
+
+
+def test_route_docs_narrows_to_nearest_document(tmp_path, corpus):
+    idx = tmp_path / "idx"
+    build_index([str(corpus)], str(idx), workers=1)
+    store = FaissStore.load(*index_paths(str(idx)))
+    chunk = next(d for d in store.docs.values() if d["meta"]["path"].endswith("doc_2.md"))
+    # 가짜 임베딩은 텍스트 해시라 청크 원문을 질의로 써야 그 문서 중심이 가장 가까움
+    out = Day2Agent().handle(chunk["text"], Day2Plan(index_dir=str(idx), route_docs=1, top_k=5))
+    assert out["contexts"][0]["doc_id"] == chunk["id"]
+    assert {c["meta"]["path"] for c in out["contexts"]} == {str(corpus / "doc_2.md")}
+
+
+def test_route_docs_intersects_caller_path_filter(tmp_path, corpus):
+    idx = tmp_path / "idx"
+    build_index([str(corpus)], str(idx), workers=1)
+    keep = [str(corpus / "doc_0.md"), str(corpus / "doc_4.md")]
+    plan = Day2Plan(index_dir=str(idx), route_docs=2, top_k=8, filters={"path": keep})
+    out = Day2Agent().handle("배터리 재활용", plan)  # 가장 가까운 doc_2 는 필터 밖
+    paths = {c["meta"]["path"] for c in out["contexts"]}
+    assert paths and paths <= set(keep)
+
+    plan = Day2Plan(index_dir=str(idx), route_docs=1, top_k=5, filters={"path": keep[:1], "doc_type": "pdf"})
+    assert Day2Agent().handle("배터리 재활용", plan)["contexts"] == []
+
+
+def test_doc_router_masks_shared_across_threads():
+    import threading
+    from student.day2.impl.doc_router import DocRouter
+    rng = np.random.default_rng(0)
+    paths = [f"/d/doc_{i}.md" for i in range(64)]
+    router = DocRouter(paths, rng.standard_normal((64, 8)).astype("float32"), np.arange(65))
+    errors = []
+
+    def _worker(k):
+        try:
+            for j in range(200):
+                p = paths[(k * 7 + j) % len(paths)]  # 캐시(32)보다 많은 where → 계속 추가/축출
+                assert router.route(rng.standard_normal(8), 3, where={"path": [p]}) == [p]
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=_worker, args=(k,)) for k in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors
+    assert len(router._masks) <= 32
+
+
+def test_hybrid_search_consistent_under_concurrent_writes(tmp_path, synthetic):
+    import sys, threading
+    from student.day2.impl.rag import _hybrid_search
+    x, items = synthetic(400, dim=16)
+    store = FaissStore(16, *index_paths(str(tmp_path)))
+    store.add(x, items)
+    id_of = {it["vid"]: it["id"] for it in items}
+    lexical = [(items[i]["vid"], 10.0 - i * 0.01) for i in range(0, 200, 2)]  # 절반은 쓰기 스레드가 지웠다 넣는 청크
+    bm25_of = {vid: s for vid, s in lexical}
+
+    class _Lex:
+        def search(self, query, top_k=5, allow=None):
+            return lexical[:top_k]
+
+    plan = Day2Plan(hybrid_pool=40)
+    prev = sys.getswitchinterval()
+    stop, errors, checked = threading.Event(), [], []
+
+    def _reader(k):
+        try:
+            while not stop.is_set():
+                out = _hybrid_search(store, store, _Lex(), "q", x[300 + k], plan, 20, None)
+                for c in out:
+                    assert c["doc_id"] == id_of[c["vid"]]
+                    assert c["bm25"] == 0.0 or abs(c["bm25"] - bm25_of[c["vid"]]) < 1e-4
+                checked.append(len(out))
+        except Exception as e:
+            errors.append(e)
+
+    def _writer():
+        try:
+            for _ in range(150):
+                store.remove_ids([it["vid"] for it in items[:100]])
+                store.upsert(x[:100], [dict(it) for it in items[:100]])
+        except Exception as e:
+            errors.append(e)
+        finally:
+            stop.set()
+
+    threads = [threading.Thread(target=_reader, args=(k,)) for k in range(4)] + [threading.Thread(target=_writer)]
+    sys.setswitchinterval(1e-6)  # 스레드 전환을 잦게 → 확인과 조회 사이에 삭제가 끼어들 기회
+    try:
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(timeout=120)
+    finally:
+        sys.setswitchinterval(prev)
+    assert not errors, errors[:3]
+    assert checked and all(n == 20 for n in checked)
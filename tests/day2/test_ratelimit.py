@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from student.day2.impl import ratelimit
+from student.day2.impl.embeddings import Embeddings
+from student.day2.impl.ratelimit import AIMDController, RateLimiter, TokenBucket
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """time.monotonic/sleep 대체: sleep 은 실제로 기다리지 않고 시계만 앞으로"""
+    now = [100.0]
+    monkeypatch.setattr(ratelimit.time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(ratelimit.time, "sleep", lambda s: now.__setitem__(0, now[0] + s))
+    return now
+
+
+def test_token_bucket_limits_rate(clock):
+    bucket = TokenBucket(rate_per_min=60)  # 초당 1, 적립 최대 60
+    assert bucket.acquire(60) == 0.0  # 처음엔 1분치가 차 있음
+    assert bucket.acquire(1) == pytest.approx(1.0)
+    assert bucket.acquire(3) == pytest.approx(3.0)
+    clock[0] += 1000  # 오래 쉬어도 용량 이상 쌓이지 않음
+    assert bucket.acquire(60) == 0.0
+    assert bucket.acquire(500) == pytest.approx(60.0)  # 용량보다 큰 요청은 용량만큼만 기다림
+
+
+def test_rate_limiter_waits_for_both_buckets(clock):
+    lim = RateLimiter(rpm=60, tpm=600)
+    start = clock[0]
+    for _ in range(3):
+        lim.acquire(300)  # 토큰 한도가 먼저 걸림: 600 소진 후 300 마다 30초
+    assert clock[0] - start == pytest.approx(30.0)
+    assert lim.waited_s == pytest.approx(30.0)
+
+
+def test_aimd_multiplicative_decrease_and_additive_increase(clock):
+    c = AIMDController(8, cooldown_s=1.0)
+    c.acquire()
+    c.release(throttled=True)
+    assert c.limit == 4
+    c.acquire()
+    c.release(throttled=True)  # 쿨다운 안의 429 는 다시 줄이지 않음
+    assert c.limit == 4 and c.stats["throttles"] == 2 and c.stats["decreases"] == 1
+    clock[0] += 1.0
+    c.acquire()
+    c.release(throttled=True)
+    assert c.limit == 2
+    for _ in range(2 + 3):  # 한도만큼 연속 성공하면 +1 (2 → 3 → 4)
+        c.acquire()
+        c.release()
+    assert c.limit == 4
+    for _ in range(100):
+        c.acquire()
+        c.release()
+    assert c.limit == 8 and c.stats["max_seen"] == 8 and c.stats["min_seen"] == 2  # 상한 = initial
+
+    low = AIMDController(2, min_limit=1)
+    for _ in range(3):
+        clock[0] += 2
+        low.acquire()
+        low.release(throttled=True)
+    assert low.limit == 1  # 하한 아래로 내려가지 않음
+
+
+class _RateLimited(Exception):
+    status_code = 429
+
+
+def test_embeddings_backs_off_on_429(clock, monkeypatch):
+    import student.day2.impl.embeddings as E
+    sleeps = []
+    monkeypatch.setattr(E.time, "sleep", sleeps.append)
+    emb = Embeddings(batch_size=2, concurrency=4)
+    api = emb.client.embeddings
+    real_create, calls = api.create, {"n": 0}
+
+    def _flaky(model, input, **kw):
+        calls["n"] += 1
+        if calls["n"] <= 2:
+            raise _RateLimited("429")
+        return real_create(model, input, **kw)
+
+    api.create = _flaky
+    out = emb.encode([f"t{i}" for i in range(8)])
+    assert out.shape[0] == 8
+    assert emb.stats["throttled"] == 2 and emb.stats["retries"] == 2 and len(sleeps) == 2
+    assert emb.aimd.stats["decreases"] >= 1 and emb.aimd.stats["min_seen"] < 4
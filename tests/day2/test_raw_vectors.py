@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+from student.day2.impl.raw_vectors import RawVectors
+
+
+def test_pending_vectors_live_in_one_buffer_and_merge_on_save(tmp_path):
+    rng = np.random.default_rng(0)
+    x = rng.standard_normal((3000, 8)).astype("float32")
+    raw = RawVectors(8)
+    raw.add(range(0, 2000, 2), x[:1000])
+    raw.save(str(tmp_path))
+    assert raw.memory_usage()["ram"] == 1000 * 8  # 저장 후 버퍼 비움 (vid 배열만)
+
+    for s in range(1000, 3000, 250):  # 여러 번 나눠 추가 → 버퍼가 늘어남
+        raw.add(range(2 * s, 2 * (s + 250), 2), x[s:s + 250])
+    raw.add([4, 2002], x[:2] * 2)  # 기존 행과 이번 빌드에서 추가한 행을 덮어씀
+    raw.remove([6, 2004])
+    assert raw.memory_usage()["ram"] >= 2000 * 8 * 4
+    assert np.array_equal(raw.get([4, 2002, 2]), np.stack([x[0] * 2, x[1] * 2, x[1]]))
+    assert raw.get([6]) is None and raw.get([2004]) is None
+
+    raw.save(str(tmp_path))
+    again = RawVectors.open(str(tmp_path), 8)
+    assert len(again._vids) == 3000 - 2
+    assert np.array_equal(again.get([4, 2002, 5998]), np.stack([x[0] * 2, x[1] * 2, x[2999]]))
+    assert again.get([6]) is None
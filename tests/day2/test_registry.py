@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+import shutil
+
+import pytest
+
+from student.day2.impl.build_index import build_index
+from student.day2.impl.embeddings import Embeddings
+from student.day2.impl.registry import StoreRegistry
+from student.day2.impl.ingest import collect_files
+from student.day2.impl.sharded import ShardedStore, shard_of
+
+
+@pytest.fixture
+def emb():
+    return Embeddings(model="text-embedding-3-small")
+
+
+def _query(emb, text="전기차 충전 인프라"):
+    return emb.encode([text])[0]
+
+
+def _spread_corpus(corpus, dst, n_shards):
+    """corpus 를 dst 로 복사하고, 경로 해시가 한 샤드로 몰렸으면 복사본을 더해 모든 샤드에 파일이 가게 함"""
+    shutil.copytree(corpus, dst)
+    names = sorted(p.name for p in corpus.iterdir())
+    k = 0
+    while len({shard_of(fp, n_shards) for fp in collect_files([str(dst)])}) < n_shards:
+        shutil.copy(corpus / names[k % len(names)], dst / f"extra_{k}.md")
+        k += 1
+    return dst
+
+
+def test_sharded_pool_closed_on_clear_and_evict_but_held_store_still_searches(tmp_path, corpus, emb):
+    a, b = tmp_path / "a", tmp_path / "b"
+    src = _spread_corpus(corpus, tmp_path / "src", 2)
+    build_index([str(src)], str(a), workers=1, shards=2)
+    build_index([str(src)], str(b), workers=1, shards=2)
+    reg = StoreRegistry(budget_mb=0)
+    held = reg.store(str(a), emb)
+    assert isinstance(held, ShardedStore)
+    reg.clear()
+    assert held._pool._shutdown
+    assert held.search(_query(emb), top_k=3)  # 교체/내린 뒤에도 잡고 있던 요청은 순차로 끝남
+
+    reg.budget_bytes = 1  # 새로 올린 것 외에는 모두 내림
+    first = reg.store(str(a), emb)
+    reg.store(str(b), emb)
+    assert reg.snapshot()["evictions"] == 1 and first._pool._shutdown
+    assert len(first.search(_query(emb), top_k=3)) == 3
+
+
+def test_version_swap_under_concurrent_get(tmp_path, corpus, emb):
+    import shutil, threading, time
+    src = tmp_path / "src"
+    src.mkdir()
+    for name in ("doc_0.md", "doc_1.md"):
+        shutil.copy(corpus / name, src / name)
+    idx = str(tmp_path / "idx")
+    build_index([str(src)], idx, workers=1, versioned=True)
+    reg = StoreRegistry(budget_mb=0)
+    n0 = len(reg.store(idx, emb))
+    q = _query(emb)
+    stop, errors, sizes = threading.Event(), [], set()
+
+    def _worker():
+        while not stop.is_set():
+            try:
+                store = reg.store(idx, emb)
+                b = reg.batcher(idx, emb, store=store)
+                assert b.search(q, top_k=2)
+                sizes.add(len(store))
+            except Exception as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=_worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    shutil.copy(corpus / "doc_2.md", src / "doc_2.md")
+    build_index([str(src)], idx, workers=1)  # 새 버전 게시 → 백그라운드 로드 후 교체
+    deadline = time.time() + 20
+    while reg.snapshot()["swaps"] < 1 and time.time() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.1)  # 교체 뒤에도 잠시 질의 (닫힌 이전 배처를 쥔 요청 포함)
+    stop.set()
+    for t in threads:
+        t.join(timeout=30)
+    assert not errors
+    assert reg.snapshot()["swaps"] == 1
+    assert len(reg.store(idx, emb)) > n0 and len(sizes) == 2
+    reg.clear()
+
+
+def test_columnar_overlay_changes_count_as_ram(tmp_path, synthetic):
+    from student.day2.impl.store import FaissStore
+    x, items = synthetic(200)
+    store = FaissStore(x.shape[1], str(tmp_path / "faiss.index"), str(tmp_path / "docs.jsonl"))
+    store.add(x[:100], items[:100])
+    store.save()
+    base_ram = store.docs.base.memory_usage()["ram"]
+    assert base_ram > 0  # 경로 목록은 힙
+    before = store.memory_usage()["ram"]
+    store.add(x[100:], [dict(it, text="긴 본문 " * 200) for it in items[100:]])
+    assert store.docs.memory_usage()["ram"] > base_ram + 100 * 1000
+    assert store.memory_usage()["ram"] > before + 100 * 1000
+
+
+def test_evict_under_concurrent_store_and_batcher(tmp_path, corpus, emb):
+    import threading
+    dirs = []
+    src = _spread_corpus(corpus, tmp_path / "src", 2)  # 샤드마다 파일이 있어야 두 샤드 모두 검색됨
+    for i in range(3):
+        d = str(tmp_path / f"idx{i}")
+        build_index([str(src)], d, workers=1, shards=2 if i == 0 else 0)
+        dirs.append(d)
+    reg = StoreRegistry(budget_mb=0)
+    reg.budget_bytes = 1  # 방금 올린 스토어 외에는 모두 내림 → 매 전환마다 축출
+    q = _query(emb)
+    errors, done = [], []
+
+    def _worker(k):
+        for j in range(30):
+            d = dirs[(k + j) % len(dirs)]
+            try:
+                store = reg.store(d, emb)
+                b = reg.batcher(d, emb, store=store)
+                assert len(b.search(q, top_k=2)) == 2
+                done.append(1)
+            except Exception as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=_worker, args=(k,)) for k in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(timeout=60)
+    assert not any(t.is_alive() for t in threads)
+    assert not errors and len(done) == 120
+    snap = reg.snapshot()
+    assert snap["evictions"] > 0
+    assert set(reg._key_locks) <= set(reg._stores)  # 내린 키의 로드 잠금은 남지 않음
+    reg.clear()
+    assert not reg._key_locks
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+import os
+
+import numpy as np
+import pytest
+
+from student.day2.impl import store as store_mod
+from student.day2.impl.docs_offsets import offsets_path
+from student.day2.impl.store import FaissStore
+
+
+def _paths(d):
+    return str(d / "faiss.index"), str(d / "docs.jsonl")
+
+
+def test_mmap_load_does_not_write_offsets_sidecar(tmp_path, synthetic):
+    x, items = synthetic(200)
+    store = FaissStore(x.shape[1], *_paths(tmp_path))
+    store.docs_format = "jsonl"
+    store.add(x, items)
+    store.save()
+    os.remove(offsets_path(store.docs_path))
+    before = sorted(os.listdir(tmp_path))
+
+    loaded = FaissStore.load(*_paths(tmp_path), mmap=True)
+    assert sorted(os.listdir(tmp_path)) == before
+    vid = items[17]["vid"]
+    assert loaded.docs[vid]["id"] == items[17]["id"]
+    assert loaded.search(x[17], top_k=1)[0]["vid"] == vid
+
+
+@pytest.mark.parametrize("index_type,params", [
+    ("flat", {}),
+    ("hnsw", {}),
+    ("ivf_flat", {"nlist": 8}),
+    ("ivf_pq", {"nlist": 8, "pq_m": 8, "pq_nbits": 4}),
+    ("flat", {"precision": "fp16", "rescore": 4}),
+    ("hnsw", {"precision": "sq8", "rescore": 4}),
+])
+@pytest.mark.parametrize("docs_format", ["columnar", "jsonl"])
+def test_save_load_round_trip(tmp_path, synthetic, index_type, params, docs_format):
+    x, items = synthetic(600)
+    store = FaissStore(x.shape[1], *_paths(tmp_path), index_type=index_type, index_params=params)
+    store.docs_format = docs_format
+    store.add(x, items)
+    store.meta["embedding_model"] = "fake"
+    store.save()
+
+    for mmap in (False, True):
+        loaded = FaissStore.load(*_paths(tmp_path), mmap=mmap)
+        assert len(loaded) == 600 and loaded.index_type == index_type
+        assert loaded.meta["embedding_model"] == "fake" and loaded.meta["docs_format"] == docs_format
+        hits = loaded.search(x[42], top_k=3, nprobe=8)
+        assert hits[0]["vid"] == items[42]["vid"] and hits[0]["doc_id"] == items[42]["id"]
+        assert loaded.search(x[42], top_k=3, nprobe=8, where={"path": ["doc_3.md"]})[0]["meta"]["path"] == "doc_3.md"
+    assert not [n for n in os.listdir(tmp_path) if ".tmp" in n or "journal" in n]
+
+
+def test_save_load_round_trip_pca(tmp_path, synthetic):
+    from student.day2.impl.dimreduce import PcaReducer
+    x, items = synthetic(300, dim=64)
+    store = FaissStore(16, *_paths(tmp_path))
+    store.reducer = PcaReducer.fit(x, 16)
+    store.add(x, items)
+    store.meta["reduce"] = {"method": "pca", "dim": 16, "in_dim": 64}
+    store.save()
+    loaded = FaissStore.load(*_paths(tmp_path))
+    assert loaded.input_dim == 64 and loaded.dim == 16
+    assert loaded.search(x[9], top_k=1)[0]["vid"] == items[9]["vid"]
+
+
+def _saved_state(d):
+    loaded = FaissStore.load(*_paths(d))
+    return len(loaded), loaded.meta.get("count"), len(loaded.docs), len(loaded.filters.path_vids)
+
+
+def test_crash_before_commit_keeps_previous_save(tmp_path, synthetic, monkeypatch):
+    from student.day2.impl import save_journal
+    x, items = synthetic(300)
+    store = FaissStore(x.shape[1], *_paths(tmp_path))
+    store.add(x[:200], items[:200])
+    store.save()
+    store.add(x[200:], items[200:])
+
+    def _crash(*a, **kw):
+        raise OSError("디스크 가득 참")
+
+    monkeypatch.setattr(save_journal, "commit", _crash)
+    with pytest.raises(OSError):
+        store.save()
+    assert _saved_state(tmp_path) == (200, 200, 200, 200)
+    monkeypatch.undo()
+    store.save()  # 다음 저장이 남은 tmp 를 치우고 정상 저장
+    assert _saved_state(tmp_path) == (300, 300, 300, 300)
+    assert not [n for n in os.listdir(tmp_path) if ".tmp" in n]
+
+
+def test_crash_after_commit_rolls_forward_on_load(tmp_path, synthetic, monkeypatch):
+    from student.day2.impl import save_journal
+    x, items = synthetic(300)
+    store = FaissStore(x.shape[1], *_paths(tmp_path))
+    store.docs_format = "jsonl"
+    store.add(x[:200], items[:200])
+    store.save()
+    store.add(x[200:], items[200:])
+    store.docs_format = "columnar"  # 형식도 바꿔서 낡은 docs.jsonl 삭제까지 확인
+
+    real_replace, n = os.replace, {"c": 0}
+
+    def _dying_replace(src, dst):
+        if "tmp-" in str(src) and not str(dst).endswith("journal.json"):
+            n["c"] += 1
+            if n["c"] > 2:
+                raise KeyboardInterrupt  # 교체 두 개 뒤 프로세스 중단 흉내
+        return real_replace(src, dst)
+
+    monkeypatch.setattr(save_journal.os, "replace", _dying_replace)
+    with pytest.raises(KeyboardInterrupt):
+        store.save()
+    monkeypatch.undo()
+    assert save_journal.pending(str(tmp_path))
+    # 읽기 전용(mmap) 로드는 다른 프로세스의 커밋을 대신 끝내지 않음 → 기다려도 남아 있으면 오류
+    monkeypatch.setattr(store_mod, "LOAD_WAIT_S", 0)
+    with pytest.raises(RuntimeError, match="저널"):
+        FaissStore.load(*_paths(tmp_path), mmap=True)
+    assert save_journal.pending(str(tmp_path))
+    assert _saved_state(tmp_path) == (300, 300, 300, 300)
+    assert not save_journal.pending(str(tmp_path))
+    assert not os.path.exists(store.docs_path)
+    assert FaissStore.load(*_paths(tmp_path)).docs_format == "columnar"
+    assert len(FaissStore.load(*_paths(tmp_path), mmap=True)) == 300
+
+
+def test_save_releases_mapped_files_before_replacing(tmp_path, synthetic, monkeypatch):
+    from student.day2.impl import save_journal
+    x, items = synthetic(300)
+    store = FaissStore(x.shape[1], *_paths(tmp_path), index_params={"precision": "fp16", "rescore": 4})
+    store.add(x[:200], items[:200])
+    store.save()
+    base = store.docs.base
+    store.add(x[200:], items[200:])
+
+    real_commit, real_replace, seen, log = save_journal.commit, os.replace, {}, []
+
+    def _commit(*a, **kw):
+        seen["docs_mapped"] = not base._mm.closed
+        seen["raw_mapped"] = isinstance(store.raw._vecs, np.memmap)
+        return real_commit(*a, **kw)
+
+    monkeypatch.setattr(save_journal, "commit", _commit)
+    store.save()
+    assert seen == {"docs_mapped": False, "raw_mapped": False}
+    assert len(store.docs) == 300 and store.search(x[250], top_k=1)[0]["vid"] == items[250]["vid"]
+
+    # columnar → jsonl: 낡은 docs.col 은 메타 교체 뒤에 삭제, 메모리 docs 는 계속 사용 가능
+    monkeypatch.setattr(save_journal.os, "replace", lambda s, d: (log.append(("replace", os.path.basename(d))),
+                                                                 real_replace(s, d))[1])
+    monkeypatch.setattr(save_journal.os, "remove", lambda p: (log.append(("remove", os.path.basename(p))),
+                                                              os.unlink(p))[1])
+    store.docs_format = "jsonl"
+    store.save()
+    names = [n for _, n in log]
+    assert names.index("docs.col") > names.index("index_meta.json")
+    assert store.docs[items[250]["vid"]]["id"] == items[250]["id"]
+    assert _saved_state(tmp_path) == (300, 300, 300, 300)
+
+
+def test_failed_commit_keeps_mapped_docs_usable(tmp_path, synthetic, monkeypatch):
+    from student.day2.impl import save_journal
+    x, items = synthetic(300)
+    store = FaissStore(x.shape[1], *_paths(tmp_path), index_params={"precision": "sq8", "rescore": 4})
+    store.add(x[:200], items[:200])
+    store.save()
+    store.add(x[200:], items[200:])
+
+    def _crash(*a, **kw):
+        raise OSError("디스크 가득 참")
+
+    monkeypatch.setattr(save_journal, "commit", _crash)
+    with pytest.raises(OSError):
+        store.save()
+    assert store.docs[items[10]["vid"]]["id"] == items[10]["id"]  # 기존 docs.col 을 다시 매핑
+    assert store.search(x[10], top_k=1)[0]["vid"] == items[10]["vid"]
+    assert np.allclose(store.vectors([items[10]["vid"]])[0], x[10])